@@ -0,0 +1,30 @@
+"""
+Ponto de entrada do app: sobe o servidor do Streamlit com 'app/main.py'.
+
+Uso (a partir da pasta 'src'):
+    python -m app [opções do 'streamlit run', ex: --server.port 8502 --server.headless true]
+
+A pasta 'src' entra no sys.path antes de o servidor subir (as páginas rodam
+neste mesmo processo), então elas já encontram 'funcoes'/'etl'. Nada
+além do Streamlit é importado aqui: pandas, NumPy, flowio etc. só são
+carregados quando uma página é aberta (ver 'benchmarks/importacao.py').
+"""
+import sys
+from pathlib import Path
+
+PASTA_APP = Path(__file__).resolve().parent
+PASTA_SRC = PASTA_APP.parent
+
+
+def main():
+    if str(PASTA_SRC) not in sys.path:
+        sys.path.insert(0, str(PASTA_SRC))
+
+    from streamlit.web import cli
+
+    sys.argv = ["streamlit", "run", str(PASTA_APP / "main.py"), *sys.argv[1:]]
+    sys.exit(cli.main())
+
+
+if __name__ == "__main__":
+    main()
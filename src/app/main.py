@@ -17,5 +17,7 @@ st.markdown("""
     Use o menu na **barra lateral esquerda** para navegar:
 
     - **Repositório de Experimentos:** Para buscar e fazer o download dos arquivos de resultados existentes.
-    - **Adicionar Dados:** Para inserir novos experimentos no banco de dados (em breve).
+    - **Busca de Experimentos:** Para procurar resultados por texto (nome do arquivo, amostra, condição, citômetro, animal) e filtrar por grupo, ensaio, citômetro e data.
+    - **Adicionar Dados:** Para enviar arquivos .fcs novos; a ingestão no banco acontece em segundo plano e o progresso aparece na própria página.
+    - **Desempenho:** Tempos das consultas ao banco, da leitura de arquivos e das páginas, com o registro de consultas lentas.
 """)
@@ -1,8 +1,13 @@
 import streamlit as st
 import sys
+import time
+from functools import partial
 from pathlib import Path
 
-#st.write(st.session_state) # <-- NOVA LINHA DE DEBUG
+# pandas é importado só nos trechos que montam tabelas (ver 'benchmarks/importacao.py')
+
+# Tempo de execução da página (ver 'funcoes.metricas' e a página 'Desempenho')
+inicio_pagina = time.perf_counter()
 
 # Pega o caminho absoluto deste arquivo
 arquivo_atual = Path(__file__).resolve()
@@ -16,13 +21,24 @@ if str(PASTA_SRC) not in sys.path:
 
 # Import da finção de leitura
 try:
+    from funcoes import db_tools, metricas
     from funcoes.db_tools import leitura
+    from database_setup.create_schema import create_database_schema
 except ImportError as e:
     st.error("🛑 ERRO CRÍTICO DE IMPORTAÇÃO")
     st.write(f"O Python falhou ao importar 'funcoes': `{e}`")
     st.stop()
 try:
-    from funcoes.metadados import extrair_metadado, formata_df, processa_compara
+    from funcoes.metadados import extrair_metadado, formata_df
+    from funcoes.comparacao import compara_grupos
+    from funcoes.paineis import obter_indice_paineis, indexa_faltantes
+    from funcoes.previas import busca_previas, imagem_densidade, imagem_histograma
+    from funcoes.catalogo import busca_metadado_catalogo
+    from funcoes.downloads import le_arquivo, zip_para_download
+    from funcoes.estatisticas import estatisticas_arquivo
+    from funcoes.registro import obter_registro
+    from funcoes.resultados import busca_resultados, conta_resultados
+    from funcoes.cache import cache_por_arquivo, cache_por_conteudo, cache_por_geracao, contadores_caches, limpa_caches
 except ImportError as e:
     st.error(f'Erro ao importar metadados: {e}')
     st.stop()
@@ -31,48 +47,232 @@ except ImportError as e:
 st.set_page_config(page_title="Repositório de Experimentos" ,layout="wide", page_icon="📂")
 st.title("📂 Repositório de Experimentos")
 
-# --- 3. MAPAS DE DADOS ---
-MAPA_TABELAS_DETALHE = {
-    'agonistas': 'detalhes_agonistas',
-    'cryptococcus': 'detalhes_cryptococcus',
-    'fagocitose': 'detalhes_fagocitose',
-    'imunofenotipagem': 'detalhes_imunofenotipagem'
-}
-
-MAPA_PKS_DETALHE = {
-    'agonistas': 'id_agonista',
-    'cryptococcus': 'id_cryptococcus',
-    'fagocitose': 'id_fagocitose',
-    'imunofenotipagem': 'id_imunofenotipagem'
-}
+# --- 3. ESQUEMA DO BANCO ---
+@st.cache_resource
+def garante_esquema():
+    """
+    Cria as tabelas, índices e visões que faltarem (uma vez por processo),
+    para a página funcionar também com bancos criados por versões antigas.
+    """
+    create_database_schema(db_tools.db_path)
+    # Arquivos catalogados antes do índice de painéis existir
+    indexa_faltantes()
+
+garante_esquema()
+
+# Opções de tamanho de página da lista de resultados
+OPCOES_ITENS_POR_PAGINA = [25, 50, 100, 250]
 
 # --- 4. FUNÇÕES CACHEADAS (Consultas ao Banco) ---
-@st.cache_data
+# Os caches são compartilhados por todas as sessões (ver 'funcoes/cache.py'):
+# as consultas são invalidadas quando o ETL grava dados novos (geração do banco)
+# e os dados de arquivos, quando o arquivo muda no disco (tamanho/mtime)
+@cache_por_geracao("grupos", max_itens=8)
 def buscar_mapa_de_grupos():
-    resultados_tuplas = leitura("SELECT id_grupo, nome_grupo FROM grupos ORDER BY nome_grupo")
-    lista_nomes = [item[1] for item in resultados_tuplas]
-    mapa_ids = {nome: id for id, nome in resultados_tuplas}
+    # Mesmo registro de grupos usado pelo ETL ('funcoes.registro')
+    mapa_ids = dict(obter_registro().grupos_por_nome)
+    lista_nomes = sorted(mapa_ids)
     return lista_nomes, mapa_ids
 
-@st.cache_data
+@cache_por_geracao("ensaios", max_itens=64)
 def buscar_ensaios_por_grupo(id_grupo):
     query = "SELECT DISTINCT tipo_ensaio FROM experimentos_master WHERE id_grupo = ? ORDER BY tipo_ensaio"
     resultados = leitura(query, (id_grupo,))
     return [item[0] for item in resultados]
 
-@st.cache_data
-def buscar_resultados_finais(id_grupo, tipo_ensaio):
-    tabela = MAPA_TABELAS_DETALHE[tipo_ensaio]
-    pk = MAPA_PKS_DETALHE[tipo_ensaio]
-    
-    query = f"""
-        SELECT d.id_animal, d.arquivo_de_resultado, d.condicao
-        FROM {tabela} AS d
-        JOIN experimentos_master AS m ON d.{pk} = m.id_detalhe_ensaio
-        WHERE m.id_grupo = ? AND m.tipo_ensaio = ?
-        ORDER BY d.id_animal
+@cache_por_geracao("contagens", max_itens=256)
+def contar_resultados(id_grupo, tipo_ensaio):
+    return conta_resultados(id_grupo, tipo_ensaio)
+
+@cache_por_geracao("resultados", max_itens=256)
+def buscar_resultados_finais(id_grupo, tipo_ensaio, limite=-1, deslocamento=0):
+    """
+    Resultados de um grupo/ensaio, paginados no próprio banco (LIMIT/OFFSET).
+    limite=-1 traz todas as linhas (ver 'funcoes.resultados').
+    """
+    return busca_resultados(id_grupo, tipo_ensaio, limite, deslocamento)
+
+@cache_por_arquivo("metadados", max_itens=2048)
+def buscar_metadado(caminho_limpo):
+    """
+    Metadados de um arquivo, cacheados pela impressão digital (caminho, tamanho, mtime):
+    se o arquivo mudar no disco, a chave muda e o cache antigo não é usado.
+    """
+    # Usa o catálogo do banco; só lê o arquivo se ele ainda não foi catalogado
+    dados_brutos = busca_metadado_catalogo(caminho_limpo)
+    if dados_brutos is None:
+        dados_brutos = extrair_metadado(PASTA_SRC.parent / caminho_limpo)
+    return dados_brutos
+
+@cache_por_conteudo("estatisticas", max_itens=256)
+def buscar_estatisticas(caminho_limpo):
+    """
+    Estatísticas por canal (lidas dos eventos), cacheadas pelo hash do conteúdo:
+    cópias do mesmo arquivo com outro nome são calculadas uma vez só.
+    """
+    return estatisticas_arquivo(PASTA_SRC.parent / caminho_limpo)
+
+def comparar_estatisticas(caminhos_limpos):
+    """
+    Estatísticas por canal de vários arquivos, para comparação lado a lado.
+    Cada arquivo passa pelo cache de 'buscar_estatisticas'.
+
+    Retorna:
+        tuple: (df_estatisticas com a coluna 'Arquivo', df_erros)
+    """
+    import pandas as pd
+
+    partes, erros = [], []
+    for caminho in caminhos_limpos:
+        try:
+            partes.append(buscar_estatisticas(caminho).assign(Arquivo=Path(caminho).name))
+        except Exception as e:
+            erros.append((Path(caminho).name, caminho, str(e)))
+
+    df_estatisticas = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
+    if partes:
+        df_estatisticas = df_estatisticas[["Arquivo"] + [c for c in df_estatisticas.columns if c != "Arquivo"]]
+    return df_estatisticas, pd.DataFrame(erros, columns=["Arquivo", "Caminho", "Erro"])
+
+@cache_por_geracao("paineis", max_itens=256)
+def buscar_paineis_do_filtro(id_grupo, tipo_ensaio):
+    """
+    Painéis presentes em um grupo/ensaio (id_painel -> nº de arquivos), pelo índice de painéis.
+    """
+    indice = obter_indice_paineis()
+    contagem = {}
+    for _, caminho, _ in buscar_resultados_finais(id_grupo, tipo_ensaio):
+        id_painel = indice.painel_do_arquivo.get(caminho.replace('\\', '/'))
+        if id_painel is not None:
+            contagem[id_painel] = contagem.get(id_painel, 0) + 1
+    return dict(sorted(contagem.items(), key=lambda item: -item[1]))
+
+@cache_por_geracao("comparacao", max_itens=32)
+def buscar_comparacao(id_grupo):
+    """
+    Agregados por grupo/ensaio (uma passada pelo catálogo). id_grupo=None compara todos os grupos.
+    """
+    return compara_grupos(id_grupo)
+
+@cache_por_geracao("previas", max_itens=64)
+def buscar_previas(caminhos_limpos):
     """
-    return leitura(query, (id_grupo, tipo_ensaio))
+    Histogramas/densidades pré-calculados na ingestão de uma página de
+    arquivos, lidos do banco em uma consulta (sem abrir os .fcs).
+    """
+    return busca_previas(list(caminhos_limpos))
+
+def mostra_previas(previa):
+    """
+    Desenha as densidades 2D e os histogramas 1D de um arquivo (prévias do banco).
+    """
+    st.markdown("##### Distribuições (prévia):")
+    if previa["pares"]:
+        st.image(
+            [imagem_densidade(densidade) for densidade in previa["densidades"]],
+            caption=[f"{previa['rotulos'][x - 1]} × {previa['rotulos'][y - 1]}" for x, y in previa["pares"]],
+            width=144
+        )
+    escalas = {"L": "linear", "A": "asinh"}
+    st.image(
+        [imagem_histograma(contagens) for contagens in previa["histogramas"]],
+        caption=[f"{rotulo} ({escalas[escala]})" for rotulo, escala in zip(previa["rotulos"], previa["escalas"])],
+        width=128
+    )
+    st.caption(f"{previa['eventos']} eventos · {previa['bins']} bins por canal")
+
+def alterna_detalhes(chave_linha):
+    """
+    Abre o painel de metadados da linha clicada (ou fecha, se já estava aberto).
+    """
+    if st.session_state.get("linha_detalhes") == chave_linha:
+        st.session_state["linha_detalhes"] = None
+    else:
+        st.session_state["linha_detalhes"] = chave_linha
+
+def mostra_metadados(caminho_limpo, caminho_absoluto):
+    """
+    Desenha o painel de metadados de um único arquivo.
+    """
+    if not caminho_absoluto.exists():
+        st.warning("Caminho do arquivo não é válido")
+        return
+
+    dados_brutos = buscar_metadado(caminho_limpo)
+
+    if "Status" in dados_brutos:
+        st.error(f"ERRO: Não foi possível ler o arquivo. {dados_brutos.get('Error')}")
+        return
+
+    df_geral, df_canais, df_fluoroforos = formata_df(dados_brutos)
+
+    # Índice de painéis: quantos arquivos do catálogo têm exatamente este painel
+    indice = obter_indice_paineis()
+    id_painel = indice.painel_do_arquivo.get(caminho_limpo)
+    if id_painel is not None:
+        st.caption(
+            f"Painel {id_painel} ({indice.paineis[id_painel][2]} canais): "
+            f"{len(indice.arquivos_com_painel(id_painel))} arquivo(s) no catálogo com o mesmo painel."
+        )
+
+    st.markdown("##### Informações Gerais:")
+    # Transpõe o DF Geral (de 3 linhas para 3 colunas)
+    st.dataframe(df_geral.set_index('Métrica').T, hide_index=True)
+
+    col_canais, col_fluoros = st.columns(2)
+    with col_canais:
+        st.markdown("##### Canais Adquiridos:")
+        st.dataframe(df_canais, hide_index=True, use_container_width=True)
+    with col_fluoros:
+        st.markdown("##### Fluoróforos/Marcadores:")
+        st.dataframe(df_fluoroforos, hide_index=True, use_container_width=True)
+
+    previa = buscar_previas((caminho_limpo,)).get(caminho_limpo)
+    if previa is not None:
+        mostra_previas(previa)
+
+    # Lê os eventos do arquivo: só quando pedido
+    if st.toggle("📊 Estatísticas por canal", key=f"est_{caminho_limpo}"):
+        try:
+            df_estatisticas = buscar_estatisticas(caminho_limpo)
+            st.dataframe(df_estatisticas, hide_index=True, use_container_width=True)
+        except Exception as e:
+            st.error(f"Não foi possível calcular as estatísticas: {e}")
+
+def mostra_comparacao(id_grupo, nome_grupo):
+    """
+    Desenha a comparação entre os ensaios do grupo (ou entre todos os grupos).
+    """
+    todos = st.toggle("Comparar todos os grupos", key="comparar_todos")
+    st.subheader("Comparação: todos os grupos" if todos else f"Comparação: {nome_grupo}")
+
+    tabelas = buscar_comparacao(None if todos else id_grupo)
+    df_resumo = tabelas["resumo"]
+    if df_resumo.empty:
+        st.warning("Nenhum resultado encontrado no banco para este filtro.")
+        return
+
+    st.dataframe(df_resumo, hide_index=True, use_container_width=True)
+    if df_resumo["Sem metadados"].sum():
+        st.caption("'Sem metadados': arquivos fora do catálogo que também não puderam ser lidos do disco.")
+        with st.expander(f"Arquivos não lidos ({len(tabelas['erros'])})"):
+            st.dataframe(tabelas["erros"], hide_index=True, use_container_width=True)
+
+    st.markdown("##### Média de eventos por arquivo:")
+    st.bar_chart(
+        df_resumo.astype({"Grupo": str, "Ensaio": str}).dropna(subset=["Eventos (média)"]),
+        x="Ensaio", y="Eventos (média)", color="Grupo", stack=False
+    )
+
+    aba_paineis, aba_canais, aba_citometros, aba_datas = st.tabs(["Painéis", "Canais", "Citômetros", "Datas"])
+    with aba_paineis:
+        st.dataframe(tabelas["paineis"], hide_index=True, use_container_width=True)
+    with aba_canais:
+        st.dataframe(tabelas["canais"], hide_index=True, use_container_width=True)
+    with aba_citometros:
+        st.dataframe(tabelas["citometros"], hide_index=True, use_container_width=True)
+    with aba_datas:
+        st.dataframe(tabelas["datas"], hide_index=True, use_container_width=True)
 
 # --- 5. LÓGICA DA BARRA LATERAL (Filtros) ---
 st.sidebar.header("Filtros")
@@ -88,21 +288,161 @@ if grupo_sel:
     id_grupo = mapa_grupos[grupo_sel]
     lista_ensaios = buscar_ensaios_por_grupo(id_grupo)
     ensaio_sel = st.sidebar.selectbox('2. Ensaio:', lista_ensaios)
+    itens_por_pagina = st.sidebar.selectbox('3. Itens por página:', OPCOES_ITENS_POR_PAGINA, index=1)
+    modo_exibicao = st.sidebar.radio('4. Exibição:', ["Lista", "Tabela compacta", "Comparação"])
+    mostrar_previas = modo_exibicao == "Lista" and st.sidebar.toggle("Prévia FSC × SSC na lista", value=True)
+
+    # Filtros pelo índice de painéis (conjunto de canais/fluoróforos de cada arquivo)
+    permitidos = None
+    chave_filtro = ""
+    if ensaio_sel and modo_exibicao != "Comparação":
+        indice_paineis = obter_indice_paineis()
+        paineis_filtro = buscar_paineis_do_filtro(id_grupo, ensaio_sel)
+        painel_sel = st.sidebar.selectbox(
+            '5. Painel:', [None, *paineis_filtro],
+            format_func=lambda id_painel: "Todos" if id_painel is None else (
+                f"Painel {id_painel} · {indice_paineis.paineis[id_painel][2]} canais · "
+                f"{paineis_filtro[id_painel]} arquivo(s)"
+            )
+        )
+        marcadores_ausentes = st.sidebar.multiselect(
+            '6. Sem o marcador:',
+            sorted(frozenset().union(*(indice_paineis.marcadores[id_painel] for id_painel in paineis_filtro)))
+        )
+        if painel_sel is not None:
+            permitidos = indice_paineis.arquivos_com_painel(painel_sel)
+            st.sidebar.caption(indice_paineis.paineis[painel_sel][1].replace(";", " · "))
+        for marcador in marcadores_ausentes:
+            sem_marcador = indice_paineis.arquivos_sem_marcador(marcador)
+            permitidos = sem_marcador if permitidos is None else permitidos & sem_marcador
+        chave_filtro = f"_{painel_sel}_{'_'.join(marcadores_ausentes)}"
 
     # --- 6. EXIBIÇÃO DOS RESULTADOS ---
-    if ensaio_sel:
+    if modo_exibicao == "Comparação":
+        st.divider()
+        mostra_comparacao(id_grupo, grupo_sel)
+
+    elif ensaio_sel:
         st.divider()
         st.subheader(f"Resultados: {grupo_sel} - {ensaio_sel}")
         
-        resultados = buscar_resultados_finais(id_grupo, ensaio_sel)
+        if permitidos is None:
+            # Paginação feita no banco: só a página atual é buscada e desenhada
+            total_resultados = contar_resultados(id_grupo, ensaio_sel)
+        else:
+            # Filtro de painel: o grupo/ensaio inteiro (cacheado) é filtrado pelo índice
+            filtrados = [
+                linha for linha in buscar_resultados_finais(id_grupo, ensaio_sel)
+                if linha[1].replace('\\', '/') in permitidos
+            ]
+            total_resultados = len(filtrados)
+        total_paginas = max(1, -(-total_resultados // itens_por_pagina))
+
+        col_info, col_pagina = st.columns([3, 1])
+        with col_pagina:
+            pagina = st.number_input(
+                f"Página (de {total_paginas}):",
+                min_value=1,
+                max_value=total_paginas,
+                value=1,
+                key=f"pagina_{id_grupo}_{ensaio_sel}_{itens_por_pagina}{chave_filtro}"
+            )
+        deslocamento = (pagina - 1) * itens_por_pagina
+        with col_info:
+            st.caption(
+                f"{total_resultados} arquivo(s) — mostrando "
+                f"{min(deslocamento + 1, total_resultados)}–{min(deslocamento + itens_por_pagina, total_resultados)}"
+            )
+
+        if permitidos is None:
+            resultados = buscar_resultados_finais(id_grupo, ensaio_sel, itens_por_pagina, deslocamento)
+        else:
+            resultados = filtrados[deslocamento:deslocamento + itens_por_pagina]
         
-        if resultados:
+        if resultados and modo_exibicao == "Tabela compacta":
+            import pandas as pd
+
+            df_pagina = pd.DataFrame(
+                [(id_animal, condicao or "N/A", Path(caminho.replace('\\', '/')).name)
+                 for id_animal, caminho, condicao in resultados],
+                columns=["ID Animal", "Condição", "Nome do Arquivo"]
+            )
+            evento = st.dataframe(
+                df_pagina,
+                hide_index=True,
+                use_container_width=True,
+                on_select="rerun",
+                selection_mode="multi-row",
+                key=f"tabela_{id_grupo}_{ensaio_sel}_{pagina}_{itens_por_pagina}{chave_filtro}"
+            )
+            selecionados = [resultados[i] for i in evento.selection.rows]
+
+            if not selecionados:
+                st.info("Selecione uma ou mais linhas para baixar ou ver os metadados.")
+            elif len(selecionados) == 1:
+                id_animal, caminho_relativo_str, _ = selecionados[0]
+                caminho_limpo = caminho_relativo_str.replace('\\', '/')
+                caminho_absoluto = PASTA_SRC.parent / caminho_limpo
+                if caminho_absoluto.exists():
+                    st.download_button(
+                        label="⬇️ Baixar FCS",
+                        data=partial(le_arquivo, caminho_absoluto),
+                        file_name=caminho_absoluto.name,
+                        mime="application/octet-stream",
+                        key=f"dl_tabela_{id_animal}_{caminho_absoluto.name}"
+                    )
+                with st.container(border=True):
+                    mostra_metadados(caminho_limpo, caminho_absoluto)
+            else:
+                caminhos_zip = [PASTA_SRC.parent / linha[1].replace('\\', '/') for linha in selecionados]
+                st.download_button(
+                    label=f"📦 Baixar {len(caminhos_zip)} arquivo(s) em ZIP",
+                    data=partial(zip_para_download, caminhos_zip),
+                    file_name=f"{grupo_sel}_{ensaio_sel}.zip".replace(" ", "_"),
+                    mime="application/zip",
+                    key="dl_zip_tabela"
+                )
+                if st.toggle("📊 Comparar estatísticas por canal", key="comparar_tabela"):
+                    df_estatisticas, df_erros = comparar_estatisticas(
+                        tuple(linha[1].replace('\\', '/') for linha in selecionados)
+                    )
+                    st.dataframe(df_estatisticas, hide_index=True, use_container_width=True)
+                    if not df_erros.empty:
+                        st.warning(f"{len(df_erros)} arquivo(s) não puderam ser lidos.")
+                        st.dataframe(df_erros, hide_index=True)
+
+        elif resultados:
+            # Download de vários arquivos de uma vez, em um único ZIP
+            caminhos_zip = st.multiselect(
+                "Baixar vários arquivos em ZIP:",
+                options=[linha[1].replace('\\', '/') for linha in resultados],
+                format_func=lambda caminho: Path(caminho).name
+            )
+            if caminhos_zip:
+                st.download_button(
+                    label=f"📦 Baixar {len(caminhos_zip)} arquivo(s) em ZIP",
+                    data=partial(zip_para_download, [PASTA_SRC.parent / caminho for caminho in caminhos_zip]),
+                    file_name=f"{grupo_sel}_{ensaio_sel}.zip".replace(" ", "_"),
+                    mime="application/zip",
+                    key="dl_zip"
+                )
+            st.markdown("---")
+
+            # Prévias da página inteira em uma única consulta ao banco
+            previas_pagina = buscar_previas(
+                tuple(linha[1].replace('\\', '/') for linha in resultados)
+            ) if mostrar_previas else {}
+            larguras = [1, 2, 4, 2, 2, 1] if mostrar_previas else [1, 2, 4, 2, 2]
+
             # Cabeçalho da Lista
-            c1, c2, c3, c4 = st.columns([1, 2, 4, 2])
+            c1, c2, c3, c4, c5, *c6 = st.columns(larguras)
             c1.markdown("**ID Animal**")
             c2.markdown("**Condição**")
             c3.markdown("**Nome do Arquivo**")
             c4.markdown("**Ação**")
+            c5.markdown("**Detalhes**")
+            if c6:
+                c6[0].markdown("**Prévia**")
             st.markdown("---")
 
             # Loop para desenhar cada linha
@@ -116,7 +456,7 @@ if grupo_sel:
                 nome_arquivo = Path(caminho_limpo).name
 
                 # Colunas da Linha
-                c1, c2, c3, c4 = st.columns([1, 2, 4, 2])
+                c1, c2, c3, c4, c5, *c6 = st.columns(larguras)
                 
                 with c1: 
                     st.write(f"#{id_animal}")
@@ -132,57 +472,41 @@ if grupo_sel:
                 
                 with c4:
                     if caminho_absoluto.exists():
-                            print(f"\n[DEBUG_START] Tentando abrir: {caminho_absoluto}") # <-- LOG 1: O caminho 
-                            
-                            try:
-                                # Tenta ler o arquivo
-                                with open(caminho_absoluto, "rb") as f:
-                                    bytes_do_arquivo = f.read()
-                                
-                                print(f"[DEBUG_SUCCESS] Bytes lidos com sucesso. Tamanho: {len(bytes_do_arquivo)} bytes.") # LOG 2
-                                
-                                # --- SE SUCESSO, MOSTRA O BOTÃO ---
-                                st.download_button(
-                                    label="⬇️ Baixar FCS",
-                                    data=bytes_do_arquivo,
-                                    file_name=nome_arquivo,
-                                    mime="application/octet-stream",
-                                    key=f"dl_{id_animal}_{nome_arquivo}"
-                                )
-
-                            except Exception as e:
-                                # LOG 3: Captura o erro técnico exato (permissão, arquivo corrompido, etc.)
-                                print(f"[DEBUG_FAIL] Erro I/O FATAL: {e}") 
-                                st.error("Erro ao ler: (Detalhes no Terminal)")
-               
+                        # O arquivo só é lido quando o usuário clica no botão
+                        st.download_button(
+                            label="⬇️ Baixar FCS",
+                            data=partial(le_arquivo, caminho_absoluto),
+                            file_name=nome_arquivo,
+                            mime="application/octet-stream",
+                            key=f"dl_{id_animal}_{nome_arquivo}"
+                        )
                     else:
-                        # Esta linha não deve estar dando erro, mas é bom mantê-la.
-                        st.error("Arquivo não encontrado (Caminho inválido)")
-                        st.warning(f"DEBUG: Procurado em: {caminho_absoluto}")
-                    
-                with st.expander(f'Ver Detalhes e Metadados'):
-                    if caminho_absoluto.exists():
-                        dados_brutos = extrair_metadado(caminho_absoluto)
+                        st.error("Arquivo não encontrado no disco")
+                        st.caption(caminho_limpo)
 
-                        df_geral, df_canais, df_fluoroforos = formata_df(dados_brutos)
+                # Metadados só são carregados para a linha aberta
+                chave_linha = f"{id_animal}_{nome_arquivo}"
+                detalhes_abertos = st.session_state.get("linha_detalhes") == chave_linha
 
-                        if "Erro de Leitura" in df_geral.columns:
-                            st.error(f"ERRO: Não foi possível ler o arquivo. {df_geral['Erro de Leitura'].iloc[0]}")
+                with c5:
+                    st.button(
+                        "🔼 Ocultar" if detalhes_abertos else "🔎 Metadados",
+                        key=f"det_{chave_linha}",
+                        on_click=alterna_detalhes,
+                        args=(chave_linha,)
+                    )
+
+                if c6:
+                    previa = previas_pagina.get(caminho_limpo)
+                    with c6[0]:
+                        if previa is not None and previa["pares"]:
+                            st.image(imagem_densidade(previa["densidades"][0], ampliacao=2), width=64)
                         else:
-                            st.markdown("##### Informações Gerais:")
-                            # Transpõe o DF Geral (de 3 linhas para 3 colunas)
-                            st.dataframe(df_geral.set_index('Métrica').T, hide_index=True)
-
-                            col_canais, col_fluoros = st.columns(2)
-                            with col_canais:
-                                st.markdown("##### Canais Adquiridos:")
-                                st.dataframe(df_canais, hide_index=True, use_container_width=True)
-                        with col_fluoros:
-                            st.markdown("##### Fluoróforos/Marcadores:")
-                            st.dataframe(df_fluoroforos, hide_index=True, use_container_width=True)
-                    
-                    else:
-                        st.warning("Caminho do arquivo não é válido")
+                            st.caption("—")
+
+                if detalhes_abertos:
+                    with st.container(border=True):
+                        mostra_metadados(caminho_limpo, caminho_absoluto)
                 st.markdown("---")
         else:
             st.warning("Nenhum resultado encontrado no banco para este filtro.")
@@ -190,5 +514,11 @@ else:
     st.info("Selecione um Grupo para começar.")
 
 
-    
-    
\ No newline at end of file
+# --- 7. ESTADO DOS CACHES (no fim, para já contar as buscas desta execução) ---
+with st.sidebar.expander("⚙️ Cache"):
+    st.dataframe(contadores_caches(), hide_index=True, use_container_width=True)
+    if st.button("Limpar caches"):
+        limpa_caches(disco=True)
+        st.rerun()
+
+metricas.registra("pagina.repositorio", time.perf_counter() - inicio_pagina)
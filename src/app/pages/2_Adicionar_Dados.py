@@ -1,10 +1,128 @@
 # Em: src/app/pages/2_Adicionar_Dados.py
 import streamlit as st
+import sys
+import time
+from pathlib import Path
 
-st.set_page_config(page_title="Adicionar Dados", page_icon="➕")
+# pandas é importado só nos trechos que montam tabelas (ver 'benchmarks/importacao.py')
+
+# Tempo de execução da página (ver 'funcoes.metricas' e a página 'Desempenho')
+inicio_pagina = time.perf_counter()
+
+# Raiz 'src' (pages -> app -> src) no sys.path, como na página do repositório
+PASTA_SRC = Path(__file__).resolve().parent.parent.parent
+if str(PASTA_SRC) not in sys.path:
+    sys.path.append(str(PASTA_SRC))
+
+try:
+    from funcoes import metricas
+    from funcoes.registro import obter_registro
+    from etl.fila_ingestao import (
+        inicia_trabalhador, enfileira_uploads, progresso_fila, tarefas_recentes, reenfileira_erros
+    )
+except ImportError as e:
+    st.error(f"Erro ao importar a fila de ingestão: {e}")
+    st.stop()
+
+st.set_page_config(page_title="Adicionar Dados", page_icon="➕", layout="wide")
 
 st.title("Inserir Novos Experimentos")
-st.warning("⚠️ Esta funcionalidade ainda está em construção.")
 
-# (No futuro, colocaremos aqui os 'st.text_input', 'st.date_input'
-# e os botões que usam a função 'escrita()' do seu db_tools.py)
\ No newline at end of file
+# O trabalhador é único por processo e compartilhado por todas as sessões:
+# a página só grava os arquivos e enfileira; a leitura dos metadados e as
+# inserções no banco acontecem em segundo plano ('etl/fila_ingestao.py')
+trabalhador = inicia_trabalhador()
+
+# Intervalo (s) de atualização do painel de progresso
+INTERVALO_PAINEL = 2
+
+# --- 1. ENVIO DE ARQUIVOS ---
+registro = obter_registro()
+
+with st.form("form_envio", clear_on_submit=True):
+    col1, col2 = st.columns(2)
+    with col1:
+        grupo = st.selectbox("Selecione o Grupo:", sorted(registro.grupos_por_nome))
+    with col2:
+        ensaio = st.selectbox("Selecione o Ensaio:", sorted(registro.ensaios))
+
+    arquivos = st.file_uploader(
+        "Arquivos de resultado (.fcs)", type=["fcs"], accept_multiple_files=True
+    )
+    enviado = st.form_submit_button("Enviar para a fila de ingestão")
+
+if enviado:
+    if not arquivos:
+        st.warning("Nenhum arquivo selecionado.")
+    else:
+        with st.spinner(f"Gravando {len(arquivos)} arquivo(s) em data/raw..."):
+            resultado = enfileira_uploads(
+                ((arquivo.name, arquivo.getvalue()) for arquivo in arquivos), grupo, ensaio
+            )
+        if resultado["ids"]:
+            st.success(f"{len(resultado['ids'])} arquivo(s) na fila. A ingestão continua em segundo plano.")
+        if resultado["erros"]:
+            st.error(f"{len(resultado['erros'])} arquivo(s) recusado(s):")
+            import pandas as pd
+
+            st.dataframe(pd.DataFrame(resultado["erros"], columns=["Arquivo", "Erro"]), hide_index=True)
+
+st.divider()
+
+
+# --- 2. PROGRESSO DA FILA ---
+# Fragmento: só este trecho é reexecutado a cada INTERVALO_PAINEL segundos,
+# sem recarregar o formulário de envio
+@st.fragment(run_every=INTERVALO_PAINEL)
+def painel_progresso():
+    inicio_painel = time.perf_counter()
+    st.subheader("Fila de ingestão")
+
+    progresso = progresso_fila()
+    contadores = trabalhador.contadores()
+
+    col1, col2, col3, col4, col5 = st.columns(5)
+    col1.metric("Pendentes", progresso["pendente"])
+    col2.metric("Processando", progresso["processando"])
+    col3.metric("Concluídas", progresso["concluida"])
+    col4.metric("Com erro", progresso["erro"])
+    col5.metric("Vazão (arquivos/min)", progresso["arquivos_por_minuto"])
+
+    if progresso["lote_total"]:
+        st.progress(
+            progresso["lote_feitas"] / progresso["lote_total"],
+            text=f"Envio em andamento: {progresso['lote_feitas']} de {progresso['lote_total']} arquivos"
+        )
+    elif contadores["ativo"]:
+        st.caption("✅ Nenhuma tarefa pendente.")
+
+    if not contadores["ativo"]:
+        st.error("O trabalhador de ingestão não está rodando. Recarregue a página para reiniciá-lo.")
+
+    st.caption(
+        f"Trabalhador: {contadores['concluidas']} concluída(s), {contadores['erros']} com erro, "
+        f"{contadores['arquivos_por_segundo'] or 0} arquivos/s enquanto ocupado."
+    )
+
+    tarefas = tarefas_recentes()
+    if tarefas:
+        import pandas as pd
+
+        df_tarefas = pd.DataFrame(tarefas, columns=[
+            "Tarefa", "Arquivo", "Ensaio", "ID Animal", "Status",
+            "Tentativas", "Erro", "Criada em", "Concluída em"
+        ])
+        df_tarefas["ID Animal"] = df_tarefas["ID Animal"].astype("Int64")
+        st.dataframe(df_tarefas, use_container_width=True, hide_index=True)
+
+    if progresso["erro"] and st.button("🔁 Reenfileirar tarefas com erro"):
+        reenfileirados = reenfileira_erros()
+        trabalhador.avisa()
+        st.toast(f"{reenfileirados} tarefa(s) de volta à fila.")
+
+    metricas.registra("pagina.adicionar_dados.progresso", time.perf_counter() - inicio_painel)
+
+
+painel_progresso()
+
+metricas.registra("pagina.adicionar_dados", time.perf_counter() - inicio_pagina)
@@ -0,0 +1,178 @@
+import streamlit as st
+import sys
+import time
+from functools import partial
+from pathlib import Path
+
+# pandas é importado só nos trechos que montam tabelas (ver 'benchmarks/importacao.py')
+
+# Tempo de execução da página (ver 'funcoes.metricas' e a página 'Desempenho')
+inicio_pagina = time.perf_counter()
+
+# Raiz 'src' (pages -> app -> src) no sys.path, como na página do repositório
+PASTA_SRC = Path(__file__).resolve().parent.parent.parent
+if str(PASTA_SRC) not in sys.path:
+    sys.path.append(str(PASTA_SRC))
+
+try:
+    from funcoes import db_tools, metricas
+    from database_setup.create_schema import create_database_schema
+    from funcoes.busca import FACETAS, COLUNAS_RESULTADO, busca_experimentos, facetas, sincroniza_busca
+    from funcoes.comparacao import converte_data
+    from funcoes.downloads import le_arquivo, zip_para_download
+    from funcoes.cache import cache_por_geracao
+except ImportError as e:
+    st.error(f"Erro ao importar a busca: {e}")
+    st.stop()
+
+st.set_page_config(page_title="Busca de Experimentos", page_icon="🔎", layout="wide")
+st.title("🔎 Busca de Experimentos")
+
+# Opções de tamanho de página da lista de resultados
+OPCOES_ITENS_POR_PAGINA = [25, 50, 100, 250]
+
+# Rótulos das colunas de 'COLUNAS_RESULTADO' na tabela
+ROTULOS_RESULTADO = {
+    "nome_grupo": "Grupo",
+    "tipo_ensaio": "Ensaio",
+    "id_animal": "ID Animal",
+    "condicao": "Condição",
+    "nome_arquivo": "Nome do Arquivo",
+    "citometro": "Citômetro",
+    "amostra": "Amostra",
+    "data_aquisicao": "Data de aquisição",
+}
+
+
+@st.cache_resource
+def garante_esquema():
+    """
+    Cria as tabelas, o índice de busca e os gatilhos que faltarem (uma vez por
+    processo), para a página funcionar também com bancos criados por versões antigas.
+    """
+    create_database_schema(db_tools.db_path)
+
+garante_esquema()
+
+# Documentos de resultados gravados por fora do ETL (ou antes do índice
+# existir); quando já está tudo em dia, custa só duas contagens
+sincroniza_busca()
+
+
+# Os filtros vão como tuplas (coluna, (valores...)) para servirem de chave dos caches
+@cache_por_geracao("busca", max_itens=256)
+def buscar(texto, filtros, limite, deslocamento):
+    return busca_experimentos(texto, dict(filtros), limite, deslocamento)
+
+@cache_por_geracao("facetas", max_itens=256)
+def buscar_facetas(texto, filtros):
+    return facetas(texto, dict(filtros))
+
+
+def ordena_opcoes(coluna, contagens, selecionados):
+    """
+    Opções de uma faceta: as datas em ordem cronológica, as demais da mais
+    frequente para a menos. Valores já selecionados que sumiram da contagem
+    continuam na lista (com 0), para o filtro não se perder.
+
+    Retorna:
+        dict: valor -> quantidade
+    """
+    opcoes = dict(contagens)
+    for valor in selecionados:
+        opcoes.setdefault(valor, 0)
+    if coluna == "data_aquisicao":
+        return dict(sorted(opcoes.items(), key=lambda item: (converte_data(item[0]) is None, converte_data(item[0]) or 0)))
+    return opcoes
+
+
+# --- 1. TEXTO E FACETAS ---
+texto = st.text_input(
+    "Buscar por nome do arquivo, amostra ($TBNM), condição, citômetro, ID do animal, grupo ou ensaio:",
+    placeholder="ex.: bcg 31, cytoflex, estimulo"
+)
+
+# As contagens de cada faceta levam em conta o texto e os filtros das outras:
+# os filtros atuais são lidos do estado dos widgets antes de desenhá-los
+filtros = tuple(
+    (coluna, tuple(st.session_state.get(f"faceta_{coluna}", [])))
+    for coluna in FACETAS
+)
+contagens = buscar_facetas(texto, filtros)
+
+st.sidebar.header("Facetas")
+for coluna, rotulo in FACETAS.items():
+    opcoes = ordena_opcoes(coluna, contagens[coluna], dict(filtros)[coluna])
+    st.sidebar.multiselect(
+        f"{rotulo}:",
+        list(opcoes),
+        format_func=lambda valor, opcoes=opcoes: f"{'(sem valor)' if valor is None else valor} ({opcoes[valor]})",
+        key=f"faceta_{coluna}"
+    )
+itens_por_pagina = st.sidebar.selectbox("Itens por página:", OPCOES_ITENS_POR_PAGINA, index=1)
+
+# --- 2. RESULTADOS ---
+total_resultados, _ = buscar(texto, filtros, 0, 0)
+total_paginas = max(1, -(-total_resultados // itens_por_pagina))
+
+col_info, col_pagina = st.columns([3, 1])
+with col_pagina:
+    pagina = st.number_input(
+        f"Página (de {total_paginas}):",
+        min_value=1,
+        max_value=total_paginas,
+        value=1,
+        key=f"pagina_busca_{texto}_{filtros}_{itens_por_pagina}"
+    )
+deslocamento = (pagina - 1) * itens_por_pagina
+with col_info:
+    st.caption(
+        f"{total_resultados} resultado(s) — mostrando "
+        f"{min(deslocamento + 1, total_resultados)}–{min(deslocamento + itens_por_pagina, total_resultados)}"
+    )
+
+_, resultados = buscar(texto, filtros, itens_por_pagina, deslocamento)
+
+if not resultados:
+    st.warning("Nenhum resultado encontrado para esta busca.")
+else:
+    import pandas as pd
+
+    df_pagina = pd.DataFrame(resultados, columns=COLUNAS_RESULTADO)
+    evento = st.dataframe(
+        df_pagina[list(ROTULOS_RESULTADO)].rename(columns=ROTULOS_RESULTADO).fillna("N/A"),
+        hide_index=True,
+        use_container_width=True,
+        on_select="rerun",
+        selection_mode="multi-row",
+        key=f"tabela_busca_{texto}_{filtros}_{pagina}_{itens_por_pagina}"
+    )
+    selecionados = df_pagina.iloc[evento.selection.rows]
+
+    # --- 3. DOWNLOAD ---
+    if selecionados.empty:
+        st.info("Selecione uma ou mais linhas para baixar os arquivos.")
+    elif len(selecionados) == 1:
+        caminho = selecionados.iloc[0]["arquivo_de_resultado"]
+        caminho_absoluto = PASTA_SRC.parent / caminho if caminho else None
+        if caminho_absoluto and caminho_absoluto.exists():
+            st.download_button(
+                label="⬇️ Baixar FCS",
+                data=partial(le_arquivo, caminho_absoluto),
+                file_name=caminho_absoluto.name,
+                mime="application/octet-stream",
+                key=f"dl_busca_{selecionados.iloc[0]['id_experimento']}"
+            )
+        else:
+            st.error(f"Arquivo não encontrado no disco: {caminho}")
+    else:
+        caminhos_zip = [PASTA_SRC.parent / caminho for caminho in selecionados["arquivo_de_resultado"].dropna()]
+        st.download_button(
+            label=f"📦 Baixar {len(caminhos_zip)} arquivo(s) em ZIP",
+            data=partial(zip_para_download, caminhos_zip),
+            file_name="busca.zip",
+            mime="application/zip",
+            key="dl_zip_busca"
+        )
+
+metricas.registra("pagina.busca", time.perf_counter() - inicio_pagina)
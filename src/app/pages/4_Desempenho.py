@@ -0,0 +1,119 @@
+import streamlit as st
+import json
+import sys
+import time
+from pathlib import Path
+
+# pandas é importado só nos trechos que montam tabelas (ver 'benchmarks/importacao.py')
+
+# Tempo de execução da página (ver 'funcoes.metricas')
+inicio_pagina = time.perf_counter()
+
+# Raiz 'src' (pages -> app -> src) no sys.path, como na página do repositório
+PASTA_SRC = Path(__file__).resolve().parent.parent.parent
+if str(PASTA_SRC) not in sys.path:
+    sys.path.append(str(PASTA_SRC))
+
+try:
+    from funcoes import metricas
+    from funcoes.cache import contadores_caches
+except ImportError as e:
+    st.error(f"Erro ao importar as métricas: {e}")
+    st.stop()
+
+st.set_page_config(page_title="Desempenho", page_icon="⏱️", layout="wide")
+st.title("⏱️ Desempenho")
+st.caption(
+    "Métricas deste processo do app desde que ele foi iniciado (ou desde a última vez "
+    "que foram zeradas). Percentis e histogramas usam as últimas "
+    f"{metricas.TAMANHO_JANELA} medidas de cada operação."
+)
+
+# Colunas das tabelas de resumo ('SerieMetricas.resumo') -> rótulos
+ROTULOS_RESUMO = {
+    "operacao": "Operação",
+    "sql": "Consulta",
+    "chamadas": "Chamadas",
+    "erros": "Erros",
+    "media_ms": "Média (ms)",
+    "p50_ms": "p50 (ms)",
+    "p95_ms": "p95 (ms)",
+    "p99_ms": "p99 (ms)",
+    "maximo_ms": "Máximo (ms)",
+    "total_s": "Total (s)",
+    "linhas": "Linhas",
+    "bytes": "Bytes lidos",
+}
+
+# Consultas distintas mostradas na tabela (as que mais tempo consumiram)
+CONSULTAS_NA_TABELA = 50
+
+# --- 1. CONTROLES ---
+st.sidebar.header("Controles")
+metricas.limite_consulta_lenta_ms = st.sidebar.number_input(
+    "Consulta lenta a partir de (ms):",
+    min_value=1.0,
+    value=float(metricas.limite_consulta_lenta_ms),
+    step=10.0
+)
+if st.sidebar.button("🔄 Atualizar"):
+    st.rerun()
+if st.sidebar.button("🗑️ Zerar métricas"):
+    metricas.limpa()
+    st.rerun()
+st.sidebar.download_button(
+    "⬇️ Baixar métricas (JSON)",
+    data=lambda: json.dumps(metricas.exporta(), ensure_ascii=False, indent=2),
+    file_name=f"metricas_{time.strftime('%Y%m%d_%H%M%S')}.json",
+    mime="application/json"
+)
+
+# --- 2. OPERAÇÕES ---
+st.subheader("Operações")
+operacoes = metricas.resumo_operacoes()
+if not operacoes:
+    st.info("Nenhuma operação medida ainda. Use as outras páginas e volte aqui.")
+else:
+    import pandas as pd
+
+    df_operacoes = pd.DataFrame(operacoes).rename(columns=ROTULOS_RESUMO)
+    st.dataframe(df_operacoes, hide_index=True, use_container_width=True)
+
+    operacao_sel = st.selectbox("Histograma de latência:", [resumo["operacao"] for resumo in operacoes])
+    df_histograma = pd.DataFrame(metricas.histograma(operacao_sel), columns=["Faixa", "Medidas"])
+    # Faixas na ordem dos limites (e não em ordem alfabética)
+    st.bar_chart(df_histograma, x="Faixa", y="Medidas", sort=False)
+
+# --- 3. CONSULTAS AO BANCO ---
+st.subheader("Consultas ao banco")
+consultas = metricas.resumo_consultas()
+if consultas:
+    import pandas as pd
+
+    st.dataframe(
+        pd.DataFrame(consultas[:CONSULTAS_NA_TABELA]).drop(columns="bytes").rename(columns=ROTULOS_RESUMO),
+        hide_index=True,
+        use_container_width=True
+    )
+    if len(consultas) > CONSULTAS_NA_TABELA:
+        st.caption(f"Mostrando as {CONSULTAS_NA_TABELA} de {len(consultas)} consultas que mais tempo consumiram.")
+else:
+    st.caption("Nenhuma consulta medida ainda.")
+
+# --- 4. CONSULTAS LENTAS ---
+st.subheader("Consultas lentas")
+lentas = metricas.consultas_lentas()
+if not lentas:
+    st.caption(f"Nenhuma consulta passou de {metricas.limite_consulta_lenta_ms:g} ms.")
+for lenta in lentas:
+    with st.expander(f"{lenta['instante']} · {lenta['duracao_ms']:.1f} ms · {lenta['linhas']} linha(s) · {lenta['sql'][:100]}"):
+        st.code(lenta["sql"], language="sql")
+        st.caption(f"Parâmetros: {lenta['parametros']}")
+        st.markdown("Plano de execução (EXPLAIN QUERY PLAN):")
+        st.code(lenta["plano"], language="text")
+
+# --- 5. CACHES ---
+st.subheader("Caches")
+st.dataframe(contadores_caches(), hide_index=True, use_container_width=True)
+
+metricas.registra("pagina.desempenho", time.perf_counter() - inicio_pagina)
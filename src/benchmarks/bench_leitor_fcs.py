@@ -0,0 +1,66 @@
+"""
+Compara o tempo de leitura de metadados do leitor leve ('funcoes.leitor_fcs')
+com o caminho antigo via 'flowio'.
+
+Uso (a partir da pasta 'src'):
+    python -m benchmarks.bench_leitor_fcs [pasta_com_fcs] [--repeticoes N]
+"""
+import argparse
+import statistics
+import time
+from pathlib import Path
+from funcoes.leitor_fcs import le_metadado_fcs
+from funcoes.metadados import _le_metadado_flowio
+
+dir_base = Path(__file__).resolve().parent.parent.parent
+
+
+def mede(funcao, caminhos: list[Path], repeticoes: int) -> list[float]:
+    """
+    Executa 'funcao' sobre todos os arquivos 'repeticoes' vezes.
+    Retorna o tempo (s) de cada repetição.
+    """
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        for caminho in caminhos:
+            funcao(caminho)
+        tempos.append(time.perf_counter() - inicio)
+    return tempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pasta", nargs="?", default=dir_base / "data" / "raw", type=Path)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    caminhos = sorted(args.pasta.glob("**/*.fcs"))
+    if not caminhos:
+        print(f"Nenhum arquivo .fcs encontrado em {args.pasta}")
+        return
+
+    tamanho_total = sum(caminho.stat().st_size for caminho in caminhos)
+    print(f"{len(caminhos)} arquivos ({tamanho_total / 1024**2:.1f} MiB) em {args.pasta}")
+
+    # Confere que os dois caminhos devolvem exatamente o mesmo dicionário
+    divergentes = [c for c in caminhos if le_metadado_fcs(c) != _le_metadado_flowio(c)]
+    if divergentes:
+        print(f"[AVISO] {len(divergentes)} arquivos com resultado diferente do flowio, ex: {divergentes[0]}")
+
+    resultados = {
+        "flowio": mede(_le_metadado_flowio, caminhos, args.repeticoes),
+        "leitor_fcs": mede(le_metadado_fcs, caminhos, args.repeticoes),
+    }
+
+    print("-" * 50)
+    for nome, tempos in resultados.items():
+        mediana = statistics.median(tempos)
+        print(f"{nome:>12}: {mediana * 1000:8.1f} ms por lote | {mediana / len(caminhos) * 1e6:8.1f} µs por arquivo")
+
+    ganho = statistics.median(resultados["flowio"]) / statistics.median(resultados["leitor_fcs"])
+    print(f"Ganho do leitor leve: {ganho:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Compara a geração do manifesto do ETL antigo ('pega_arquivos': um glob
+recursivo por pasta de ensaio, em série, regex recompilada por arquivo e
+CSV gravado via DataFrame) com o scanner paralelo ('etl.varredura') que
+grava o CSV em fluxo, em uma árvore sintética.
+
+A árvore é criada em uma pasta temporária com arquivos .fcs vazios (só os
+nomes importam) e apagada no final.
+
+Uso (a partir da pasta 'src'):
+    python -m benchmarks.bench_varredura [--arquivos 100000] [--workers N] [--repeticoes N]
+"""
+import argparse
+import contextlib
+import io
+import re
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+import pandas as pd
+from etl.mapeamento import gera_mapeamento
+from funcoes.pega_arquivos import pega_arquivos
+from funcoes.registro import Registro
+
+# Grupos/ensaios padrão do esquema, sem depender do banco
+REGISTRO = Registro.padrao()
+
+# Subpastas por pasta de ensaio (simula experimentos organizados por data)
+SUBPASTAS_POR_ENSAIO = 20
+
+
+def cria_arvore(raiz: Path, total_arquivos: int) -> int:
+    """
+    Cria data/raw/grupo_<letra>/<ensaio>/<subpasta>/<arquivo>.fcs com
+    'total_arquivos' arquivos distribuídos igualmente entre as pastas.
+
+    Retorna:
+        int: Quantidade de arquivos criados.
+    """
+    pastas = [
+        (REGISTRO.faixas_do_grupo(id_grupo)[0], raiz / "data" / "raw" / f"grupo_{codigo}" / ensaio / f"exp_{i:03d}")
+        for codigo, (id_grupo, _) in REGISTRO.grupos_por_codigo.items()
+        for ensaio in REGISTRO.ensaios
+        for i in range(SUBPASTAS_POR_ENSAIO)
+    ]
+
+    criados = 0
+    for indice, ((inicio, fim), pasta) in enumerate(pastas):
+        pasta.mkdir(parents=True, exist_ok=True)
+        quantidade = total_arquivos // len(pastas) + (1 if indice < total_arquivos % len(pastas) else 0)
+        for n in range(quantidade):
+            (pasta / f"AMOSTRA {inicio + n % (fim - inicio + 1)} tubo {n}.fcs").touch()
+            criados += 1
+    return criados
+
+
+def _id_animal_antigo(arquivo: str, range_valido: tuple[int, int]) -> int:
+    """
+    'descobre_id_animal' como era antes (regex compilada a cada chamada).
+    """
+    numeros = [int(s) for s in re.findall(r"\d+", arquivo)]
+    for num in numeros:
+        if range_valido[0] <= num <= range_valido[1]:
+            return int(num)
+    return None
+
+
+def manifesto_antigo(dir_base: Path, destino: Path) -> int:
+    """
+    Caminho antigo: 'pega_arquivos' por grupo (glob recursivo em série),
+    todas as linhas acumuladas e gravadas com o pandas.
+    """
+    lista_para_csv = []
+    with contextlib.redirect_stdout(io.StringIO()):  # 'pega_arquivos' imprime por pasta
+        for codigo, (id_grupo, nome_grupo) in REGISTRO.grupos_por_codigo.items():
+            faixa = REGISTRO.faixas_do_grupo(id_grupo)[0]
+            for tipo_ensaio, detalhes in pega_arquivos(codigo, dir_base, list(REGISTRO.ensaios)).items():
+                for arquivo_path in detalhes['lista_arquivos']:
+                    id_animal = _id_animal_antigo(arquivo_path.name, faixa)
+                    lista_para_csv.append([nome_grupo, tipo_ensaio, id_animal, str(arquivo_path.relative_to(dir_base))])
+
+    df = pd.DataFrame(lista_para_csv, columns=["nome_grupo", "tipo_ensaio", "id_animal", "caminho_arquivo"])
+    df['id_animal'] = df['id_animal'].astype('Int64')
+    df.to_csv(destino, index=False)
+    return len(df)
+
+
+def manifesto_novo(dir_base: Path, destino: Path, max_workers: int = None) -> int:
+    """
+    Caminho novo: uma passada com 'os.scandir' em um pool de threads e CSV em fluxo.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        return gera_mapeamento(dir_base, destino, max_workers, registro=REGISTRO)
+
+
+def mede(funcao, repeticoes: int) -> tuple[list[float], int]:
+    """
+    Executa 'funcao' 'repeticoes' vezes. Retorna os tempos (s) e o último resultado.
+    """
+    tempos, resultado = [], None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return tempos, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--arquivos", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    raiz = Path(tempfile.mkdtemp(prefix="bench_varredura_"))
+    try:
+        inicio = time.perf_counter()
+        criados = cria_arvore(raiz, args.arquivos)
+        print(f"Árvore sintética com {criados} arquivos criada em {time.perf_counter() - inicio:.1f} s ({raiz})")
+
+        resultados = {
+            "antigo": mede(lambda: manifesto_antigo(raiz, raiz / "antigo.csv"), args.repeticoes),
+            "varredura": mede(lambda: manifesto_novo(raiz, raiz / "novo.csv", args.workers), args.repeticoes),
+        }
+
+        contagens = {nome: total for nome, (_, total) in resultados.items()}
+        if len(set(contagens.values())) != 1:
+            print(f"[AVISO] Quantidade de arquivos diferente entre os caminhos: {contagens}")
+
+        print("-" * 50)
+        for nome, (tempos, total) in resultados.items():
+            mediana = statistics.median(tempos)
+            print(f"{nome:>10}: {mediana:7.3f} s | {total / mediana:12,.0f} arquivos/s")
+
+        # Os dois manifestos precisam ter as mesmas linhas (a ordem pode mudar)
+        linhas_antigas = sorted(open(raiz / "antigo.csv", encoding="utf-8").read().splitlines())
+        linhas_novas = sorted(open(raiz / "novo.csv", encoding="utf-8").read().splitlines())
+        if linhas_antigas != linhas_novas:
+            print("[AVISO] Os manifestos gerados são diferentes")
+
+        ganho = statistics.median(resultados["antigo"][0]) / statistics.median(resultados["varredura"][0])
+        print(f"Ganho: {ganho:.1f}x")
+    finally:
+        shutil.rmtree(raiz, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Gera arquivos FCS 3.1 sintéticos (HEADER + TEXT + DATA em float32) e árvores
+data/raw/grupo_<código>/<ensaio>/<subpasta>/*.fcs no formato do projeto,
+para benchmarks e testes que não podem depender dos dados reais.
+
+Os arquivos usam os mesmos painéis do citômetro dos dados de exemplo
+(CytoFLEX LX), com FSC/SSC/Time, e passam pelo 'leitor_fcs', 'flowio' e
+'eventos_fcs'. A geração é determinística (semente fixa).
+"""
+import numpy as np
+from pathlib import Path
+
+# Painéis de canais ($PnN, $PnS) usados nos arquivos sintéticos
+CANAIS_DISPERSAO = [("FSC-A", "FSC-A"), ("FSC-H", "FSC-H"), ("SSC-A", "SSC-A"), ("SSC-H", "SSC-H")]
+PAINEIS = [
+    CANAIS_DISPERSAO + [
+        ("FL1-A", "B525-FITC-A"), ("FL4-A", "Y585-PE-A"), ("FL9-A", "R660-APC-A"),
+        ("FL10-A", "R712-APCA700-A"), ("FL13-A", "V450-PB-A"), ("FL14-A", "V525-KrO-A"),
+    ] + [("Time", "Time")],
+    CANAIS_DISPERSAO + [
+        ("FL1-A", "B525-FITC-A"), ("FL2-A", "B610-ECD-A"), ("FL3-A", "B690-PC5.5-A"),
+        ("FL4-A", "Y585-PE-A"), ("FL6-A", "Y675-PC5-A"), ("FL8-A", "Y763-PC7-A"),
+        ("FL9-A", "R660-APC-A"), ("FL11-A", "R763-APCA750-A"), ("FL13-A", "V450-PB-A"),
+    ] + [("Time", "Time")],
+]
+
+DATAS = ["22-Nov-2024", "28-Nov-2024", "30-Nov-2024", "01-Dec-2024"]
+
+# Arquivos distintos gerados por árvore: os demais são cópias deles (só o
+# nome muda), então criar 100 mil arquivos custa só a escrita em disco
+MODELOS_POR_ARVORE = 16
+
+# Subpastas por pasta de ensaio (simula experimentos organizados por data)
+SUBPASTAS_POR_ENSAIO = 10
+
+
+def monta_fcs(canais: list[tuple[str, str]], eventos: int, data: str = DATAS[0],
+              citometro: str = "CytoFLEX LX", amostra: str = "sintetico",
+              ordem_bytes: str = "<", semente: int = 0) -> bytes:
+    """
+    Monta o conteúdo de um arquivo FCS 3.1 em modo lista ($MODE L) com
+    valores float32 ($DATATYPE F).
+
+    Argumentos:
+        canais (list): (pnn, pns) de cada parâmetro.
+        eventos (int): Quantidade de eventos ($TOT).
+        ordem_bytes (str): '<' (little-endian, $BYTEORD 1,2,3,4) ou '>' (4,3,2,1).
+
+    Retorna:
+        bytes: O arquivo completo.
+    """
+    gerador = np.random.default_rng(semente)
+    dados = gerador.lognormal(mean=8.0, sigma=1.0, size=(eventos, len(canais))).astype(ordem_bytes + "f4")
+    bytes_dados = dados.tobytes()
+
+    chaves = {
+        "$BYTEORD": "1,2,3,4" if ordem_bytes == "<" else "4,3,2,1",
+        "$DATATYPE": "F",
+        "$MODE": "L",
+        "$NEXTDATA": "0",
+        "$PAR": str(len(canais)),
+        "$TOT": str(eventos),
+        "$DATE": data,
+        "$CYT": citometro,
+        "$TBNM": amostra,
+        "$BEGINANALYSIS": "0",
+        "$ENDANALYSIS": "0",
+        "$BEGINSTEXT": "0",
+        "$ENDSTEXT": "0",
+    }
+    for numero, (pnn, pns) in enumerate(canais, start=1):
+        chaves[f"$P{numero}N"] = pnn
+        chaves[f"$P{numero}S"] = pns
+        chaves[f"$P{numero}B"] = "32"
+        chaves[f"$P{numero}E"] = "0,0"
+        chaves[f"$P{numero}R"] = "262144"
+
+    # Os offsets de DATA ficam dentro do próprio TEXT: com largura fixa, o
+    # tamanho do TEXT não depende do valor deles
+    inicio_texto = 256
+    chaves["$BEGINDATA"] = chaves["$ENDDATA"] = "0" * 12
+    tamanho_texto = len(("/" + "".join(f"{k}/{v}/" for k, v in chaves.items())).encode("utf-8"))
+    fim_texto = inicio_texto + tamanho_texto - 1
+    inicio_dados = fim_texto + 1
+    fim_dados = inicio_dados + len(bytes_dados) - 1
+    chaves["$BEGINDATA"] = f"{inicio_dados:012d}"
+    chaves["$ENDDATA"] = f"{fim_dados:012d}"
+    texto = ("/" + "".join(f"{k}/{v}/" for k, v in chaves.items())).encode("utf-8")
+
+    # Acima de 99.999.999 bytes o HEADER leva 0 e vale o que está no TEXT
+    cabe = fim_dados <= 99_999_999
+    header = b"FCS3.1    " + b"".join(
+        f"{valor:>8}".encode("ascii")
+        for valor in (inicio_texto, fim_texto, inicio_dados if cabe else 0, fim_dados if cabe else 0, 0, 0)
+    )
+    return header.ljust(inicio_texto, b" ") + texto + bytes_dados
+
+
+def cria_arvore_fcs(raiz: Path, total_arquivos: int, registro, eventos: int = 2000, semente: int = 0) -> list[Path]:
+    """
+    Cria 'total_arquivos' arquivos FCS sintéticos em
+    raiz/data/raw/grupo_<código>/<ensaio>/exp_<n>/, distribuídos igualmente
+    entre os grupos e ensaios do 'registro' ('funcoes.registro.Registro').
+    Os nomes seguem o padrão dos dados reais ('<ENSAIO> <condição> <id do animal>.fcs').
+
+    Retorna:
+        list[Path]: Os arquivos criados.
+    """
+    modelos = [
+        monta_fcs(
+            PAINEIS[i % len(PAINEIS)], eventos, data=DATAS[i % len(DATAS)],
+            amostra=f"modelo {i}", ordem_bytes="<" if i % 2 == 0 else ">", semente=semente + i
+        )
+        for i in range(MODELOS_POR_ARVORE)
+    ]
+
+    pastas = [
+        (id_grupo, ensaio, raiz / "data" / "raw" / f"grupo_{codigo}" / ensaio / f"exp_{i:03d}")
+        for codigo, (id_grupo, _) in sorted(registro.grupos_por_codigo.items())
+        for ensaio in sorted(registro.ensaios)
+        for i in range(SUBPASTAS_POR_ENSAIO)
+    ]
+
+    criados = []
+    for indice, (id_grupo, ensaio, pasta) in enumerate(pastas):
+        pasta.mkdir(parents=True, exist_ok=True)
+        inicio, fim = registro.faixas_do_grupo(id_grupo)[0]
+        quantidade = total_arquivos // len(pastas) + (1 if indice < total_arquivos % len(pastas) else 0)
+        for n in range(quantidade):
+            id_animal = inicio + n % (fim - inicio + 1)
+            caminho = pasta / f"{ensaio[:3].upper()} COND{n % 7} {id_animal} r{n}.fcs"
+            caminho.write_bytes(modelos[(indice + n) % len(modelos)])
+            criados.append(caminho)
+    return criados
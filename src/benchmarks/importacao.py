@@ -0,0 +1,325 @@
+"""
+Orçamento de importação dos módulos do projeto e tempo de subida do app.
+
+Cada módulo de 'funcoes', 'etl' e 'database_setup' é importado sozinho em um
+processo novo, com 'python -X importtime'. As páginas do app ('app/pages')
+não são módulos importáveis: delas são rodados só os imports do nível do
+arquivo (inclusive os de dentro de 'try'), com o Streamlit já carregado
+(o custo dele é o mesmo para todas e fica fora do orçamento). O script confere:
+    tempo      tempo cumulativo da importação (linha do próprio módulo no
+               -X importtime, ou o tempo dos imports da página, mediana das
+               repetições), que não pode passar de
+               ORCAMENTO_IMPORTACAO_MS (só o NumPy já leva ~80 ms; o pandas
+               sozinho, ~450 ms)
+    E/S        nada de abrir arquivos que não sejam código, conectar no banco,
+               criar/apagar pastas e arquivos, abrir processos ou conexões de
+               rede, nem escrever na saída padrão durante a importação
+               (vigiado com um audit hook, ver 'sys.addaudithook')
+    pesadas    quais dependências pesadas (pandas, pyarrow, ...) a importação
+               carregou; só as de DEPENDENCIAS_PERMITIDAS podem vir junto
+               (nas páginas, o pandas só pode ser importado nos trechos que
+               montam tabelas)
+
+Com '--app', também sobe o app pelo ponto de entrada ('python -m app') em
+uma porta livre e mede quanto tempo o servidor leva para responder no
+'/_stcore/health', que não pode passar de LIMITE_INICIO_APP_S.
+
+Uso (a partir da pasta 'src'):
+    python -m benchmarks.importacao [--app] [--repeticoes 3] [--orcamento-ms 200]
+                                    [--limite-app-s 5] [--saida resultado.json]
+
+Sai com código 1 se algum módulo estourar o orçamento ou fizer E/S na importação.
+"""
+import argparse
+import ast
+import json
+import os
+import pkgutil
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from functools import partial
+from pathlib import Path
+
+dir_src = Path(__file__).resolve().parent.parent
+
+# Pacotes cujos módulos são verificados
+PACOTES = ("funcoes", "etl", "database_setup")
+
+# Pasta das páginas do app (verificadas pelos imports do nível do arquivo)
+dir_paginas = dir_src / "app" / "pages"
+
+# Tempo máximo (ms) da importação de cada módulo, já contando as dependências
+ORCAMENTO_IMPORTACAO_MS = 200
+
+# Tempo máximo (s) entre 'python -m app' e o servidor responder
+LIMITE_INICIO_APP_S = 5.0
+
+# Dependências de terceiros que custam caro para importar; só devem ser
+# carregadas na primeira vez que uma função precisar delas
+DEPENDENCIAS_PESADAS = ("pandas", "pyarrow", "flowio", "PIL", "streamlit", "numpy")
+
+# NumPy é a base da leitura dos eventos ('EventosFCS') e das prévias: os
+# módulos que trabalham com a matriz de eventos podem carregá-lo
+DEPENDENCIAS_PERMITIDAS = {"numpy"}
+
+# Eventos do audit hook que indicam E/S na importação
+EVENTOS_PROIBIDOS = (
+    "sqlite3.connect", "os.mkdir", "os.remove", "os.rename", "os.rmdir",
+    "shutil.rmtree", "subprocess.Popen", "socket.connect", "urllib.Request",
+)
+
+# Arquivos do projeto que o Python abre para importar módulos (não contam como
+# E/S; fora do projeto só a escrita conta)
+SUFIXOS_CODIGO = (".py", ".pyc", ".so", ".pyd", ".pth", ".typed")
+
+# Preparo dos processos filhos das páginas: o Streamlit já carregado
+PREPARO_PAGINA = "import streamlit"
+
+# Código que mede (em ms) os imports de uma página, depois do preparo
+CODIGO_TEMPO_PAGINA = """
+{preparo}
+import time
+inicio = time.perf_counter()
+{codigo}
+print((time.perf_counter() - inicio) * 1000)
+"""
+
+REGEX_IMPORTTIME = re.compile(r"^import time:\s*(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)")
+
+# Código rodado no processo filho: roda o 'preparo' (fora da vigilância),
+# importa o módulo com o audit hook ligado e imprime (em JSON, na última
+# linha) o que foi observado
+CODIGO_FILHO = """
+{preparo}
+import io, json, os, sys
+PROJETO, SUFIXOS, PROIBIDOS = {projeto!r}, {sufixos!r}, {proibidos!r}
+ja_carregadas = set(sys.modules)
+ocorrencias = []
+
+def vigia(evento, argumentos):
+    if evento == "open" and isinstance(argumentos[0], (str, bytes, os.PathLike)):
+        caminho, modo = os.fsdecode(argumentos[0]), argumentos[1]
+        escrita = isinstance(modo, str) and any(c in modo for c in "wax+")
+        dados_do_projeto = caminho.startswith(PROJETO) and not caminho.endswith(SUFIXOS)
+        if escrita or dados_do_projeto:
+            ocorrencias.append(f"open {{caminho}} ({{modo}})")
+    elif evento in PROIBIDOS:
+        ocorrencias.append(f"{{evento}} {{argumentos[0] if argumentos else ''}}")
+
+saida_original, sys.stdout = sys.stdout, io.StringIO()
+sys.addaudithook(vigia)
+{codigo}
+impresso, sys.stdout = sys.stdout.getvalue(), saida_original
+carregadas = [nome for nome in {pesadas!r} if nome in sys.modules and nome not in ja_carregadas]
+print(json.dumps({{"ocorrencias": ocorrencias, "impresso": impresso, "carregadas": carregadas}}))
+"""
+
+
+def lista_modulos() -> list[str]:
+    """
+    Módulos dos pacotes em PACOTES, encontrados sem importá-los.
+    """
+    modulos = []
+    for pacote in PACOTES:
+        for info in pkgutil.iter_modules([str(dir_src / pacote)]):
+            if not info.ispkg:
+                modulos.append(f"{pacote}.{info.name}")
+    return sorted(modulos)
+
+
+def lista_paginas() -> list[Path]:
+    """
+    Scripts das páginas do app.
+    """
+    return sorted(dir_paginas.glob("*.py"))
+
+
+def importacoes_da_pagina(pagina: Path) -> str:
+    """
+    Código com só os imports do nível do arquivo da página (os de dentro de
+    um 'try' no nível do arquivo também contam).
+    """
+    arvore = ast.parse(pagina.read_text(encoding="utf-8"))
+    importacoes = []
+    for no in arvore.body:
+        corpo = no.body if isinstance(no, ast.Try) else [no]
+        importacoes += [ast.unparse(i) for i in corpo if isinstance(i, (ast.Import, ast.ImportFrom))]
+    return "\n".join(importacoes)
+
+
+def tempo_importacao_pagina(pagina: Path) -> float:
+    """
+    Tempo (ms) dos imports de uma página em um processo novo com o Streamlit
+    já carregado (None se a importação falhou).
+    """
+    codigo = CODIGO_TEMPO_PAGINA.format(preparo=PREPARO_PAGINA, codigo=importacoes_da_pagina(pagina))
+    processo = subprocess.run(
+        [sys.executable, "-c", codigo],
+        cwd=dir_src, env={**os.environ, "PYTHONPATH": str(dir_src)}, capture_output=True, text=True, timeout=120
+    )
+    return float(processo.stdout.strip().splitlines()[-1]) if processo.returncode == 0 else None
+
+
+def _tempo_importtime(saida_erro: str, modulo: str) -> float:
+    """
+    Tempo cumulativo (ms) do módulo na saída do -X importtime.
+    """
+    for linha in saida_erro.splitlines():
+        achado = REGEX_IMPORTTIME.match(linha)
+        if achado and achado.group(4) == modulo:
+            return int(achado.group(2)) / 1000
+    return None
+
+
+def tempo_importacao(modulo: str) -> float:
+    """
+    Tempo cumulativo (ms) da importação de 'modulo' em um processo novo,
+    lido do -X importtime (None se a importação falhou).
+    """
+    processo = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=dir_src, env={**os.environ, "PYTHONPATH": str(dir_src)}, capture_output=True, text=True, timeout=120
+    )
+    return _tempo_importtime(processo.stderr, modulo) if processo.returncode == 0 else None
+
+
+def vigia_importacao(modulo: str, codigo: str = None, preparo: str = "") -> dict[str, any]:
+    """
+    Importa 'modulo' em um processo novo com o audit hook ligado (em um
+    processo à parte do que mede o tempo, já que o hook deixa tudo mais lento).
+    Com 'codigo', roda esse código no lugar do 'import modulo' (usado nas
+    páginas, depois do 'preparo').
+
+    Retorna:
+        dict: 'ocorrencias' (E/S observada), 'impresso' (texto escrito na
+              saída padrão) e 'carregadas' (dependências pesadas), ou
+              'erro' se a importação falhou.
+    """
+    codigo = CODIGO_FILHO.format(
+        codigo=codigo or f"import {modulo}", preparo=preparo, projeto=str(dir_src.parent), sufixos=SUFIXOS_CODIGO,
+        proibidos=EVENTOS_PROIBIDOS, pesadas=DEPENDENCIAS_PESADAS
+    )
+    processo = subprocess.run(
+        [sys.executable, "-c", codigo],
+        cwd=dir_src, env={**os.environ, "PYTHONPATH": str(dir_src)}, capture_output=True, text=True, timeout=120
+    )
+    if processo.returncode != 0:
+        return {"erro": processo.stderr.strip().splitlines()[-1]}
+    return json.loads(processo.stdout.strip().splitlines()[-1])
+
+
+def mede_inicio_app(limite_s: float) -> float:
+    """
+    Sobe o app com 'python -m app' (headless, em uma porta livre) e mede
+    o tempo até o '/_stcore/health' responder.
+
+    Retorna:
+        float: Tempo em segundos, ou None se não respondeu dentro de 4x o limite.
+    """
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        porta = s.getsockname()[1]
+
+    comando = [
+        sys.executable, "-m", "app", "--server.port", str(porta), "--server.headless", "true",
+        "--browser.gatherUsageStats", "false",
+    ]
+    inicio = time.perf_counter()
+    processo = subprocess.Popen(comando, cwd=dir_src, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - inicio < 4 * limite_s:
+            try:
+                with urllib.request.urlopen(f"http://localhost:{porta}/_stcore/health", timeout=1) as resposta:
+                    if resposta.status == 200:
+                        return time.perf_counter() - inicio
+            except OSError:
+                time.sleep(0.05)
+        return None
+    finally:
+        processo.terminate()
+        try:
+            processo.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            processo.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticoes", type=int, default=3, help="importações por módulo (vale a mediana)")
+    parser.add_argument("--orcamento-ms", type=float, default=ORCAMENTO_IMPORTACAO_MS)
+    parser.add_argument("--app", action="store_true", help="mede também a subida do app")
+    parser.add_argument("--limite-app-s", type=float, default=LIMITE_INICIO_APP_S)
+    parser.add_argument("--saida", type=Path, default=None)
+    args = parser.parse_args()
+
+    resultados, falhas = [], 0
+    print(f"{'Módulo':<44} {'Tempo (ms)':>10}  Dependências pesadas")
+    alvos = [(modulo, None) for modulo in lista_modulos()]
+    alvos += [(f"app/pages/{pagina.name}", pagina) for pagina in lista_paginas()]
+    for modulo, pagina in alvos:
+        if pagina is None:
+            resultado = {"modulo": modulo, **vigia_importacao(modulo)}
+            mede = partial(tempo_importacao, modulo)
+        else:
+            resultado = {"modulo": modulo, **vigia_importacao(
+                modulo, codigo=importacoes_da_pagina(pagina), preparo=PREPARO_PAGINA
+            )}
+            mede = partial(tempo_importacao_pagina, pagina)
+        problemas = []
+
+        if "erro" in resultado:
+            problemas.append(f"erro na importação: {resultado['erro']}")
+        else:
+            tempos = [tempo for tempo in (mede() for _ in range(args.repeticoes)) if tempo]
+            resultado["tempo_ms"] = round(statistics.median(tempos), 1) if tempos else None
+            if resultado["tempo_ms"] and resultado["tempo_ms"] > args.orcamento_ms:
+                problemas.append(f"passou do orçamento de {args.orcamento_ms:g} ms")
+            problemas += [f"E/S: {ocorrencia}" for ocorrencia in resultado["ocorrencias"]]
+            if resultado["impresso"]:
+                problemas.append(f"escreveu na saída padrão: {resultado['impresso'][:80]!r}")
+            proibidas = set(resultado["carregadas"]) - DEPENDENCIAS_PERMITIDAS
+            if proibidas:
+                problemas.append(f"carregou {', '.join(sorted(proibidas))}")
+
+        resultado["problemas"] = problemas
+        resultados.append(resultado)
+        falhas += bool(problemas)
+
+        tempo = f"{resultado['tempo_ms']:10.1f}" if resultado.get("tempo_ms") is not None else f"{'-':>10}"
+        print(f"{modulo:<44} {tempo}  {', '.join(resultado.get('carregadas', [])) or '-'}")
+        for problema in problemas:
+            print(f"  [FALHA] {problema}")
+
+    inicio_app = None
+    if args.app:
+        inicio_app = mede_inicio_app(args.limite_app_s)
+        if inicio_app is None:
+            print(f"[FALHA] O app não respondeu em {4 * args.limite_app_s:g} s")
+            falhas += 1
+        elif inicio_app > args.limite_app_s:
+            print(f"[FALHA] O app levou {inicio_app:.2f} s para subir (limite: {args.limite_app_s:g} s)")
+            falhas += 1
+        else:
+            print(f"[OK] O app subiu em {inicio_app:.2f} s (limite: {args.limite_app_s:g} s)")
+
+    if args.saida:
+        args.saida.parent.mkdir(parents=True, exist_ok=True)
+        args.saida.write_text(json.dumps({
+            "orcamento_ms": args.orcamento_ms,
+            "modulos": resultados,
+            "inicio_app_s": inicio_app,
+        }, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    if falhas:
+        print(f"[FALHA] {falhas} problema(s) de importação")
+        sys.exit(1)
+    print(f"[OK] {len(resultados)} módulos/páginas dentro do orçamento de {args.orcamento_ms:g} ms, sem E/S na importação")
+
+
+if __name__ == "__main__":
+    main()
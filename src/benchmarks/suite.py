@@ -0,0 +1,318 @@
+"""
+Suíte de benchmarks dos caminhos quentes do projeto, em árvores sintéticas
+de arquivos FCS (ver 'benchmarks.gerador_fcs') de tamanho configurável.
+
+Para cada escala (quantidade de arquivos), mede:
+    pega_arquivos             glob das pastas de ensaio de cada grupo
+    varredura                 manifesto com o scanner paralelo ('gera_mapeamento')
+    extrair_metadado          leitura de HEADER/TEXT de uma amostra de arquivos
+    popularDB                 carga completa do manifesto em um banco vazio
+    processa_compara          comparação de todos os arquivos (catálogo do banco)
+    buscar_resultados_finais  SQL da lista paginada da interface (1ª, meio e última página
+                              de cada grupo/ensaio) e a contagem usada na paginação
+    busca_texto               página 'Busca de Experimentos': resultados (FTS5) e
+                              contagens das facetas de um conjunto fixo de buscas
+
+Tudo roda em uma pasta temporária e em um banco próprio (o banco e os dados
+do projeto não são tocados), sem acesso à rede. Os resultados vão para um
+JSON (um item por escala/benchmark, com os tempos de cada repetição, o
+commit e a máquina), que pode ser comparado com uma execução anterior.
+
+Uso (a partir da pasta 'src'):
+    python -m benchmarks.suite [--escalas 1000 10000 100000] [--eventos 500] [--repeticoes 3]
+                               [--amostra-metadados 1000] [--saida resultado.json]
+                               [--compara resultado_anterior.json] [--tolerancia 0.2]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from benchmarks.gerador_fcs import cria_arvore_fcs, PAINEIS
+from etl import populate_db
+from etl.mapeamento import gera_mapeamento
+from funcoes import catalogo, comparacao, conteudos, db_tools, previas
+from funcoes.busca import busca_experimentos, facetas
+from funcoes.db_tools import leitura, fecha_pool
+from funcoes.metadados import extrair_metadado, processa_compara
+from funcoes.pega_arquivos import pega_arquivos
+from funcoes.resultados import busca_resultados, conta_resultados
+from funcoes.registro import Registro
+
+dir_base = Path(__file__).resolve().parent.parent.parent
+
+# Pasta padrão dos resultados (fora do git, ver .gitignore)
+dir_resultados = dir_base / "data" / "benchmarks"
+
+# Versão do formato do JSON de resultados
+VERSAO_FORMATO = 1
+
+# Grupos/ensaios padrão do esquema, sem depender do banco do projeto
+REGISTRO = Registro.padrao()
+
+# Itens por página usados na consulta paginada (padrão da interface)
+ITENS_POR_PAGINA = 50
+
+# Buscas da página 'Busca de Experimentos' (texto, filtros das facetas),
+# com termos que existem nos nomes dos arquivos sintéticos
+CONSULTAS_BUSCA = [
+    ("", None),
+    ("ago", None),
+    ("cond3 11", None),
+    ("cytoflex", {"tipo_ensaio": ["fagocitose"]}),
+    ("r1", {"nome_grupo": ["Grupo A"], "data_aquisicao": [None]}),
+]
+
+# Diferenças de mediana abaixo disto são ruído, não regressão
+DIFERENCA_MINIMA_S = 0.005
+
+
+@contextlib.contextmanager
+def ambiente_sintetico(raiz: Path):
+    """
+    Aponta o banco e as raízes de caminhos dos módulos para a árvore
+    sintética enquanto o bloco roda, e restaura tudo no final.
+    """
+    originais = (db_tools.db_path, catalogo.dir_base, comparacao.dir_base, conteudos.dir_base,
+                 previas.dir_base, populate_db.mapa_csv)
+    db_tools.db_path = raiz / "database" / "experimentos.db"
+    catalogo.dir_base = raiz
+    comparacao.dir_base = raiz
+    conteudos.dir_base = raiz
+    previas.dir_base = raiz
+    populate_db.mapa_csv = raiz / "mapeamento.csv"
+    try:
+        yield
+    finally:
+        fecha_pool()
+        (db_tools.db_path, catalogo.dir_base, comparacao.dir_base, conteudos.dir_base,
+         previas.dir_base, populate_db.mapa_csv) = originais
+
+
+def banco_vazio(raiz: Path):
+    """
+    Apaga o banco sintético (e os arquivos do WAL) e fecha as conexões abertas.
+    """
+    fecha_pool()
+    for sufixo in ("", "-wal", "-shm"):
+        Path(f"{db_tools.db_path}{sufixo}").unlink(missing_ok=True)
+
+
+def mede(funcao, repeticoes: int, prepara=None) -> list[float]:
+    """
+    Executa 'funcao' 'repeticoes' vezes (com a saída padrão silenciada),
+    chamando 'prepara' antes de cada uma, fora da medição.
+
+    Retorna:
+        list[float]: O tempo (s) de cada repetição.
+    """
+    tempos = []
+    for _ in range(repeticoes):
+        if prepara is not None:
+            prepara()
+        with contextlib.redirect_stdout(io.StringIO()):
+            inicio = time.perf_counter()
+            funcao()
+            tempos.append(time.perf_counter() - inicio)
+    return tempos
+
+
+def consultas_paginadas() -> list[tuple]:
+    """
+    Parâmetros da consulta paginada: primeira, do meio e última página de
+    cada grupo/ensaio do banco sintético.
+    """
+    parametros = []
+    for id_grupo, tipo_ensaio, total in leitura(
+            "SELECT id_grupo, tipo_ensaio, COUNT(*) FROM experimentos_master GROUP BY id_grupo, tipo_ensaio"):
+        paginas = max(1, -(-total // ITENS_POR_PAGINA))
+        for pagina in sorted({0, paginas // 2, paginas - 1}):
+            parametros.append((id_grupo, tipo_ensaio, ITENS_POR_PAGINA, pagina * ITENS_POR_PAGINA))
+    return parametros
+
+
+def roda_escala(total_arquivos: int, args) -> list[dict]:
+    """
+    Cria a árvore sintética de uma escala, roda todos os benchmarks nela e a apaga.
+
+    Retorna:
+        list[dict]: Um resultado por benchmark.
+    """
+    raiz = Path(tempfile.mkdtemp(prefix=f"bench_suite_{total_arquivos}_"))
+    resultados = []
+
+    def registra(nome: str, tempos: list[float], itens: int):
+        mediana = statistics.median(tempos)
+        resultados.append({
+            "escala": total_arquivos,
+            "benchmark": nome,
+            "itens": itens,
+            "repeticoes": len(tempos),
+            "tempos_s": [round(t, 6) for t in tempos],
+            "mediana_s": round(mediana, 6),
+            "minimo_s": round(min(tempos), 6),
+            "us_por_item": round(mediana / itens * 1e6, 3) if itens else None,
+        })
+        print(f"  {nome:<26} {mediana:9.3f} s | {resultados[-1]['us_por_item'] or 0:10.1f} µs/item ({itens} itens)")
+
+    try:
+        inicio = time.perf_counter()
+        arquivos = cria_arvore_fcs(raiz, total_arquivos, REGISTRO, eventos=args.eventos)
+        print(f"\n[{total_arquivos} arquivos] árvore criada em {time.perf_counter() - inicio:.1f} s ({raiz})")
+
+        with ambiente_sintetico(raiz):
+            codigos = sorted(REGISTRO.grupos_por_codigo)
+            ensaios = sorted(REGISTRO.ensaios)
+            registra("pega_arquivos", mede(
+                lambda: [pega_arquivos(codigo, raiz, ensaios) for codigo in codigos], args.repeticoes
+            ), len(arquivos))
+
+            registra("varredura", mede(
+                lambda: gera_mapeamento(raiz, populate_db.mapa_csv, registro=REGISTRO), args.repeticoes
+            ), len(arquivos))
+
+            amostra = arquivos[::max(1, len(arquivos) // args.amostra_metadados)][:args.amostra_metadados]
+            registra("extrair_metadado", mede(
+                lambda: [extrair_metadado(caminho) for caminho in amostra], args.repeticoes
+            ), len(amostra))
+
+            registra("popularDB", mede(
+                populate_db.popularDB, args.repeticoes, prepara=lambda: banco_vazio(raiz)
+            ), len(arquivos))
+
+            linhas_banco = leitura("SELECT COUNT(*) FROM experimentos_master")[0][0]
+            if linhas_banco != len(arquivos):
+                print(f"  [AVISO] popularDB gravou {linhas_banco} de {len(arquivos)} arquivos")
+
+            registra("processa_compara", mede(
+                lambda: processa_compara(arquivos), args.repeticoes
+            ), len(arquivos))
+
+            parametros = consultas_paginadas()
+            registra("buscar_resultados_finais", mede(
+                lambda: [busca_resultados(*p) for p in parametros], args.repeticoes
+            ), len(parametros))
+            registra("contar_resultados", mede(
+                lambda: [conta_resultados(*p[:2]) for p in parametros], args.repeticoes
+            ), len(parametros))
+
+            registra("busca_texto", mede(
+                lambda: [
+                    (busca_experimentos(texto, filtros, ITENS_POR_PAGINA), facetas(texto, filtros))
+                    for texto, filtros in CONSULTAS_BUSCA
+                ], args.repeticoes
+            ), len(CONSULTAS_BUSCA))
+    finally:
+        if not args.manter:
+            shutil.rmtree(raiz, ignore_errors=True)
+
+    return resultados
+
+
+def commit_atual() -> dict[str, any]:
+    """
+    Commit do repositório (e se há alterações não commitadas), para
+    identificar a execução. Devolve None nos campos se o git não estiver disponível.
+    """
+    def _git(*comando):
+        try:
+            return subprocess.run(
+                ["git", *comando], cwd=dir_base, capture_output=True, text=True, timeout=30, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return None
+
+    status = _git("status", "--porcelain", "--untracked-files=no")
+    return {"commit": _git("rev-parse", "HEAD"), "alteracoes_locais": bool(status) if status is not None else None}
+
+
+def compara_com(anterior: Path, resultados: list[dict], tolerancia: float) -> int:
+    """
+    Compara as medianas com as de um JSON anterior (mesma escala e benchmark).
+
+    Retorna:
+        int: Quantidade de benchmarks mais lentos do que o anterior além da tolerância.
+    """
+    dados = json.loads(Path(anterior).read_text(encoding="utf-8"))
+    medianas = {(r["escala"], r["benchmark"]): r["mediana_s"] for r in dados["resultados"]}
+
+    print("-" * 70)
+    print(f"Comparação com {anterior} (commit {str(dados.get('commit'))[:12]})")
+    regressoes = 0
+    for resultado in resultados:
+        antes = medianas.get((resultado["escala"], resultado["benchmark"]))
+        if not antes:
+            continue
+        razao = resultado["mediana_s"] / antes
+        marca = ""
+        if razao > 1 + tolerancia and resultado["mediana_s"] - antes > DIFERENCA_MINIMA_S:
+            marca = "  [AVISO] regressão"
+            regressoes += 1
+        print(f"  {resultado['escala']:>7} {resultado['benchmark']:<26} {antes:9.3f} s -> "
+              f"{resultado['mediana_s']:9.3f} s ({razao:5.2f}x){marca}")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--escalas", type=int, nargs="+", default=[1000])
+    parser.add_argument("--eventos", type=int, default=500, help="eventos por arquivo sintético")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--amostra-metadados", type=int, default=1000,
+                        help="arquivos lidos no benchmark de 'extrair_metadado'")
+    parser.add_argument("--saida", type=Path, default=None)
+    parser.add_argument("--compara", type=Path, default=None, help="JSON de uma execução anterior")
+    parser.add_argument("--tolerancia", type=float, default=0.2,
+                        help="aumento relativo da mediana considerado regressão (0.2 = 20%%)")
+    parser.add_argument("--manter", action="store_true", help="não apaga as árvores sintéticas")
+    args = parser.parse_args()
+
+    # Espaço em disco: todas as árvores são criadas (e apagadas) uma de cada vez
+    bytes_por_arquivo = 300 + 30 * 16 * len(PAINEIS[-1]) + args.eventos * len(PAINEIS[-1]) * 4
+    necessario = max(args.escalas) * bytes_por_arquivo
+    livre = shutil.disk_usage(tempfile.gettempdir()).free
+    print(f"Maior árvore: ~{necessario / 1024**3:.2f} GiB (livre em {tempfile.gettempdir()}: {livre / 1024**3:.1f} GiB)")
+    if necessario > livre:
+        print("[FALHA] Espaço insuficiente. Reduza --escalas ou --eventos.")
+        return
+
+    execucao = {
+        "versao_formato": VERSAO_FORMATO,
+        **commit_atual(),
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "parametros": {chave: (str(valor) if isinstance(valor, Path) else valor) for chave, valor in vars(args).items()},
+        "resultados": [],
+    }
+
+    for escala in args.escalas:
+        execucao["resultados"] += roda_escala(escala, args)
+
+    saida = args.saida or dir_resultados / (
+        f"{datetime.now():%Y%m%d-%H%M%S}_{(execucao['commit'] or 'sem-git')[:12]}.json"
+    )
+    saida.parent.mkdir(parents=True, exist_ok=True)
+    saida.write_text(json.dumps(execucao, indent=2, ensure_ascii=False), encoding="utf-8")
+    print("-" * 70)
+    print(f"[OK] Resultados gravados em {saida}")
+
+    if args.compara:
+        regressoes = compara_com(args.compara, execucao["resultados"], args.tolerancia)
+        if regressoes:
+            print(f"[AVISO] {regressoes} benchmark(s) mais lento(s) do que a execução anterior")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Confere que os caches das páginas ('funcoes.cache') sobrevivem aos reruns
+do Streamlit: a página roda duas vezes (com o 'AppTest', no mesmo processo)
+e, na segunda, cada cache tem que ser o mesmo objeto da primeira e os
+caches usados têm que registrar acertos.
+
+O banco é copiado para uma pasta temporária antes (as páginas criam as
+tabelas que faltarem), então o banco original não é alterado.
+
+Uso (a partir da pasta 'src'):
+    python -m benchmarks.verifica_caches [--banco caminho/experimentos.db]
+
+Sai com código 1 se algum cache foi recriado ou não teve acertos no rerun.
+"""
+import argparse
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from streamlit.testing.v1 import AppTest
+from funcoes import cache, db_tools
+
+dir_paginas = Path(__file__).resolve().parent.parent / "app" / "pages"
+
+PAGINAS = ("1_Repositorio_de_Experimentos.py", "3_Busca_de_Experimentos.py")
+
+
+def _acertos(contadores: dict[str, any]) -> int:
+    return contadores["Acertos (memória)"] + contadores["Acertos (disco)"]
+
+
+def _consultas(contadores: dict[str, any]) -> int:
+    return _acertos(contadores) + contadores["Faltas"]
+
+
+def verifica_pagina(pagina: str) -> list[str]:
+    """
+    Roda a página duas vezes e compara os caches registrados.
+
+    Retorna:
+        list: Problemas encontrados (vazia se está tudo certo).
+    """
+    consultas_anteriores = {nome: _consultas(c.contadores()) for nome, c in cache._caches.items()}
+    app = AppTest.from_file(str(dir_paginas / pagina), default_timeout=120)
+    app.run()
+    if app.exception:
+        return [f"a página falhou na primeira execução: {app.exception[0].message}"]
+    # Só os caches consultados pela página na primeira execução
+    antes = {
+        nome: (c, c.contadores()) for nome, c in cache._caches.items()
+        if _consultas(c.contadores()) > consultas_anteriores.get(nome, 0)
+    }
+
+    app.run()
+    if app.exception:
+        return [f"a página falhou no rerun: {app.exception[0].message}"]
+
+    problemas = []
+    for nome, (objeto, contadores) in antes.items():
+        atual = cache._caches.get(nome)
+        if atual is not objeto:
+            problemas.append(f"cache '{nome}' foi recriado no rerun")
+            continue
+        if _acertos(atual.contadores()) <= _acertos(contadores):
+            problemas.append(f"cache '{nome}' não teve acertos no rerun")
+    return problemas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--banco", type=Path, default=Path(db_tools.db_path))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="verifica_caches_") as pasta:
+        db_tools.db_path = str(Path(pasta) / "experimentos.db")
+        shutil.copyfile(args.banco, db_tools.db_path)
+
+        falhas = 0
+        for pagina in PAGINAS:
+            problemas = verifica_pagina(pagina)
+            for problema in problemas:
+                print(f"[FALHA] {pagina}: {problema}")
+            if not problemas:
+                print(f"[OK] {pagina}: caches reaproveitados no rerun")
+            falhas += len(problemas)
+        db_tools.fecha_pool()
+
+    if falhas:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
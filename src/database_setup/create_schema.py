@@ -1,18 +1,31 @@
 import sqlite3
 import os
+import re
 from pathlib import Path
 
-def create_database_schema():
-    """
-    Cria o arquivo do banco de dados e todas as tabelas necessárias com base na arquitetura Mestra-Detalhes
-    """
-
 db_path = Path(__file__).resolve().parent.parent.parent / "database" / "experimentos.db"
 
-# Garante que o diretório 'database' exista
-db_path.parent.mkdir(parents=True, exist_ok=True)
+# Grupos e ensaios cadastrados em todo banco novo. Depois disso o registro
+# vive no próprio banco ('grupos', 'registro_grupos', 'faixas_animais' e
+# 'ensaios'); novos itens são cadastrados com 'funcoes.registro'
+GRUPOS_PADRAO = [
+    # (nome_grupo, código da pasta 'grupo_<código>', primeiro e último ID de animal)
+    ("Grupo A", "a", 11, 20),
+    ("Grupo B", "b", 21, 30),
+    ("Grupo C", "c", 31, 40),
+]
 
-print(f"Iniciando a criação do banco de dados em: {db_path}")
+ENSAIOS_PADRAO = [
+    # (tipo_ensaio, tabela de detalhes, chave primária da tabela)
+    ("agonistas", "detalhes_agonistas", "id_agonista"),
+    ("cryptococcus", "detalhes_cryptococcus", "id_cryptococcus"),
+    ("fagocitose", "detalhes_fagocitose", "id_fagocitose"),
+    ("imunofenotipagem", "detalhes_imunofenotipagem", "id_imunofenotipagem"),
+]
+
+# Nomes de tabelas/colunas vindos do registro entram no SQL via f-string:
+# só letras minúsculas, números e '_' são aceitos
+REGEX_IDENTIFICADOR = re.compile(r"^[a-z_][a-z0-9_]*$")
 
 sql_create_tables = """
 PRAGMA foreign_keys = ON; -- Habilita a checagem de chaves estrangeiras
@@ -33,58 +46,599 @@ CREATE TABLE IF NOT EXISTS experimentos_master (
         ON UPDATE CASCADE
 );
 
-CREATE TABLE IF NOT EXISTS detalhes_agonistas (
-    id_agonista INTEGER PRIMARY KEY,
-    id_animal INTEGER,
-    condicao TEXT,
-    arquivo_de_resultado TEXT NOT NULL
+-- Registro de grupos: código da pasta em data/raw ('grupo_<codigo>') de cada grupo
+CREATE TABLE IF NOT EXISTS registro_grupos (
+    id_grupo INTEGER PRIMARY KEY,
+    codigo_pasta TEXT NOT NULL UNIQUE,
+    FOREIGN KEY (id_grupo) REFERENCES grupos (id_grupo)
+        ON DELETE CASCADE
 );
 
-CREATE TABLE IF NOT EXISTS detalhes_cryptococcus (
-    id_cryptococcus INTEGER PRIMARY KEY,
-    id_animal INTEGER,
-    condicao TEXT,
-    arquivo_de_resultado TEXT NOT NULL
+-- Faixas de IDs de animais de cada grupo (um grupo pode ter várias; não se sobrepõem)
+CREATE TABLE IF NOT EXISTS faixas_animais (
+    id_grupo INTEGER NOT NULL,
+    inicio INTEGER NOT NULL,
+    fim INTEGER NOT NULL,
+    CHECK (inicio <= fim),
+    PRIMARY KEY (id_grupo, inicio),
+    FOREIGN KEY (id_grupo) REFERENCES grupos (id_grupo)
+        ON DELETE CASCADE
+);
+
+-- Registro de ensaios: tabela de detalhes e chave primária de cada um.
+-- As tabelas de detalhes, seus índices e a visão 'vw_resultados' são
+-- criados a partir deste registro (ver 'aplica_esquema')
+CREATE TABLE IF NOT EXISTS ensaios (
+    tipo_ensaio TEXT PRIMARY KEY,
+    tabela_detalhe TEXT NOT NULL UNIQUE,
+    pk_detalhe TEXT NOT NULL
+);
+
+-- Impressão digital de cada arquivo .fcs já ingerido (usada pela ingestão incremental)
+CREATE TABLE IF NOT EXISTS estado_ingestao (
+    caminho_arquivo TEXT PRIMARY KEY, -- caminho relativo à raiz do projeto, com '/'
+    tamanho INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    hash_conteudo TEXT NOT NULL,
+    tipo_ensaio TEXT NOT NULL,
+    id_detalhe_ensaio INTEGER NOT NULL,
+    ingerido_em TEXT NOT NULL DEFAULT (datetime('now'))
+);
+
+-- Conteúdos distintos (SHA-256) dos arquivos .fcs: cópias do mesmo arquivo em
+-- outras pastas ou com outro nome apontam para o mesmo objeto, que é lido
+-- (catálogo, prévias, cache colunar, estatísticas) uma vez só
+CREATE TABLE IF NOT EXISTS objetos_conteudo (
+    hash_conteudo TEXT PRIMARY KEY,
+    tamanho INTEGER NOT NULL,
+    caminho_objeto TEXT NOT NULL,  -- arquivo guardado (relativo à raiz, com '/'); as cópias viram links dele
+    criado_em TEXT NOT NULL DEFAULT (datetime('now'))
+) WITHOUT ROWID;
+
+-- Conteúdo de cada arquivo referenciado pelos resultados (ver 'funcoes.conteudos')
+CREATE TABLE IF NOT EXISTS conteudo_arquivo (
+    arquivo_de_resultado TEXT PRIMARY KEY, -- caminho relativo, com '/'
+    hash_conteudo TEXT NOT NULL,
+    tamanho INTEGER NOT NULL,              -- tamanho e mtime quando o hash foi calculado
+    mtime_ns INTEGER NOT NULL,
+    FOREIGN KEY (hash_conteudo) REFERENCES objetos_conteudo (hash_conteudo)
+);
+
+CREATE INDEX IF NOT EXISTS idx_conteudo_hash ON conteudo_arquivo (hash_conteudo);
+
+-- Catálogo de metadados do segmento TEXT de cada arquivo .fcs (preenchido pelo ETL)
+CREATE TABLE IF NOT EXISTS metadados_arquivo (
+    id_arquivo INTEGER PRIMARY KEY,
+    arquivo_de_resultado TEXT NOT NULL UNIQUE, -- caminho relativo, com '/'
+    data_aquisicao TEXT,  -- $DATE
+    citometro TEXT,       -- $CYT
+    amostra TEXT,         -- $TBNM
+    eventos INTEGER,      -- $TOT
+    atualizado_em TEXT NOT NULL DEFAULT (datetime('now'))
+);
+
+-- Um registro por canal ($PnN/$PnS) de cada arquivo do catálogo
+CREATE TABLE IF NOT EXISTS canais_arquivo (
+    id_arquivo INTEGER NOT NULL,
+    numero INTEGER NOT NULL,
+    pnn TEXT,
+    pns TEXT,
+    excluido INTEGER NOT NULL DEFAULT 0, -- 1 para FSC/SSC/TIME/WIDTH
+    PRIMARY KEY (id_arquivo, numero),
+    FOREIGN KEY (id_arquivo) REFERENCES metadados_arquivo (id_arquivo)
+        ON DELETE CASCADE
+);
+
+-- Índice de painéis: cada conjunto distinto de canais (PnN/PnS normalizados e
+-- ordenados, sem FSC/SSC/TIME/WIDTH) vira uma assinatura (hash) única
+CREATE TABLE IF NOT EXISTS paineis (
+    id_painel INTEGER PRIMARY KEY,
+    assinatura TEXT NOT NULL UNIQUE,  -- hash do texto canônico
+    canonico TEXT NOT NULL,           -- 'PNN=PNS;PNN=PNS;...'
+    canais INTEGER NOT NULL
+);
+
+-- Marcadores (PnN e PnS normalizados) de cada painel, para buscas por marcador
+CREATE TABLE IF NOT EXISTS painel_marcadores (
+    id_painel INTEGER NOT NULL,
+    marcador TEXT NOT NULL,
+    PRIMARY KEY (id_painel, marcador),
+    FOREIGN KEY (id_painel) REFERENCES paineis (id_painel)
+        ON DELETE CASCADE
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_painel_marcadores_marcador ON painel_marcadores (marcador, id_painel);
+
+-- Painel de cada arquivo do catálogo (mantido pelo ETL junto com o catálogo)
+CREATE TABLE IF NOT EXISTS painel_arquivo (
+    id_arquivo INTEGER PRIMARY KEY,
+    id_painel INTEGER NOT NULL,
+    FOREIGN KEY (id_arquivo) REFERENCES metadados_arquivo (id_arquivo)
+        ON DELETE CASCADE,
+    FOREIGN KEY (id_painel) REFERENCES paineis (id_painel)
+);
+
+CREATE INDEX IF NOT EXISTS idx_painel_arquivo_painel ON painel_arquivo (id_painel, id_arquivo);
+
+-- Prévias das distribuições de cada arquivo do catálogo, calculadas uma vez na
+-- ingestão ('funcoes.previas'): histogramas 1D de todos os canais e densidades
+-- 2D (FSC x SSC, FSC-A x FSC-H) em bins fixos, como arrays compactos
+CREATE TABLE IF NOT EXISTS previas_arquivo (
+    id_arquivo INTEGER PRIMARY KEY,
+    versao INTEGER NOT NULL,         -- versão do cálculo (VERSAO_PREVIAS)
+    eventos INTEGER NOT NULL,
+    bins INTEGER NOT NULL,           -- bins de cada histograma 1D
+    escalas TEXT NOT NULL,           -- uma letra por parâmetro: 'L' linear, 'A' asinh
+    limites BLOB NOT NULL,           -- float32 little-endian (parâmetros x 2): mínimo e máximo na escala
+    histogramas BLOB NOT NULL,       -- uint32 little-endian (parâmetros x bins), zlib
+    bins_densidade INTEGER NOT NULL,
+    pares TEXT NOT NULL,             -- 'x,y;x,y': números ($Pn) dos parâmetros das densidades
+    densidades BLOB NOT NULL,        -- uint32 little-endian (pares x bins x bins), zlib
+    FOREIGN KEY (id_arquivo) REFERENCES metadados_arquivo (id_arquivo)
+        ON DELETE CASCADE
+);
+
+-- Cópia colunar (.parquet) dos eventos de cada arquivo .fcs (etapa opcional do ETL)
+CREATE TABLE IF NOT EXISTS cache_colunar (
+    arquivo_de_resultado TEXT PRIMARY KEY, -- caminho relativo do .fcs, com '/'
+    caminho_cache TEXT NOT NULL,           -- caminho relativo do .parquet, com '/'
+    tamanho_origem INTEGER NOT NULL,       -- tamanho e mtime do .fcs na conversão
+    mtime_ns_origem INTEGER NOT NULL,
+    eventos INTEGER NOT NULL,
+    colunas INTEGER NOT NULL,
+    tamanho_cache INTEGER NOT NULL,
+    gerado_em TEXT NOT NULL DEFAULT (datetime('now'))
 );
 
-CREATE TABLE IF NOT EXISTS detalhes_fagocitose (
-    id_fagocitose INTEGER PRIMARY KEY,
+-- Fila de ingestão dos arquivos enviados pela página 'Adicionar Dados'.
+-- Um trabalhador em segundo plano ('etl.fila_ingestao') pega as tarefas
+-- pendentes, lê os metadados e grava detalhe + master + catálogo
+CREATE TABLE IF NOT EXISTS fila_ingestao (
+    id_tarefa INTEGER PRIMARY KEY,
+    id_envio INTEGER NOT NULL,          -- tarefas criadas pelo mesmo envio de arquivos
+    caminho_arquivo TEXT NOT NULL,      -- caminho relativo à raiz do projeto, com '/'
+    id_grupo INTEGER NOT NULL,
+    tipo_ensaio TEXT NOT NULL,
     id_animal INTEGER,
-    condicao TEXT,
-    arquivo_de_resultado TEXT NOT NULL
+    status TEXT NOT NULL DEFAULT 'pendente'
+        CHECK (status IN ('pendente', 'processando', 'concluida', 'erro')),
+    tentativas INTEGER NOT NULL DEFAULT 0,
+    erro TEXT,
+    id_detalhe_ensaio INTEGER,
+    criada_em TEXT NOT NULL DEFAULT (datetime('now')),
+    iniciada_em TEXT,
+    concluida_em TEXT,
+    FOREIGN KEY (id_grupo) REFERENCES grupos (id_grupo)
 );
 
-CREATE TABLE IF NOT EXISTS detalhes_imunofenotipagem (
-    id_imunofenotipagem INTEGER PRIMARY KEY,
+-- O trabalhador busca sempre as pendentes mais antigas
+CREATE INDEX IF NOT EXISTS idx_fila_status ON fila_ingestao (status, id_tarefa);
+
+-- Índice de busca: um documento por resultado (linha da 'experimentos_master')
+-- com os campos da 'vw_resultados', o nome do grupo e os metadados do catálogo.
+-- Mantido por gatilhos (ver 'sql_gatilhos_busca' e 'sql_tabela_detalhe');
+-- bancos antigos são preenchidos por 'funcoes.busca.sincroniza_busca'
+CREATE TABLE IF NOT EXISTS busca_documentos (
+    id_experimento INTEGER PRIMARY KEY,
+    id_grupo INTEGER NOT NULL,
+    nome_grupo TEXT,
+    tipo_ensaio TEXT NOT NULL,
     id_animal INTEGER,
     condicao TEXT,
-    arquivo_de_resultado TEXT NOT NULL
+    arquivo_de_resultado TEXT,  -- caminho relativo, com '/'
+    nome_arquivo TEXT,
+    citometro TEXT,             -- $CYT
+    amostra TEXT,               -- $TBNM
+    data_aquisicao TEXT         -- $DATE
+);
+
+-- Atualização pelo catálogo (caminho) e contagem das facetas sem texto de busca
+CREATE INDEX IF NOT EXISTS idx_busca_arquivo ON busca_documentos (arquivo_de_resultado);
+CREATE INDEX IF NOT EXISTS idx_busca_grupo ON busca_documentos (nome_grupo);
+CREATE INDEX IF NOT EXISTS idx_busca_ensaio ON busca_documentos (tipo_ensaio);
+CREATE INDEX IF NOT EXISTS idx_busca_citometro ON busca_documentos (citometro);
+CREATE INDEX IF NOT EXISTS idx_busca_data ON busca_documentos (data_aquisicao);
+
+-- Texto dos documentos (FTS5 com conteúdo externo: o texto fica só em
+-- 'busca_documentos'). Sem acentos nem maiúsculas, com índice de prefixos
+-- de 2 e 3 letras para as buscas 'termo*'
+CREATE VIRTUAL TABLE IF NOT EXISTS busca_fts USING fts5(
+    nome_arquivo, amostra, condicao, citometro, id_animal, nome_grupo, tipo_ensaio,
+    content='busca_documentos', content_rowid='id_experimento',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+
+-- Documentos criados ou alterados que ainda não entraram no texto: o FTS5
+-- grava um segmento a cada comando, então os gatilhos só enfileiram e
+-- 'funcoes.busca.indexa_pendentes' indexa todos de uma vez no fim da carga
+CREATE TABLE IF NOT EXISTS busca_pendentes (
+    id_experimento INTEGER PRIMARY KEY
+);
+
+-- Contador de gerações do banco: o ETL incrementa a cada carga gravada, e os
+-- caches de consultas da interface descartam o que foi lido em gerações anteriores
+CREATE TABLE IF NOT EXISTS geracao_banco (
+    id INTEGER PRIMARY KEY CHECK (id = 1), -- sempre uma única linha
+    geracao INTEGER NOT NULL DEFAULT 0,
+    atualizado_em TEXT NOT NULL DEFAULT (datetime('now'))
 );
+INSERT OR IGNORE INTO geracao_banco (id, geracao) VALUES (1, 0);
+
+-- Índices das consultas da interface (filtro por grupo/ensaio e junção com os detalhes)
+CREATE INDEX IF NOT EXISTS idx_master_grupo_ensaio_detalhe
+    ON experimentos_master (id_grupo, tipo_ensaio, id_detalhe_ensaio);
+
+-- Caminho inverso (detalhe -> master), usado nas buscas por animal/arquivo e nas remoções
+CREATE INDEX IF NOT EXISTS idx_master_ensaio_detalhe
+    ON experimentos_master (tipo_ensaio, id_detalhe_ensaio);
 
 """
 
-conn = None
-try:
-    # conecta com o banco de dados
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
 
-    # 'executescript permite rodar múltiplos comandos SQL de uma vez
-    cursor.executescript(sql_create_tables)
+def valida_identificador(nome: str) -> str:
+    """
+    Confere que 'nome' pode ser usado como nome de tabela/coluna/ensaio no SQL.
+    """
+    if not REGEX_IDENTIFICADOR.match(nome or ""):
+        raise ValueError(f"Identificador inválido: '{nome}' (use só a-z, 0-9 e '_')")
+    return nome
+
 
-    # confirma as mudanças no banco de dados
+# Documento de busca dos resultados da 'vw_resultados' (apelido 'r') que
+# atendem '{filtro}'. O caminho vai sempre com '/' (as linhas antigas têm
+# '\'); o nome do arquivo é o que vem depois da última '/'
+SQL_DOCUMENTO_BUSCA = """
+    INSERT INTO busca_documentos
+        (id_experimento, id_grupo, nome_grupo, tipo_ensaio, id_animal, condicao,
+         arquivo_de_resultado, nome_arquivo, citometro, amostra, data_aquisicao)
+    SELECT r.id_experimento, r.id_grupo, g.nome_grupo, r.tipo_ensaio, r.id_animal, r.condicao,
+           REPLACE(r.arquivo_de_resultado, '\\', '/'),
+           REPLACE(
+               REPLACE(r.arquivo_de_resultado, '\\', '/'),
+               RTRIM(REPLACE(r.arquivo_de_resultado, '\\', '/'),
+                     REPLACE(REPLACE(r.arquivo_de_resultado, '\\', '/'), '/', '')),
+               ''
+           ),
+           m.citometro, m.amostra, m.data_aquisicao
+    FROM vw_resultados AS r
+    LEFT JOIN grupos AS g ON g.id_grupo = r.id_grupo
+    LEFT JOIN metadados_arquivo AS m ON m.arquivo_de_resultado = REPLACE(r.arquivo_de_resultado, '\\', '/')
+    WHERE {filtro};
+"""
+
+# Resultados de um grupo/ensaio, paginados no próprio banco (LIMIT/OFFSET;
+# LIMIT -1 traz todas as linhas). A visão junta a master com a tabela de
+# detalhes do ensaio; o id do detalhe desempata animais repetidos, deixando
+# as páginas estáveis. Usada pela interface ('funcoes.resultados'), pelos
+# benchmarks e por 'verifica_planos_de_consulta'
+SQL_RESULTADOS_PAGINADOS = """
+    SELECT id_animal, arquivo_de_resultado, condicao
+    FROM vw_resultados
+    WHERE id_grupo = ? AND tipo_ensaio = ?
+    ORDER BY id_animal, id_detalhe_ensaio
+    LIMIT ? OFFSET ?
+"""
+
+# Quantidade de resultados de um grupo/ensaio
+SQL_CONTAGEM_RESULTADOS = "SELECT COUNT(*) FROM experimentos_master WHERE id_grupo = ? AND tipo_ensaio = ?"
+
+# Colunas de 'busca_documentos' indexadas no texto ('busca_fts')
+COLUNAS_FTS = ["nome_arquivo", "amostra", "condicao", "citometro", "id_animal", "nome_grupo", "tipo_ensaio"]
+
+
+def sql_gatilhos_busca() -> str:
+    """
+    Gatilhos que mantêm o índice de busca em dia com a 'experimentos_master',
+    o catálogo de metadados e os nomes dos grupos (os das tabelas de detalhes
+    ficam em 'sql_tabela_detalhe'). Documentos novos ou alterados vão para
+    'busca_pendentes'; o que já está no texto ('busca_fts') sai dele na hora.
+    """
+    colunas = ", ".join(COLUNAS_FTS)
+    antigos = ", ".join(f"OLD.{coluna}" for coluna in COLUNAS_FTS)
+    documento_novo = SQL_DOCUMENTO_BUSCA.format(filtro="r.id_experimento = NEW.id_experimento")
+    # Só documentos já indexados saem do texto (os pendentes nunca entraram)
+    retira_do_texto = f"""
+            INSERT INTO busca_fts (busca_fts, rowid, {colunas})
+            SELECT 'delete', OLD.id_experimento, {antigos}
+            WHERE NOT EXISTS (SELECT 1 FROM busca_pendentes WHERE id_experimento = OLD.id_experimento);"""
+
+    return f"""
+        CREATE TRIGGER IF NOT EXISTS trg_busca_documentos_insere AFTER INSERT ON busca_documentos BEGIN
+            INSERT OR IGNORE INTO busca_pendentes (id_experimento) VALUES (NEW.id_experimento);
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_busca_documentos_apaga AFTER DELETE ON busca_documentos BEGIN{retira_do_texto}
+            DELETE FROM busca_pendentes WHERE id_experimento = OLD.id_experimento;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_busca_documentos_atualiza AFTER UPDATE ON busca_documentos BEGIN{retira_do_texto}
+            INSERT OR IGNORE INTO busca_pendentes (id_experimento) VALUES (NEW.id_experimento);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_busca_master_insere AFTER INSERT ON experimentos_master BEGIN
+            {documento_novo}
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_busca_master_apaga AFTER DELETE ON experimentos_master BEGIN
+            DELETE FROM busca_documentos WHERE id_experimento = OLD.id_experimento;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_busca_master_atualiza AFTER UPDATE ON experimentos_master BEGIN
+            DELETE FROM busca_documentos WHERE id_experimento = OLD.id_experimento;
+            {documento_novo}
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_busca_catalogo_insere AFTER INSERT ON metadados_arquivo BEGIN
+            UPDATE busca_documentos
+            SET citometro = NEW.citometro, amostra = NEW.amostra, data_aquisicao = NEW.data_aquisicao
+            WHERE arquivo_de_resultado = NEW.arquivo_de_resultado;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_busca_catalogo_atualiza AFTER UPDATE ON metadados_arquivo
+        WHEN NEW.citometro IS NOT OLD.citometro OR NEW.amostra IS NOT OLD.amostra
+          OR NEW.data_aquisicao IS NOT OLD.data_aquisicao
+          OR NEW.arquivo_de_resultado IS NOT OLD.arquivo_de_resultado BEGIN
+            UPDATE busca_documentos
+            SET citometro = NEW.citometro, amostra = NEW.amostra, data_aquisicao = NEW.data_aquisicao
+            WHERE arquivo_de_resultado = NEW.arquivo_de_resultado;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_busca_catalogo_apaga AFTER DELETE ON metadados_arquivo BEGIN
+            UPDATE busca_documentos
+            SET citometro = NULL, amostra = NULL, data_aquisicao = NULL
+            WHERE arquivo_de_resultado = OLD.arquivo_de_resultado;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_busca_grupo_atualiza AFTER UPDATE OF nome_grupo ON grupos BEGIN
+            UPDATE busca_documentos SET nome_grupo = NEW.nome_grupo WHERE id_grupo = NEW.id_grupo;
+        END;
+    """
+
+
+def sql_tabela_detalhe(tipo_ensaio: str, tabela: str, pk: str) -> str:
+    """
+    DDL da tabela de detalhes de um ensaio (todas têm o mesmo formato), dos
+    seus índices por animal e por arquivo e do gatilho que refaz os
+    documentos de busca quando uma linha de detalhe é alterada.
+    """
+    tipo_ensaio, tabela, pk = (valida_identificador(nome) for nome in (tipo_ensaio, tabela, pk))
+    resultados_da_linha = (
+        f"SELECT id_experimento FROM experimentos_master "
+        f"WHERE tipo_ensaio = '{tipo_ensaio}' AND id_detalhe_ensaio = NEW.{pk}"
+    )
+    documentos = SQL_DOCUMENTO_BUSCA.format(filtro=f"r.id_experimento IN ({resultados_da_linha})")
+    return f"""
+        CREATE TABLE IF NOT EXISTS {tabela} (
+            {pk} INTEGER PRIMARY KEY,
+            id_animal INTEGER,
+            condicao TEXT,
+            arquivo_de_resultado TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_{tipo_ensaio}_animal ON {tabela} (id_animal);
+        CREATE INDEX IF NOT EXISTS idx_{tipo_ensaio}_arquivo ON {tabela} (arquivo_de_resultado);
+        CREATE TRIGGER IF NOT EXISTS trg_busca_{tipo_ensaio}_atualiza AFTER UPDATE ON {tabela} BEGIN
+            DELETE FROM busca_documentos WHERE id_experimento IN ({resultados_da_linha});
+            {documentos}
+        END;
+    """
+
+
+def sql_visao_resultados(ensaios: list[tuple[str, str, str]]) -> str:
+    """
+    Visão única mestre + detalhes de todos os ensaios registrados. O filtro
+    por tipo_ensaio de cada parte permite ao SQLite descartar as partes que
+    não interessam.
+    """
+    partes = [
+        f"""
+        SELECT m.id_experimento, m.id_grupo, m.tipo_ensaio, m.data_experimento, m.id_detalhe_ensaio,
+               d.id_animal, d.condicao, d.arquivo_de_resultado
+        FROM experimentos_master AS m
+        JOIN {valida_identificador(tabela)} AS d ON d.{valida_identificador(pk)} = m.id_detalhe_ensaio
+        WHERE m.tipo_ensaio = '{valida_identificador(tipo_ensaio)}'"""
+        for tipo_ensaio, tabela, pk in ensaios
+    ]
+    if not partes:
+        # Sem ensaios registrados: visão vazia, mas com as mesmas colunas
+        partes = ["""
+        SELECT id_experimento, id_grupo, tipo_ensaio, data_experimento, id_detalhe_ensaio,
+               NULL AS id_animal, NULL AS condicao, NULL AS arquivo_de_resultado
+        FROM experimentos_master WHERE 0"""]
+
+    return "DROP VIEW IF EXISTS vw_resultados;\nCREATE VIEW vw_resultados AS" + "\n        UNION ALL".join(partes) + ";"
+
+
+def divide_comandos(sql: str) -> list[str]:
+    """
+    Separa um script SQL em comandos para rodar um a um com 'cursor.execute'
+    (dentro de uma transação já aberta, ao contrário do 'executescript').
+    Um ';' só fecha o comando quando ele está completo, então o corpo de um
+    gatilho (BEGIN ...; ...; END) continua inteiro.
+    """
+    comandos, atual = [], ""
+    for pedaco in sql.split(";"):
+        atual += pedaco + ";"
+        if sqlite3.complete_statement(atual):
+            if atual.strip(" \n\t;"):
+                comandos.append(atual.strip())
+            atual = ""
+    if atual.strip(" \n\t;"):
+        comandos.append(atual.strip())
+    return comandos
+
+
+def semeia_registro(cursor):
+    """
+    Cadastra os grupos e ensaios padrão que ainda não existirem. Faixas de
+    animais só são criadas para grupos que ainda não têm nenhuma (não
+    sobrescreve o que já foi configurado).
+    """
+    cursor.executemany(
+        "INSERT OR IGNORE INTO grupos (nome_grupo) VALUES (?)",
+        [(nome,) for nome, _, _, _ in GRUPOS_PADRAO]
+    )
+    cursor.executemany("""
+        INSERT OR IGNORE INTO registro_grupos (id_grupo, codigo_pasta)
+        SELECT id_grupo, ? FROM grupos WHERE nome_grupo = ?
+    """, [(codigo, nome) for nome, codigo, _, _ in GRUPOS_PADRAO])
+    cursor.executemany("""
+        INSERT INTO faixas_animais (id_grupo, inicio, fim)
+        SELECT g.id_grupo, ?, ? FROM grupos AS g
+        WHERE g.nome_grupo = ?
+          AND NOT EXISTS (SELECT 1 FROM faixas_animais AS f WHERE f.id_grupo = g.id_grupo)
+    """, [(inicio, fim, nome) for nome, _, inicio, fim in GRUPOS_PADRAO])
+    cursor.executemany(
+        "INSERT OR IGNORE INTO ensaios (tipo_ensaio, tabela_detalhe, pk_detalhe) VALUES (?, ?, ?)",
+        ENSAIOS_PADRAO
+    )
+
+
+def aplica_esquema(conn: sqlite3.Connection):
+    """
+    Aplica o esquema completo em uma conexão: tabelas fixas, registro padrão,
+    tabelas de detalhes de cada ensaio registrado, a visão 'vw_resultados' e
+    os gatilhos do índice de busca.
+    """
+    conn.executescript(sql_create_tables)
+
+    cursor = conn.cursor()
+    semeia_registro(cursor)
+    ensaios = cursor.execute(
+        "SELECT tipo_ensaio, tabela_detalhe, pk_detalhe FROM ensaios ORDER BY rowid"
+    ).fetchall()
     conn.commit()
-    print("Esquema do banco de dados criado com sucesso!")
 
-except sqlite3.Error as e:
-    print(f"Erro ao criar o bando de dados: {e}")
-    if conn:
-        conn.rollback() # Desfaz qualquer mudança em caso de erro
+    conn.executescript(
+        "".join(sql_tabela_detalhe(*ensaio) for ensaio in ensaios)
+        + sql_visao_resultados(ensaios)
+        + sql_gatilhos_busca()
+    )
+
+
+def create_database_schema(caminho_db: Path = db_path):
+    """
+    Cria o arquivo do banco de dados e todas as tabelas necessárias com base na arquitetura Mestra-Detalhes
+    """
+    # Garante que o diretório 'database' exista
+    caminho_db = Path(caminho_db)
+    caminho_db.parent.mkdir(parents=True, exist_ok=True)
+
+    print(f"Iniciando a criação do banco de dados em: {caminho_db}")
+
+    conn = None
+    try:
+        # conecta com o banco de dados
+        conn = sqlite3.connect(caminho_db)
+        # Tabelas fixas, registro padrão e tabelas/visão de cada ensaio
+        aplica_esquema(conn)
+
+        # confirma as mudanças no banco de dados
+        conn.commit()
+        print("Esquema do banco de dados criado com sucesso!")
+
+    except sqlite3.Error as e:
+        print(f"Erro ao criar o bando de dados: {e}")
+        if conn:
+            conn.rollback() # Desfaz qualquer mudança em caso de erro
+
+    finally:
+        if conn:
+            conn.close() # Sempre fecha a conexão
+            print("Conexão com o banco de dados fechada.")
+
+def verifica_planos_de_consulta() -> list[str]:
+    """
+    Confere, com EXPLAIN QUERY PLAN, que as consultas principais da interface
+    usam os índices do esquema (e não varrem as tabelas inteiras).
+
+    O teste roda em um banco em memória, com dados sintéticos e estatísticas
+    (ANALYZE), para não depender do conteúdo do banco real.
+
+    Retorna:
+        list[str]: Descrição dos problemas encontrados (vazia se tudo estiver certo).
+    """
+    consultas = [
+        (
+            "resultados por grupo/ensaio",
+            SQL_RESULTADOS_PAGINADOS,
+            (1, 'agonistas', 50, 0),
+            ["idx_master_grupo_ensaio_detalhe"]
+        ),
+        (
+            "ensaios de um grupo",
+            "SELECT DISTINCT tipo_ensaio FROM experimentos_master WHERE id_grupo = ? ORDER BY tipo_ensaio",
+            (1,),
+            ["idx_master_grupo_ensaio_detalhe"]
+        ),
+        (
+            "busca por arquivo",
+            "SELECT * FROM vw_resultados WHERE arquivo_de_resultado = ?",
+            ("data/raw/x.fcs",),
+            ["idx_agonistas_arquivo", "idx_cryptococcus_arquivo",
+             "idx_fagocitose_arquivo", "idx_imunofenotipagem_arquivo"]
+        ),
+        (
+            "busca por animal",
+            "SELECT * FROM vw_resultados WHERE id_animal = ?",
+            (11,),
+            ["idx_agonistas_animal", "idx_cryptococcus_animal",
+             "idx_fagocitose_animal", "idx_imunofenotipagem_animal"]
+        ),
+        (
+            "documento de busca de um resultado (gatilhos da busca)",
+            SQL_DOCUMENTO_BUSCA.format(filtro="r.id_experimento = ?"),
+            (1,),
+            ["sqlite_autoindex_metadados_arquivo_1"]
+        ),
+        (
+            "documentos de busca de um arquivo (gatilhos do catálogo)",
+            "UPDATE busca_documentos SET citometro = ? WHERE arquivo_de_resultado = ?",
+            ("CytoFLEX LX", "data/raw/x.fcs"),
+            ["idx_busca_arquivo"]
+        ),
+        (
+            "cópias de um conteúdo (deduplicação)",
+            "SELECT arquivo_de_resultado FROM conteudo_arquivo WHERE hash_conteudo = ?",
+            ("0" * 64,),
+            ["idx_conteudo_hash"]
+        ),
+    ]
+
+    conn = sqlite3.connect(":memory:")
+    problemas = []
+    try:
+        aplica_esquema(conn)
+
+        # Dados sintéticos: 3 grupos, 4 ensaios, 2000 arquivos por ensaio
+        for ensaio, tabela, pk in ENSAIOS_PADRAO:
+            conn.executemany(
+                f"INSERT INTO {tabela} ({pk}, id_animal, arquivo_de_resultado) VALUES (?, ?, ?)",
+                [(i, i % 300, f"data/raw/{ensaio}/{i}.fcs") for i in range(1, 2001)]
+            )
+            conn.executemany(
+                "INSERT INTO experimentos_master (id_grupo, tipo_ensaio, id_detalhe_ensaio) VALUES (?, ?, ?)",
+                [(i % 3 + 1, ensaio, i) for i in range(1, 2001)]
+            )
+        conn.execute("ANALYZE")
+
+        for descricao, query, params, indices in consultas:
+            plano = [linha[3] for linha in conn.execute(f"EXPLAIN QUERY PLAN {query}", params)]
+            texto_plano = "\n".join(plano)
+
+            faltando = [indice for indice in indices if indice not in texto_plano]
+            varreduras = [passo for passo in plano if passo.startswith("SCAN ") and "vw_resultados" not in passo]
+
+            if faltando or varreduras:
+                problemas.append(
+                    f"{descricao}: índices não usados {faltando}, varreduras {varreduras}\n{texto_plano}"
+                )
+    finally:
+        conn.close()
+
+    return problemas
 
-finally:
-    if conn:
-        conn.close() # Sempre fecha a conexão
-        print("Conexão com o banco de dados fechada.")
 
 if __name__ == "__main__":
-    create_database_schema()
\ No newline at end of file
+    create_database_schema()
+
+    problemas = verifica_planos_de_consulta()
+    if problemas:
+        print("AVISO: consultas sem uso de índice:")
+        for problema in problemas:
+            print(f"  - {problema}")
+    else:
+        print("Planos de consulta verificados: todas as consultas usam índices.")
\ No newline at end of file
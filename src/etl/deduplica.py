@@ -0,0 +1,162 @@
+"""
+Deduplicação dos .fcs no disco.
+
+Cada conteúdo distinto (ver 'funcoes.conteudos') fica guardado uma vez: as
+cópias em data/raw viram links (hardlinks) para o arquivo do objeto, então
+todos os caminhos referenciados pelos resultados continuam existindo e
+abrindo o mesmo conteúdo. O arquivo guardado fica só para leitura, para que
+editar uma das cópias no lugar não altere as outras.
+
+Sem '--aplicar', só mostra o relatório (quanto as cópias ocupam e quanto
+já foi recuperado).
+
+Uso (a partir da pasta 'src'):
+    python -m etl.deduplica [--aplicar]
+"""
+import argparse
+import filecmp
+import os
+import stat
+import time
+from database_setup.create_schema import create_database_schema
+from funcoes import db_tools
+from funcoes.conteudos import hashes_registrados, registra_faltantes, relatorio_deduplicacao
+from funcoes.db_tools import dir_base, leitura, sessao
+
+# Permissões de escrita retiradas do arquivo guardado
+BITS_ESCRITA = stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH
+
+
+def _formata_bytes(valor: int) -> str:
+    if valor >= 1024 ** 3:
+        return f"{valor / 1024 ** 3:.2f} GiB"
+    return f"{valor / 1024 ** 2:.1f} MiB"
+
+
+def imprime_relatorio(relatorio: dict[str, int]):
+    """
+    Mostra o resultado de 'relatorio_deduplicacao'.
+    """
+    print(f"  Arquivos referenciados: {relatorio['arquivos']} ({_formata_bytes(relatorio['bytes_arquivos'])})")
+    print(f"  Conteúdos distintos: {relatorio['conteudos']} ({_formata_bytes(relatorio['bytes_conteudos'])})")
+    print(f"  Cópias: {relatorio['copias']} ({_formata_bytes(relatorio['bytes_copias'])})")
+    print(f"  Cópias já vinculadas ao objeto: {relatorio['copias_vinculadas']} "
+          f"({_formata_bytes(relatorio['bytes_recuperados'])} recuperados)")
+    if relatorio['bytes_a_recuperar'] > 0:
+        print(f"  [AVISO] {_formata_bytes(relatorio['bytes_a_recuperar'])} ainda podem ser recuperados "
+              f"(rode com '--aplicar')")
+    else:
+        print("  [OK] Nenhuma cópia ocupando espaço extra")
+
+
+def _vincula(caminho_objeto: str, caminho_copia: str) -> bool:
+    """
+    Troca a cópia por um link para o arquivo guardado, conferindo antes o
+    conteúdo byte a byte. O link é criado com outro nome e depois renomeado
+    por cima da cópia, então o caminho nunca deixa de existir.
+
+    Retorna:
+        bool: True se a cópia virou um link.
+    """
+    origem, copia = dir_base / caminho_objeto, dir_base / caminho_copia
+    if not filecmp.cmp(origem, copia, shallow=False):
+        print(f"  [FALHA] '{caminho_copia}' não tem mais o conteúdo de '{caminho_objeto}'. Ignorado.")
+        return False
+
+    temporario = copia.with_name(f".{copia.name}.dedup")
+    temporario.unlink(missing_ok=True)
+    os.link(origem, temporario)
+    try:
+        os.replace(temporario, copia)
+    except OSError:
+        temporario.unlink(missing_ok=True)
+        raise
+    return True
+
+
+def deduplica(aplicar: bool = False, max_workers: int = None) -> dict[str, int]:
+    """
+    Registra o conteúdo dos arquivos catalogados que ainda não têm um e,
+    com 'aplicar', troca cada cópia no disco por um link para o objeto do
+    seu conteúdo. O tamanho/mtime registrados dos arquivos vinculados são
+    atualizados (o link tem o mtime do arquivo guardado) para que a ingestão
+    incremental e o cache colunar não os tratem como alterados.
+
+    Retorna:
+        dict: Relatório final ('relatorio_deduplicacao').
+    """
+    # Garante as tabelas de conteúdo em bancos antigos
+    create_database_schema(db_tools.db_path)
+
+    inicio = time.perf_counter()
+    registrados = registra_faltantes(max_workers)
+    if registrados:
+        print(f"Conteúdo registrado para {registrados} arquivos catalogados antes da deduplicação.")
+
+    print("Antes:" if aplicar else "Relatório de deduplicação:")
+    relatorio = relatorio_deduplicacao()
+    imprime_relatorio(relatorio)
+    if not aplicar or relatorio['bytes_a_recuperar'] == 0:
+        return relatorio
+
+    copias = leitura("""
+        SELECT c.arquivo_de_resultado, o.caminho_objeto, c.hash_conteudo
+        FROM conteudo_arquivo AS c
+        JOIN objetos_conteudo AS o ON o.hash_conteudo = c.hash_conteudo
+        WHERE c.arquivo_de_resultado <> o.caminho_objeto
+        ORDER BY o.caminho_objeto
+    """)
+    # Só vale vincular arquivos que não mudaram desde que o hash foi calculado
+    validos = hashes_registrados([c for linha in copias for c in linha[:2]])
+
+    vinculados, protegidos = [], set()
+    for caminho_copia, caminho_objeto, hash_conteudo in copias:
+        if validos.get(caminho_copia) != hash_conteudo or validos.get(caminho_objeto) != hash_conteudo:
+            print(f"  [AVISO] '{caminho_copia}' ou '{caminho_objeto}' mudou desde a ingestão. Ignorado.")
+            continue
+        try:
+            info_objeto = (dir_base / caminho_objeto).stat()
+            info_copia = (dir_base / caminho_copia).stat()
+            if (info_objeto.st_dev, info_objeto.st_ino) == (info_copia.st_dev, info_copia.st_ino):
+                continue
+            if caminho_objeto not in protegidos:
+                os.chmod(dir_base / caminho_objeto, stat.S_IMODE(info_objeto.st_mode) & ~BITS_ESCRITA)
+                protegidos.add(caminho_objeto)
+            if _vincula(caminho_objeto, caminho_copia):
+                vinculados.append((caminho_copia, hash_conteudo))
+        except OSError as e:
+            # Ex.: sistema de arquivos sem suporte a hardlinks, ou cópia em outro disco
+            print(f"  [AVISO] Não foi possível vincular '{caminho_copia}' a '{caminho_objeto}': {e}")
+
+    # O link tem o mtime do arquivo guardado: atualiza os registros que o usam
+    atualizacoes = []
+    for caminho, hash_conteudo in vinculados:
+        info = (dir_base / caminho).stat()
+        atualizacoes.append((info.st_size, info.st_mtime_ns, caminho, hash_conteudo))
+    with sessao() as cursor:
+        cursor.executemany(
+            "UPDATE conteudo_arquivo SET tamanho = ?, mtime_ns = ? WHERE arquivo_de_resultado = ? AND hash_conteudo = ?",
+            atualizacoes
+        )
+        cursor.executemany(
+            "UPDATE estado_ingestao SET tamanho = ?, mtime_ns = ? WHERE caminho_arquivo = ? AND hash_conteudo = ?",
+            atualizacoes
+        )
+        # O cache colunar de uma cópia com conteúdo registrado é o do seu conteúdo
+        cursor.executemany("""
+            UPDATE cache_colunar SET tamanho_origem = ?, mtime_ns_origem = ?
+            WHERE arquivo_de_resultado = ? AND caminho_cache LIKE '%' || ? || '.parquet'
+        """, atualizacoes)
+
+    print(f"{len(vinculados)} cópias vinculadas em {time.perf_counter() - inicio:.2f} s.")
+    print("Depois:")
+    relatorio = relatorio_deduplicacao()
+    imprime_relatorio(relatorio)
+    return relatorio
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--aplicar", action="store_true", help="troca as cópias por links para o objeto guardado")
+    args = parser.parse_args()
+    deduplica(aplicar=args.aplicar)
@@ -0,0 +1,520 @@
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from database_setup.create_schema import create_database_schema
+from etl.populate_db import grava_lote
+from funcoes import db_tools
+from funcoes.catalogo import le_registro_catalogo, grava_catalogo
+from funcoes.db_tools import dir_base, leitura, sessao, incrementa_geracao
+from funcoes.conteudos import impressao_arquivo, registros_catalogados, registra_conteudos
+from funcoes.previas import calcula_previas, grava_previas, copia_previas
+from funcoes.busca import indexa_pendentes
+from funcoes.registro import obter_registro
+
+# Tarefas pegas da fila de uma vez (lidas em paralelo e gravadas em uma transação)
+TAREFAS_POR_LOTE = 32
+
+# Tempo máximo (s) que o trabalhador dorme quando a fila está vazia
+# (um envio novo pela interface o acorda antes disso)
+INTERVALO_ESPERA = 2.0
+
+# Janela (s) usada para calcular a vazão da fila
+JANELA_VAZAO = 60
+
+
+def destino_upload(nome_arquivo: str, codigo_pasta: str, tipo_ensaio: str) -> Path:
+    """
+    Caminho em data/raw onde um arquivo enviado é gravado:
+    'data/raw/grupo_<codigo_pasta>/<tipo_ensaio>/<nome do arquivo>', o mesmo
+    lugar em que o scanner do ETL ('etl.varredura') procura os arquivos.
+    """
+    nome = os.path.basename(nome_arquivo.replace('\\', '/'))
+    if not nome.lower().endswith(".fcs"):
+        raise ValueError(f"'{nome_arquivo}' não é um arquivo .fcs")
+    return dir_base / "data" / "raw" / f"grupo_{codigo_pasta}" / tipo_ensaio / nome
+
+
+def grava_upload(conteudo: bytes, destino: Path):
+    """
+    Grava o conteúdo de um arquivo enviado em um temporário e o renomeia no
+    final: o trabalhador nunca enxerga um arquivo pela metade. Não sobrescreve
+    arquivos existentes.
+    """
+    if destino.exists():
+        raise FileExistsError(f"'{destino.relative_to(dir_base).as_posix()}' já existe em data/raw")
+
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    temporario = destino.with_suffix(destino.suffix + ".tmp")
+    try:
+        with open(temporario, "wb") as f:
+            f.write(conteudo)
+        temporario.replace(destino)
+    except BaseException:
+        temporario.unlink(missing_ok=True)
+        raise
+
+
+def enfileira_uploads(arquivos, nome_grupo: str, tipo_ensaio: str) -> dict[str, any]:
+    """
+    Grava os arquivos enviados em data/raw e cria uma tarefa pendente para
+    cada um na 'fila_ingestao'. A leitura dos metadados e as inserções no
+    banco ficam para o trabalhador em segundo plano, então esta função só
+    faz a cópia dos bytes e um INSERT por arquivo (em uma transação).
+
+    Argumentos:
+        arquivos: Iterável de (nome do arquivo, conteúdo em bytes).
+        nome_grupo (str): Grupo cadastrado no registro ('funcoes.registro').
+        tipo_ensaio (str): Ensaio cadastrado no registro.
+
+    Retorna:
+        dict: 'ids' das tarefas criadas e 'erros' (lista de (nome, mensagem))
+              dos arquivos recusados.
+    """
+    registro = obter_registro()
+    if nome_grupo not in registro.grupos_por_nome:
+        raise ValueError(f"Grupo '{nome_grupo}' não cadastrado")
+    if tipo_ensaio not in registro.ensaios:
+        raise ValueError(f"Ensaio '{tipo_ensaio}' não cadastrado")
+
+    id_grupo = registro.grupos_por_nome[nome_grupo]
+    codigo_pasta = next(codigo for codigo, (id_, _) in registro.grupos_por_codigo.items() if id_ == id_grupo)
+
+    tarefas, erros = [], []
+    for nome_arquivo, conteudo in arquivos:
+        try:
+            destino = destino_upload(nome_arquivo, codigo_pasta, tipo_ensaio)
+            grava_upload(conteudo, destino)
+        except (ValueError, OSError) as e:
+            erros.append((nome_arquivo, str(e)))
+            continue
+        tarefas.append((
+            destino.relative_to(dir_base).as_posix(),
+            id_grupo,
+            tipo_ensaio,
+            registro.descobre_id_animal(destino.name, id_grupo)
+        ))
+
+    ids = []
+    if tarefas:
+        with sessao() as cursor:
+            id_envio = cursor.execute("SELECT COALESCE(MAX(id_envio), 0) + 1 FROM fila_ingestao").fetchone()[0]
+            for tarefa in tarefas:
+                cursor.execute("""
+                    INSERT INTO fila_ingestao (id_envio, caminho_arquivo, id_grupo, tipo_ensaio, id_animal)
+                    VALUES (?, ?, ?, ?, ?) RETURNING id_tarefa
+                """, (id_envio, *tarefa))
+                ids.append(cursor.fetchone()[0])
+
+        # Acorda o trabalhador deste processo, se estiver dormindo
+        if _trabalhador is not None:
+            _trabalhador.avisa()
+
+    return {"ids": ids, "erros": erros}
+
+
+def pega_tarefas(limite: int = TAREFAS_POR_LOTE) -> list[dict[str, any]]:
+    """
+    Marca como 'processando' as tarefas pendentes mais antigas e as devolve.
+    O UPDATE ... RETURNING roda em uma transação imediata, então duas
+    threads (ou processos) nunca pegam a mesma tarefa.
+    """
+    with sessao() as cursor:
+        linhas = cursor.execute("""
+            UPDATE fila_ingestao
+            SET status = 'processando', tentativas = tentativas + 1,
+                iniciada_em = datetime('now'), erro = NULL
+            WHERE id_tarefa IN (
+                SELECT id_tarefa FROM fila_ingestao
+                WHERE status = 'pendente' ORDER BY id_tarefa LIMIT ?
+            )
+            RETURNING id_tarefa, caminho_arquivo, id_grupo, tipo_ensaio, id_animal
+        """, (limite,)).fetchall()
+
+    colunas = ("id_tarefa", "caminho_arquivo", "id_grupo", "tipo_ensaio", "id_animal")
+    return sorted((dict(zip(colunas, linha)) for linha in linhas), key=lambda t: t["id_tarefa"])
+
+
+def _impressao_tarefa(tarefa: dict[str, any]) -> dict[str, any]:
+    """
+    Impressão digital do arquivo da tarefa (hash, tamanho, mtime), em uma
+    leitura sequencial (roda nas threads do pool, sem usar o banco).
+    Erros ficam em tarefa['erro'] em vez de subir.
+    """
+    try:
+        tarefa["hash_conteudo"], tarefa["tamanho"], tarefa["mtime_ns"] = impressao_arquivo(
+            dir_base / tarefa["caminho_arquivo"]
+        )
+        tarefa["erro"] = None
+    except OSError as e:
+        tarefa["erro"] = str(e)
+    return tarefa
+
+
+def _prepara_tarefa(tarefa: dict[str, any]) -> dict[str, any]:
+    """
+    Parte da tarefa que lê o arquivo e não usa o banco (roda nas threads do
+    pool): registro do catálogo e prévias (histogramas/densidades).
+    Erros ficam em tarefa['erro'] em vez de subir.
+    """
+    caminho = dir_base / tarefa["caminho_arquivo"]
+    try:
+        tarefa["catalogo"] = le_registro_catalogo(caminho)
+    except Exception as e:
+        tarefa["erro"] = str(e)
+        return tarefa
+
+    # Prévias são opcionais: um DATA que não dá para decodificar não impede a ingestão
+    try:
+        tarefa["previas"] = calcula_previas(caminho)
+    except Exception as e:
+        tarefa["previas"] = None
+        print(f"  [AVISO] Prévias de '{tarefa['caminho_arquivo']}' não calculadas: {e}")
+    return tarefa
+
+
+def _grava_tarefas(tarefas: list[dict[str, any]]):
+    """
+    Grava um lote de tarefas já preparadas em UMA transação: detalhe + master
+    (via 'grava_lote'), estado da ingestão incremental, conteúdo, catálogo,
+    prévias (copiadas de outro arquivo com o mesmo conteúdo, se a tarefa não
+    as calculou) e o status das tarefas. Arquivos que já estão na 'estado_ingestao' (por exemplo,
+    ingeridos pela 'ingestao_incremental' enquanto esperavam na fila) não
+    são inseridos de novo.
+    """
+    with sessao() as cursor:
+        marcadores = ", ".join("?" for _ in tarefas)
+        ja_ingeridos = dict(cursor.execute(
+            f"SELECT caminho_arquivo, id_detalhe_ensaio FROM estado_ingestao WHERE caminho_arquivo IN ({marcadores})",
+            [tarefa["caminho_arquivo"] for tarefa in tarefas]
+        ).fetchall())
+
+        por_ensaio: dict[str, list[dict]] = {}
+        for tarefa in tarefas:
+            if tarefa["caminho_arquivo"] in ja_ingeridos:
+                tarefa["id_detalhe"] = ja_ingeridos[tarefa["caminho_arquivo"]]
+            else:
+                por_ensaio.setdefault(tarefa["tipo_ensaio"], []).append(tarefa)
+
+        for tipo_ensaio, linhas in por_ensaio.items():
+            ids = grava_lote(cursor, linhas, tipo_ensaio)
+            for tarefa, id_detalhe in zip(linhas, ids):
+                tarefa["id_detalhe"] = id_detalhe
+
+            cursor.executemany("""
+                INSERT INTO estado_ingestao
+                    (caminho_arquivo, tamanho, mtime_ns, hash_conteudo, tipo_ensaio, id_detalhe_ensaio)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [
+                (t["caminho_arquivo"], t["tamanho"], t["mtime_ns"], t["hash_conteudo"], tipo_ensaio, t["id_detalhe"])
+                for t in linhas
+            ])
+
+        registra_conteudos(cursor, {
+            tarefa["caminho_arquivo"]: (tarefa["hash_conteudo"], tarefa["tamanho"], tarefa["mtime_ns"])
+            for tarefa in tarefas
+        })
+        for tarefa in tarefas:
+            id_arquivo = grava_catalogo(cursor, tarefa["caminho_arquivo"], tarefa["catalogo"])
+            if tarefa.get("previas") is not None:
+                grava_previas(cursor, id_arquivo, tarefa["previas"])
+            elif tarefa.get("copia"):
+                copia_previas(cursor, id_arquivo, tarefa["hash_conteudo"])
+
+        cursor.executemany("""
+            UPDATE fila_ingestao
+            SET status = 'concluida', id_detalhe_ensaio = ?, concluida_em = datetime('now')
+            WHERE id_tarefa = ?
+        """, [(tarefa["id_detalhe"], tarefa["id_tarefa"]) for tarefa in tarefas])
+
+        # Texto dos resultados do lote no índice de busca, de uma vez
+        indexa_pendentes(cursor)
+
+        # Avisa os caches do app que o banco mudou (na mesma transação)
+        incrementa_geracao(cursor)
+
+
+def _marca_erro(tarefas: list[dict[str, any]]):
+    """
+    Marca tarefas como 'erro', guardando a mensagem de cada uma.
+    """
+    with sessao() as cursor:
+        cursor.executemany("""
+            UPDATE fila_ingestao
+            SET status = 'erro', erro = ?, concluida_em = datetime('now')
+            WHERE id_tarefa = ?
+        """, [(tarefa["erro"], tarefa["id_tarefa"]) for tarefa in tarefas])
+
+
+def processa_lote(tarefas: list[dict[str, any]], executor: ThreadPoolExecutor) -> tuple[int, int]:
+    """
+    Processa tarefas já pegas da fila: calcula o hash dos arquivos em
+    paralelo no 'executor', lê (catálogo e prévias) um arquivo por conteúdo
+    e grava as que deram certo em uma transação. Cópias de um conteúdo que
+    já está no catálogo não são lidas: o registro vem do banco e as prévias
+    são copiadas na gravação. Se o lote falhar no banco, as tarefas são
+    gravadas uma a uma para isolar a que tem problema (mesma estratégia do
+    'popularDB').
+
+    Retorna:
+        tuple: (tarefas concluídas, tarefas com erro)
+    """
+    tarefas = list(executor.map(_impressao_tarefa, tarefas))
+    com_hash = [tarefa for tarefa in tarefas if tarefa["erro"] is None]
+    conhecidos = registros_catalogados({tarefa["hash_conteudo"] for tarefa in com_hash})
+
+    primeiras: dict[str, dict] = {}
+    for tarefa in com_hash:
+        if tarefa["hash_conteudo"] in conhecidos:
+            tarefa["catalogo"] = conhecidos[tarefa["hash_conteudo"]]
+            tarefa["copia"] = True
+        else:
+            primeiras.setdefault(tarefa["hash_conteudo"], tarefa)
+    list(executor.map(_prepara_tarefa, primeiras.values()))
+
+    # Cópias repetidas dentro do lote usam o que foi lido da primeira
+    for tarefa in com_hash:
+        primeira = primeiras.get(tarefa["hash_conteudo"])
+        if primeira is not None and primeira is not tarefa:
+            tarefa["erro"] = primeira["erro"]
+            tarefa["catalogo"] = primeira.get("catalogo")
+            tarefa["previas"] = primeira.get("previas")
+
+    ok = [tarefa for tarefa in tarefas if tarefa["erro"] is None]
+    falhas = [tarefa for tarefa in tarefas if tarefa["erro"] is not None]
+
+    if ok:
+        try:
+            _grava_tarefas(ok)
+        except sqlite3.Error as e:
+            print(f"  [AVISO] Lote da fila de ingestão falhou ({e}). Refazendo tarefa a tarefa...")
+            gravadas = []
+            for tarefa in ok:
+                try:
+                    _grava_tarefas([tarefa])
+                    gravadas.append(tarefa)
+                except sqlite3.Error as erro_tarefa:
+                    tarefa["erro"] = str(erro_tarefa)
+                    falhas.append(tarefa)
+            ok = gravadas
+
+    if falhas:
+        for tarefa in falhas:
+            print(f"  [FALHA] Tarefa {tarefa['id_tarefa']} ('{tarefa['caminho_arquivo']}'): {tarefa['erro']}")
+        _marca_erro(falhas)
+
+    return len(ok), len(falhas)
+
+
+def recupera_interrompidas() -> int:
+    """
+    Devolve para 'pendente' as tarefas que ficaram em 'processando' porque o
+    processo foi encerrado no meio do lote. Só deve ser chamada quando
+    nenhum trabalhador estiver rodando sobre o mesmo banco.
+
+    Retorna:
+        int: Quantidade de tarefas devolvidas à fila.
+    """
+    with sessao() as cursor:
+        cursor.execute("UPDATE fila_ingestao SET status = 'pendente' WHERE status = 'processando'")
+        return cursor.rowcount
+
+
+def reenfileira_erros() -> int:
+    """
+    Devolve para 'pendente' as tarefas que terminaram com erro.
+
+    Retorna:
+        int: Quantidade de tarefas reenfileiradas.
+    """
+    with sessao() as cursor:
+        cursor.execute("UPDATE fila_ingestao SET status = 'pendente', concluida_em = NULL WHERE status = 'erro'")
+        return cursor.rowcount
+
+
+class TrabalhadorIngestao:
+    """
+    Thread em segundo plano que consome a 'fila_ingestao'. Cada volta pega
+    até 'tarefas_por_lote' tarefas, lê os arquivos em um pool de
+    'max_workers' threads (hash + HEADER/TEXT) e grava o lote em uma única
+    transação. Quando a fila esvazia, dorme até 'INTERVALO_ESPERA' segundos
+    ou até ser avisado de um envio novo ('avisa').
+
+    A página do Streamlit só grava os arquivos e enfileira as tarefas, então
+    o script da sessão nunca espera pela leitura dos arquivos nem pelo banco.
+    """
+
+    def __init__(self, max_workers: int = None, tarefas_por_lote: int = TAREFAS_POR_LOTE):
+        self.max_workers = max_workers
+        self.tarefas_por_lote = tarefas_por_lote
+        self._thread = None
+        self._parar = threading.Event()
+        self._aviso = threading.Event()
+        self._trava = threading.Lock()
+        self.concluidas = 0
+        self.erros = 0
+        self.segundos_ocupado = 0.0
+        self.iniciado_em = None
+
+    @property
+    def ativo(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def inicia(self):
+        """
+        Inicia a thread (se ainda não estiver rodando), recuperando antes as
+        tarefas interrompidas por um encerramento anterior.
+        """
+        with self._trava:
+            if self.ativo:
+                return
+            recuperadas = recupera_interrompidas()
+            if recuperadas:
+                print(f"[AVISO] {recuperadas} tarefa(s) interrompida(s) voltaram para a fila de ingestão.")
+            self._parar.clear()
+            self.iniciado_em = time.time()
+            self._thread = threading.Thread(target=self._laco, name="trabalhador-ingestao", daemon=True)
+            self._thread.start()
+
+    def para(self, timeout: float = None):
+        """
+        Pede para a thread parar depois do lote atual e espera por ela.
+        """
+        self._parar.set()
+        self._aviso.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def avisa(self):
+        """
+        Acorda a thread para olhar a fila agora.
+        """
+        self._aviso.set()
+
+    def processa_pendentes(self, executor: ThreadPoolExecutor) -> int:
+        """
+        Consome a fila até ela esvaziar (ou até 'para' ser chamado).
+
+        Retorna:
+            int: Quantidade de tarefas processadas (concluídas + com erro).
+        """
+        total = 0
+        while not self._parar.is_set():
+            tarefas = pega_tarefas(self.tarefas_por_lote)
+            if not tarefas:
+                break
+            inicio = time.perf_counter()
+            concluidas, erros = processa_lote(tarefas, executor)
+            with self._trava:
+                self.segundos_ocupado += time.perf_counter() - inicio
+                self.concluidas += concluidas
+                self.erros += erros
+            total += concluidas + erros
+        return total
+
+    def _laco(self):
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while not self._parar.is_set():
+                try:
+                    self.processa_pendentes(executor)
+                except Exception as e:
+                    # A thread não pode morrer: registra e tenta de novo na próxima volta
+                    print(f"[FALHA] Trabalhador de ingestão: {e}")
+                self._aviso.wait(INTERVALO_ESPERA)
+                self._aviso.clear()
+
+    def contadores(self) -> dict[str, any]:
+        """
+        Retorna:
+            dict: Tarefas concluídas/com erro por este trabalhador, tempo
+                  ocupado e vazão (arquivos/s enquanto ocupado).
+        """
+        with self._trava:
+            return {
+                "ativo": self.ativo,
+                "concluidas": self.concluidas,
+                "erros": self.erros,
+                "segundos_ocupado": round(self.segundos_ocupado, 2),
+                "arquivos_por_segundo": (
+                    round(self.concluidas / self.segundos_ocupado, 1) if self.segundos_ocupado else None
+                ),
+            }
+
+
+_trabalhador = None
+_trava_trabalhador = threading.Lock()
+
+
+def inicia_trabalhador(max_workers: int = None) -> TrabalhadorIngestao:
+    """
+    Retorna o trabalhador de ingestão do processo, criando e iniciando-o na
+    primeira chamada (as seguintes só conferem que ele continua vivo).
+    O esquema do banco é garantido antes, para a fila existir em bancos antigos.
+    """
+    global _trabalhador
+    with _trava_trabalhador:
+        if _trabalhador is None:
+            create_database_schema(db_tools.db_path)
+            _trabalhador = TrabalhadorIngestao(max_workers)
+        _trabalhador.inicia()
+        return _trabalhador
+
+
+def progresso_fila() -> dict[str, any]:
+    """
+    Situação da fila para a interface.
+
+    Retorna:
+        dict: Contagem por status ('pendente', 'processando', 'concluida',
+              'erro'), progresso dos envios em andamento ('lote_total' e
+              'lote_feitas': tarefas dos envios que ainda têm pendentes) e vazão
+              da última janela ('arquivos_por_minuto').
+    """
+    progresso = {"pendente": 0, "processando": 0, "concluida": 0, "erro": 0}
+    progresso.update(dict(leitura("SELECT status, COUNT(*) FROM fila_ingestao GROUP BY status")))
+
+    lote = leitura("""
+        SELECT COUNT(*), COALESCE(SUM(status IN ('concluida', 'erro')), 0)
+        FROM fila_ingestao
+        WHERE id_envio IN (SELECT id_envio FROM fila_ingestao WHERE status IN ('pendente', 'processando'))
+    """)
+    progresso["lote_total"], progresso["lote_feitas"] = lote[0] if lote else (0, 0)
+
+    recentes = leitura(
+        "SELECT COUNT(*) FROM fila_ingestao WHERE status = 'concluida' AND concluida_em >= datetime('now', ?)",
+        (f"-{JANELA_VAZAO} seconds",)
+    )
+    progresso["arquivos_por_minuto"] = round(recentes[0][0] * 60 / JANELA_VAZAO, 1) if recentes else 0.0
+
+    return progresso
+
+
+def tarefas_recentes(limite: int = 100) -> list[tuple]:
+    """
+    Últimas tarefas da fila (mais novas primeiro), para a tabela da interface.
+
+    Retorna:
+        list: (id_tarefa, caminho_arquivo, tipo_ensaio, id_animal, status,
+               tentativas, erro, criada_em, concluida_em)
+    """
+    return leitura("""
+        SELECT id_tarefa, caminho_arquivo, tipo_ensaio, id_animal, status,
+               tentativas, erro, criada_em, concluida_em
+        FROM fila_ingestao ORDER BY id_tarefa DESC LIMIT ?
+    """, (limite,))
+
+
+if __name__ == "__main__":
+    # Consome a fila uma vez, sem interface (ex.: em um agendador)
+    create_database_schema(db_tools.db_path)
+    recupera_interrompidas()
+    trabalhador = TrabalhadorIngestao()
+    with ThreadPoolExecutor() as executor:
+        inicio = time.perf_counter()
+        processadas = trabalhador.processa_pendentes(executor)
+    print("-" * 50)
+    print(f"Tarefas processadas: {processadas} em {time.perf_counter() - inicio:.2f} s")
+    for chave, valor in trabalhador.contadores().items():
+        print(f"  {chave}: {valor}")
@@ -0,0 +1,156 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from database_setup.create_schema import create_database_schema
+from funcoes import db_tools
+from funcoes.cache_colunar import cache_disponivel, caminho_cache, converte_para_parquet
+from funcoes.db_tools import dir_base, leitura, sessao
+
+
+def gera_cache_colunar(max_workers: int = None, refaz: bool = False) -> dict[str, int]:
+    """
+    Etapa opcional do ETL (rodar depois do 'popularDB' ou da ingestão
+    incremental): converte cada .fcs do catálogo em um .parquet em
+    data/cache/colunar e registra a conversão na tabela 'cache_colunar'.
+
+    Só são convertidos os arquivos sem cache ou cujo .fcs mudou (tamanho ou
+    mtime diferentes dos registrados). Cada conteúdo (ver 'funcoes.conteudos')
+    é convertido uma vez: as cópias de um arquivo apontam para o mesmo
+    .parquet. Registros de arquivos que saíram do catálogo são apagados, e
+    os .parquet que ficam sem nenhum registro também.
+
+    Argumentos:
+        max_workers (int): Threads usadas na conversão.
+        refaz (bool): Se True, converte todos os arquivos de novo.
+
+    Retorna:
+        dict: Contagem de arquivos 'convertidos', 'copias' (registrados com o
+              .parquet de outra cópia), 'em_dia', 'removidos' e 'erros'.
+    """
+    contagem = {'convertidos': 0, 'copias': 0, 'em_dia': 0, 'removidos': 0, 'erros': 0}
+
+    if not cache_disponivel():
+        print("AVISO: pyarrow não está instalado. Cache colunar não gerado.")
+        return contagem
+
+    print("Iniciando a geração do cache colunar...")
+    inicio = time.perf_counter()
+
+    # Garante que a tabela 'cache_colunar' exista em bancos antigos
+    create_database_schema(db_tools.db_path)
+
+    catalogados = [linha[0] for linha in leitura("SELECT arquivo_de_resultado FROM metadados_arquivo")]
+    registrados = {
+        linha[0]: linha[1:] for linha in leitura("""
+            SELECT arquivo_de_resultado, caminho_cache, tamanho_origem, mtime_ns_origem,
+                   eventos, colunas, tamanho_cache
+            FROM cache_colunar
+        """)
+    }
+    conteudos = {
+        linha[0]: linha[1:] for linha in leitura(
+            "SELECT arquivo_de_resultado, hash_conteudo, tamanho, mtime_ns FROM conteudo_arquivo"
+        )
+    }
+
+    # 1. Decide o que precisa ser convertido: um .parquet por destino (por
+    #    conteúdo, quando o hash registrado ainda vale para o arquivo)
+    por_destino: dict[Path, list[tuple]] = {}
+    de_conteudo: set[Path] = set()
+    for caminho_rel in catalogados:
+        try:
+            info = (dir_base / caminho_rel).stat()
+        except OSError:
+            continue
+
+        anterior = registrados.get(caminho_rel)
+        if (not refaz and anterior and anterior[1] == info.st_size and anterior[2] == info.st_mtime_ns
+                and (dir_base / anterior[0]).exists()):
+            contagem['em_dia'] += 1
+            continue
+
+        hash_conteudo, tamanho, mtime_ns = conteudos.get(caminho_rel, (None, None, None))
+        if (tamanho, mtime_ns) != (info.st_size, info.st_mtime_ns):
+            hash_conteudo = None
+        destino = caminho_cache(caminho_rel, hash_conteudo)
+        por_destino.setdefault(destino, []).append((caminho_rel, info))
+        if hash_conteudo:
+            de_conteudo.add(destino)
+
+    # .parquet de um conteúdo já gerado para outra cópia (ele nunca muda): só falta registrar
+    gerados = {dir_base / linha[0]: linha[3:] for linha in registrados.values()}
+    a_converter = [
+        (destino, copias) for destino, copias in por_destino.items()
+        if refaz or destino not in de_conteudo or destino not in gerados or not destino.exists()
+    ]
+
+    conjunto_catalogados = set(catalogados)
+    removidos = [caminho for caminho in registrados if caminho not in conjunto_catalogados]
+
+    # 2. Converte em paralelo (a leitura e a compressão liberam o GIL), um arquivo por destino
+    def _converte(item):
+        destino, copias = item
+        try:
+            return destino, converte_para_parquet(dir_base / copias[0][0], destino), None
+        except Exception as e:
+            return destino, None, str(e)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for destino, resultado, erro in executor.map(_converte, a_converter):
+            if erro is not None:
+                print(f"  [FALHA] Não foi possível converter '{por_destino[destino][0][0]}': {erro}")
+                contagem['erros'] += len(por_destino[destino])
+                del por_destino[destino]
+                continue
+            gerados[destino] = (resultado['eventos'], resultado['colunas'], resultado['tamanho_cache'])
+            contagem['convertidos'] += 1
+
+    registros = [
+        (caminho_rel, destino.relative_to(dir_base).as_posix(), info.st_size, info.st_mtime_ns, *gerados[destino])
+        for destino, copias in por_destino.items()
+        for caminho_rel, info in copias
+    ]
+    contagem['copias'] = len(registros) - contagem['convertidos']
+
+    # 3. Registra tudo em uma única transação
+    with sessao() as cursor:
+        cursor.executemany("""
+            INSERT INTO cache_colunar
+                (arquivo_de_resultado, caminho_cache, tamanho_origem, mtime_ns_origem,
+                 eventos, colunas, tamanho_cache)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (arquivo_de_resultado) DO UPDATE SET
+                caminho_cache = excluded.caminho_cache,
+                tamanho_origem = excluded.tamanho_origem,
+                mtime_ns_origem = excluded.mtime_ns_origem,
+                eventos = excluded.eventos,
+                colunas = excluded.colunas,
+                tamanho_cache = excluded.tamanho_cache,
+                gerado_em = datetime('now')
+        """, registros)
+        cursor.executemany(
+            "DELETE FROM cache_colunar WHERE arquivo_de_resultado = ?",
+            [(caminho,) for caminho in removidos]
+        )
+        em_uso = {linha[0] for linha in cursor.execute("SELECT DISTINCT caminho_cache FROM cache_colunar")}
+    contagem['removidos'] = len(removidos)
+
+    # .parquet antigos que nenhum registro usa mais (arquivos removidos ou
+    # que passaram a usar o .parquet do seu conteúdo)
+    for caminho_cache_antigo, *_ in registrados.values():
+        if caminho_cache_antigo not in em_uso:
+            (dir_base / caminho_cache_antigo).unlink(missing_ok=True)
+
+    duracao = time.perf_counter() - inicio
+
+    print("-" * 50)
+    print("Cache colunar concluído.")
+    for chave, valor in contagem.items():
+        print(f"  {chave}: {valor}")
+    print(f"Tempo total: {duracao:.2f} s")
+
+    return contagem
+
+
+if __name__ == "__main__":
+    gera_cache_colunar()
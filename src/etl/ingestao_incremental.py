@@ -0,0 +1,284 @@
+import time
+from pathlib import Path
+from database_setup.create_schema import create_database_schema
+from etl.mapeamento import dir_base, gera_linhas_mapeamento
+from etl.populate_db import grava_lote
+from funcoes import db_tools
+from funcoes.catalogo import grava_catalogo, remove_catalogo
+from funcoes.conteudos import le_registros_unicos, registra_conteudos, remove_conteudos
+from funcoes.db_tools import leitura, sessao, atualiza_estatisticas, incrementa_geracao
+from funcoes.hash_arquivos import calcula_hash
+from funcoes.paineis import indexa_faltantes
+from funcoes.previas import calcula_faltantes
+from funcoes.busca import sincroniza_busca
+from funcoes.registro import Registro, obter_registro
+
+
+def normaliza_caminho(caminho: str) -> str:
+    """
+    Normaliza um caminho relativo para usar sempre '/' como separador
+    (o 'mapeamento.csv' antigo foi gerado no Windows, com '\\').
+    """
+    return str(caminho).replace('\\', '/')
+
+
+def _carrega_estado() -> dict[str, tuple]:
+    """
+    Lê a tabela 'estado_ingestao' para um dicionário
+    caminho -> (tamanho, mtime_ns, hash_conteudo, tipo_ensaio, id_detalhe_ensaio).
+    """
+    linhas = leitura("""
+        SELECT caminho_arquivo, tamanho, mtime_ns, hash_conteudo, tipo_ensaio, id_detalhe_ensaio
+        FROM estado_ingestao
+    """)
+    return {linha[0]: linha[1:] for linha in linhas}
+
+
+def _carrega_detalhes_existentes(registro: Registro) -> dict[str, list[tuple[str, int]]]:
+    """
+    Lê as linhas já existentes nas tabelas de detalhes (inseridas antes da
+    ingestão incremental existir), agrupadas pelo caminho normalizado.
+
+    Retorna:
+        dict: caminho -> lista de (tipo_ensaio, id_detalhe), em ordem de ID.
+    """
+    existentes: dict[str, list[tuple[str, int]]] = {}
+    for tipo_ensaio, (tabela, pk) in registro.ensaios.items():
+        for id_detalhe, caminho in leitura(f"SELECT {pk}, arquivo_de_resultado FROM {tabela} ORDER BY {pk}"):
+            existentes.setdefault(normaliza_caminho(caminho), []).append((tipo_ensaio, id_detalhe))
+    return existentes
+
+
+def _hash_registrado(conteudos: dict[str, tuple], caminho: str) -> str:
+    """
+    Hash do conteúdo já gravado na 'conteudo_arquivo' para o arquivo (None se não houver).
+    """
+    return conteudos.get(caminho, (None,))[0]
+
+
+def _remove_detalhe(cursor, registro: Registro, tipo_ensaio: str, id_detalhe: int):
+    """
+    Apaga uma linha de detalhe e as linhas da 'experimentos_master' que apontam para ela.
+    """
+    cursor.execute(
+        "DELETE FROM experimentos_master WHERE tipo_ensaio = ? AND id_detalhe_ensaio = ?",
+        (tipo_ensaio, id_detalhe)
+    )
+    cursor.execute(
+        f"DELETE FROM {registro.tabela_detalhe(tipo_ensaio)} WHERE {registro.pk_detalhe(tipo_ensaio)} = ?",
+        (id_detalhe,)
+    )
+
+
+def ingestao_incremental(dir_base: Path = dir_base, limpa_duplicados: bool = True) -> dict[str, int]:
+    """
+    Ingestão incremental e idempotente dos arquivos .fcs de data/raw.
+
+    Cada arquivo ingerido tem sua impressão digital (tamanho, mtime e hash do
+    conteúdo) guardada na tabela 'estado_ingestao'. Em uma nova execução:
+        - arquivos com mesmo tamanho e mtime são ignorados sem serem lidos;
+        - arquivos novos são inseridos (detalhe + master);
+        - arquivos com conteúdo alterado têm o estado atualizado;
+        - arquivos que sumiram do disco são removidos do banco.
+
+    Os metadados (HEADER/TEXT) dos arquivos novos ou alterados são gravados
+    no catálogo ('metadados_arquivo'/'canais_arquivo') na mesma transação,
+    junto com o conteúdo (hash) de cada arquivo ('funcoes.conteudos'): cópias
+    de um conteúdo já catalogado (ou repetido entre os novos) não são lidas
+    de novo, e as prévias são calculadas uma vez por conteúdo.
+
+    Na primeira execução, as linhas que já existiam nas tabelas de detalhes
+    são "adotadas" (não são inseridas de novo, nem catalogadas de novo se o
+    catálogo já tem o mesmo conteúdo). Se 'limpa_duplicados' for True,
+    cópias repetidas do mesmo arquivo (de execuções antigas do popularDB) são apagadas.
+
+    Retorna:
+        dict: Contagem de arquivos 'novos', 'alterados', 'removidos',
+              'inalterados', 'adotados', 'duplicados_removidos',
+              'catalogados', 'copias_sem_leitura', 'erros_catalogo',
+              'paineis_indexados', 'previas_calculadas' e 'documentos_busca'.
+    """
+    print("Iniciando a ingestão incremental...")
+    inicio = time.perf_counter()
+
+    # Garante as tabelas novas e o registro padrão de grupos/ensaios em bancos antigos
+    create_database_schema(db_tools.db_path)
+
+    registro = obter_registro()
+
+    estado = _carrega_estado()
+
+    contagem = {
+        'novos': 0, 'alterados': 0, 'removidos': 0,
+        'inalterados': 0, 'adotados': 0, 'duplicados_removidos': 0,
+        'catalogados': 0, 'copias_sem_leitura': 0, 'erros_catalogo': 0
+    }
+
+    vistos: set[str] = set()
+    novos_por_ensaio: dict[str, list[dict]] = {}
+    atualizacoes_estado: list[tuple] = []
+    caminhos_absolutos: dict[str, Path] = {}
+    a_catalogar: set[str] = set()
+
+    # Conteúdo de cada arquivo: o que já está registrado e o que falta gravar
+    conteudos = {linha[0]: linha[1:] for linha in leitura(
+        "SELECT arquivo_de_resultado, hash_conteudo, tamanho, mtime_ns FROM conteudo_arquivo"
+    )}
+    impressoes: dict[str, tuple[str, int, int]] = {}
+    hashes: dict[str, str] = {}
+
+    # 1. Compara o que está no disco com o estado salvo
+    for nome_grupo, tipo_ensaio, id_animal, arquivo_path in gera_linhas_mapeamento(dir_base, registro=registro):
+        caminho_rel = normaliza_caminho(arquivo_path.relative_to(dir_base).as_posix())
+        vistos.add(caminho_rel)
+        caminhos_absolutos[caminho_rel] = arquivo_path
+
+        info = arquivo_path.stat()
+        anterior = estado.get(caminho_rel)
+
+        if anterior and anterior[0] == info.st_size and anterior[1] == info.st_mtime_ns:
+            contagem['inalterados'] += 1
+            hashes[caminho_rel] = anterior[2]
+            # Arquivos ingeridos antes da deduplicação existir: o hash vem do estado
+            if conteudos.get(caminho_rel) != (anterior[2], anterior[0], anterior[1]):
+                impressoes[caminho_rel] = (anterior[2], anterior[0], anterior[1])
+            continue
+
+        # Só lê o conteúdo dos arquivos novos ou com tamanho/mtime diferente
+        hash_conteudo = calcula_hash(arquivo_path)
+        hashes[caminho_rel] = hash_conteudo
+        impressoes[caminho_rel] = (hash_conteudo, info.st_size, info.st_mtime_ns)
+
+        if anterior:
+            if anterior[2] == hash_conteudo:
+                # Apenas o mtime mudou (arquivo copiado/tocado): atualiza o estado
+                contagem['inalterados'] += 1
+            else:
+                contagem['alterados'] += 1
+                a_catalogar.add(caminho_rel)
+            atualizacoes_estado.append(
+                (info.st_size, info.st_mtime_ns, hash_conteudo, caminho_rel)
+            )
+            continue
+
+        a_catalogar.add(caminho_rel)
+        novos_por_ensaio.setdefault(tipo_ensaio, []).append({
+            'id_grupo': registro.grupos_por_nome[nome_grupo],
+            'id_animal': id_animal,
+            'caminho_arquivo': caminho_rel,
+            'tamanho': info.st_size,
+            'mtime_ns': info.st_mtime_ns,
+            'hash_conteudo': hash_conteudo
+        })
+
+    removidos = [caminho for caminho in estado if caminho not in vistos]
+
+    # 2. Linhas antigas (sem estado) que correspondem aos arquivos "novos"
+    existentes = _carrega_detalhes_existentes(registro) if novos_por_ensaio else {}
+
+    # 3. Lê os metadados que faltam no catálogo (fora da transação, em paralelo),
+    #    um arquivo por conteúdo
+    catalogados = {linha[0] for linha in leitura("SELECT arquivo_de_resultado FROM metadados_arquivo")}
+    # Arquivos já catalogados com o mesmo conteúdo (ex.: linhas adotadas) não são relidos
+    a_catalogar = {
+        caminho for caminho in a_catalogar
+        if caminho not in catalogados or _hash_registrado(conteudos, caminho) != hashes[caminho]
+    }
+    a_catalogar |= {caminho for caminho in vistos if caminho not in catalogados}
+    registros, erros_catalogo, lidos = le_registros_unicos(
+        {caminho: caminhos_absolutos[caminho] for caminho in a_catalogar}, hashes
+    )
+    contagem['copias_sem_leitura'] = len(a_catalogar) - lidos
+    for caminho, erro in erros_catalogo:
+        print(f"  [FALHA] Não foi possível ler os metadados de '{caminho}': {erro}")
+    contagem['erros_catalogo'] = len(erros_catalogo)
+
+    # 4. Aplica todas as mudanças em uma única transação
+    with sessao() as cursor:
+        sql_estado = """
+            INSERT INTO estado_ingestao
+                (caminho_arquivo, tamanho, mtime_ns, hash_conteudo, tipo_ensaio, id_detalhe_ensaio)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """
+
+        for tipo_ensaio, linhas in novos_por_ensaio.items():
+            a_inserir = []
+            for linha in linhas:
+                ja_existentes = [
+                    id_detalhe for ensaio, id_detalhe in existentes.get(linha['caminho_arquivo'], [])
+                    if ensaio == tipo_ensaio
+                ]
+                if not ja_existentes:
+                    a_inserir.append(linha)
+                    continue
+
+                # Adota a linha mais antiga e, se pedido, apaga as repetidas
+                linha['id_detalhe'] = ja_existentes[0]
+                contagem['adotados'] += 1
+                if limpa_duplicados:
+                    for id_duplicado in ja_existentes[1:]:
+                        _remove_detalhe(cursor, registro, tipo_ensaio, id_duplicado)
+                        contagem['duplicados_removidos'] += 1
+
+            if a_inserir:
+                ids = grava_lote(cursor, a_inserir, tipo_ensaio)
+                for linha, id_detalhe in zip(a_inserir, ids):
+                    linha['id_detalhe'] = id_detalhe
+                contagem['novos'] += len(a_inserir)
+
+            cursor.executemany(sql_estado, [
+                (linha['caminho_arquivo'], linha['tamanho'], linha['mtime_ns'],
+                 linha['hash_conteudo'], tipo_ensaio, linha['id_detalhe'])
+                for linha in linhas
+            ])
+
+        cursor.executemany("""
+            UPDATE estado_ingestao
+            SET tamanho = ?, mtime_ns = ?, hash_conteudo = ?, ingerido_em = datetime('now')
+            WHERE caminho_arquivo = ?
+        """, atualizacoes_estado)
+
+        for caminho in removidos:
+            _, _, _, tipo_ensaio, id_detalhe = estado[caminho]
+            _remove_detalhe(cursor, registro, tipo_ensaio, id_detalhe)
+            cursor.execute("DELETE FROM estado_ingestao WHERE caminho_arquivo = ?", (caminho,))
+            remove_catalogo(cursor, caminho)
+            contagem['removidos'] += 1
+        remove_conteudos(cursor, removidos)
+        registra_conteudos(cursor, impressoes)
+
+        for caminho, registro_catalogo in registros.items():
+            grava_catalogo(cursor, caminho, registro_catalogo,
+                           descarta_previas=_hash_registrado(conteudos, caminho) != hashes[caminho])
+        contagem['catalogados'] = len(registros)
+
+        # Avisa os caches do app que o banco mudou (na mesma transação)
+        if any(contagem[chave] for chave in ('novos', 'removidos', 'adotados', 'duplicados_removidos', 'catalogados')):
+            incrementa_geracao(cursor)
+
+    # Arquivos catalogados antes do índice de painéis existir
+    contagem['paineis_indexados'] = indexa_faltantes()
+
+    # Histogramas e densidades dos arquivos novos/alterados (lê os eventos, fora da transação)
+    contagem['previas_calculadas'] = calcula_faltantes()
+
+    # Texto dos resultados novos/alterados no índice de busca (um comando só)
+    contagem['documentos_busca'] = sincroniza_busca()
+
+    if any(contagem[chave] for chave in ('novos', 'removidos', 'adotados', 'catalogados', 'paineis_indexados')):
+        # Estatísticas atualizadas para o SQLite usar os índices nas consultas
+        atualiza_estatisticas()
+
+    duracao = time.perf_counter() - inicio
+
+    print("-" * 50)
+    print("Ingestão incremental concluída.")
+    for chave, valor in contagem.items():
+        print(f"  {chave}: {valor}")
+    print(f"Tempo total: {duracao:.2f} s")
+
+    return contagem
+
+
+if __name__ == "__main__":
+    ingestao_incremental()
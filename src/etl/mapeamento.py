@@ -1,59 +1,50 @@
-import pandas as pd
 from pathlib import Path
-from funcoes.pega_arquivos import pega_arquivos
-import re 
+from etl.varredura import varre_arquivos, linhas_manifesto, escreve_manifesto_csv, escreve_manifesto_parquet
+from funcoes.registro import obter_registro
 
 dir_base = Path(__file__).resolve().parent.parent.parent
 
-mapa_dos_grupos = {
-    "a": "Grupo A",
-    "b": "Grupo B",
-    "c": "Grupo C"
-}
+# O CSV fica ao lado do 'populate_db.py', que é quem o lê
+mapa_csv = Path(__file__).resolve().parent / "mapeamento.csv"
 
-mapa_id_animal = {
-    "Grupo A": (11, 20),
-    "Grupo B": (21, 30),
-    "Grupo C": (31, 40)
-}
 
-# 1 - Cria lista vazia para guardar as linhas planas
-lista_para_csv = []
+def gera_linhas_mapeamento(dir_base: Path = dir_base, max_workers: int = None, registro=None):
+    """
+    Percorre data/raw uma única vez (ver 'etl.varredura.varre_arquivos') e
+    gera, para cada arquivo .fcs, uma linha [nome_grupo, tipo_ensaio, id_animal, arquivo_path].
+    'arquivo_path' é o caminho absoluto do arquivo (Path).
 
-# 2 - Itera sobre o dicionário principal
-for letra_do_grupo, nome_do_grupo in mapa_dos_grupos.items():
-    
-    print(f"Processando: {nome_do_grupo}")
+    Grupos, pastas de ensaio e faixas de IDs de animais vêm do registro do
+    banco ('funcoes.registro'), a menos que outro 'registro' seja passado.
+    """
+    registro = registro or obter_registro()
+    for nome_grupo, tipo_ensaio, id_animal, caminho in varre_arquivos(dir_base, registro, max_workers):
+        yield [nome_grupo, tipo_ensaio, id_animal, Path(caminho)]
 
-    range_valido = mapa_id_animal[nome_do_grupo]
 
-    dados_do_grupo = pega_arquivos(letra_do_grupo, dir_base)
+def gera_mapeamento(dir_base: Path = dir_base, destino: Path = mapa_csv, max_workers: int = None,
+                    registro=None) -> int:
+    """
+    Gera o manifesto com todos os arquivos encontrados em data/raw. As linhas
+    são gravadas à medida que as pastas são lidas (nada é acumulado na memória).
+    O formato segue a extensão de 'destino': '.csv' (padrão) ou '.parquet'.
 
-    for tipo_ensaio, detalhes in dados_do_grupo.items():
-        # 3 - Itera sobre lista_arquivos
-        for arquivo_path in detalhes['lista_arquivos']:
+    Retorna:
+        int: Quantidade de arquivos no manifesto.
+    """
+    linhas = linhas_manifesto(
+        varre_arquivos(dir_base, registro or obter_registro(), max_workers),
+        dir_base
+    )
 
-            arquivo = arquivo_path.name
+    if Path(destino).suffix.lower() == ".parquet":
+        total = escreve_manifesto_parquet(linhas, destino)
+    else:
+        total = escreve_manifesto_csv(linhas, destino)
 
-            id_animal = None
+    print(f"{total} arquivos gravados em {destino}")
+    return total
 
-            sei_la = re.findall(r"\d+",arquivo)
-            numeros = [int(s) for s in sei_la]
 
-            for num in numeros:
-                # Verifica se no range
-                if range_valido[0] <= num <= range_valido[1]:
-                    id_animal = int(num)
-                    break
-
-            caminho_relativo = arquivo_path.relative_to(dir_base)
-            nova_linha = [nome_do_grupo, tipo_ensaio, id_animal, str(caminho_relativo)]
-
-            lista_para_csv.append(nova_linha)
-
-        df = pd.DataFrame(lista_para_csv, columns=["nome_grupo", "tipo_ensaio", "id_animal", "caminho_arquivo"])
-
-        # df está salvando o ID animal como float
-        df['id_animal'] = df['id_animal'].astype('Int64')
-
-        df.to_csv(dir_base / "mapeamento.csv", index=False)
+if __name__ == "__main__":
+    gera_mapeamento()
@@ -1,19 +1,178 @@
-import pandas as pd
 from pathlib import Path
 import sqlite3
-from funcoes.db_tools import  escrita, leitura
+import time
+from database_setup.create_schema import create_database_schema
+from funcoes import db_tools
+from funcoes.db_tools import  escrita, sessao, atualiza_estatisticas, incrementa_geracao
+from funcoes.conteudos import cataloga_arquivos
+from funcoes.previas import calcula_faltantes
+from funcoes.busca import sincroniza_busca
+from funcoes.registro import obter_registro
 
 script_dir = Path(__file__).resolve().parent
 
 mapa_csv = script_dir / "mapeamento.csv"
 
-def popularDB():
+# Quantidade máxima de linhas gravadas em uma única transação no modo em lote
+TAMANHO_LOTE = 5000
+
+
+def _valor_sql(valor):
+    """
+    Converte valores do pandas (NA, numpy int) para tipos que o sqlite3 entende.
+    """
+    import pandas as pd
+
+    if valor is None or pd.isna(valor):
+        return None
+    if hasattr(valor, 'item'):
+        return valor.item()
+    return valor
+
+
+def insere_linha_a_linha(linhas: list[dict], tipo_ensaio: str) -> tuple[int, list[tuple[int, str]]]:
+    """
+    Caminho antigo (e mais lento) do ETL: duas chamadas a 'escrita()' por linha,
+    cada uma com o seu próprio commit. Usado como alternativa quando o lote falha,
+    pois permite saber exatamente qual linha deu problema.
+
+    Argumentos:
+        linhas (list[dict]): Linhas já validadas, com 'indice', 'id_grupo',
+                             'id_animal' e 'caminho_arquivo'.
+        tipo_ensaio (str): Ensaio comum a todas as linhas.
+
+    Retorna:
+        tuple: (quantidade de sucessos, lista de (indice da linha, mensagem de erro))
+    """
+    # Tabela de detalhes do ensaio, vinda do registro ('funcoes.registro')
+    nome_tabela_detalhe = obter_registro().tabela_detalhe(tipo_ensaio)
+    sucessos = 0
+    erros = []
+
+    sql_detalhe = f"""
+        INSERT INTO {nome_tabela_detalhe} (id_animal, arquivo_de_resultado, condicao)
+        VALUES (?, ?, ?)
+    """
+    sql_mestre = """
+        INSERT INTO experimentos_master (id_grupo, data_experimento, tipo_ensaio, id_detalhe_ensaio)
+        VALUES (?, ?, ?, ?)
+    """
+
+    for linha in linhas:
+        index = linha['indice']
+        try:
+            params_detalhe = (linha['id_animal'], linha['caminho_arquivo'], None)
+
+            # Usa a função 'escrita' e CAPTURA o ID retornado
+            id_detalhe_criado = escrita(sql_detalhe, params_detalhe)
+
+            if id_detalhe_criado is None:
+                print(f"  [FALHA] Erro ao inserir em '{nome_tabela_detalhe}'. Pulando linha {index}.")
+                erros.append((index, f"Erro ao inserir em '{nome_tabela_detalhe}'"))
+                continue
+
+            params_mestre = (
+                linha['id_grupo'],
+                None, # data_experimento é NULL
+                tipo_ensaio,
+                id_detalhe_criado # O ID que acabamos de capturar!
+            )
+
+            if escrita(sql_mestre, params_mestre) is None:
+                print(f"  [FALHA] Erro ao inserir em 'experimentos_master'. Linha {index}.")
+                erros.append((index, "Erro ao inserir em 'experimentos_master'"))
+                continue
+
+            sucessos += 1
+
+        except Exception as e:
+            print(f"  [FALHA GERAL] Erro inesperado na linha {index}: {e}")
+            erros.append((index, str(e)))
+
+    return sucessos, erros
+
+
+def grava_lote(cursor, linhas: list[dict], tipo_ensaio: str) -> list[int]:
+    """
+    Grava um lote de linhas de um mesmo ensaio usando 'executemany' tanto na
+    tabela de detalhes quanto na 'experimentos_master', dentro da transação
+    do cursor recebido (aberto com 'sessao()').
+
+    Os IDs de detalhe são reservados de uma vez: como a transação já detém o
+    direito de escrita, lê-se o maior ID atual e os novos IDs são atribuídos
+    em sequência, então a ligação mestre-detalhe é resolvida sem precisar de
+    um 'lastrowid' por linha.
+
+    Retorna:
+        list[int]: Os IDs de detalhe criados, na mesma ordem de 'linhas'.
+    """
+    registro = obter_registro()
+    nome_tabela_detalhe = registro.tabela_detalhe(tipo_ensaio)
+    pk = registro.pk_detalhe(tipo_ensaio)
+
+    cursor.execute(f"SELECT COALESCE(MAX({pk}), 0) FROM {nome_tabela_detalhe}")
+    primeiro_id = cursor.fetchone()[0] + 1
+
+    ids_detalhe = list(range(primeiro_id, primeiro_id + len(linhas)))
+
+    cursor.executemany(
+        f"""
+        INSERT INTO {nome_tabela_detalhe} ({pk}, id_animal, arquivo_de_resultado, condicao)
+        VALUES (?, ?, ?, ?)
+        """,
+        [
+            (id_detalhe, linha['id_animal'], linha['caminho_arquivo'], None)
+            for id_detalhe, linha in zip(ids_detalhe, linhas)
+        ]
+    )
+
+    cursor.executemany(
+        """
+        INSERT INTO experimentos_master (id_grupo, data_experimento, tipo_ensaio, id_detalhe_ensaio)
+        VALUES (?, ?, ?, ?)
+        """,
+        [
+            (linha['id_grupo'], None, tipo_ensaio, id_detalhe)
+            for id_detalhe, linha in zip(ids_detalhe, linhas)
+        ]
+    )
+
+    return ids_detalhe
+
+
+def insere_em_lote(linhas: list[dict], tipo_ensaio: str) -> int:
+    """
+    Insere um lote de linhas de um mesmo ensaio em UMA transação (ver 'grava_lote').
+    Se qualquer linha falhar, o lote inteiro é desfeito e a exceção é repassada.
+
+    Retorna:
+        int: Quantidade de linhas inseridas.
+    """
+    with sessao() as cursor:
+        grava_lote(cursor, linhas, tipo_ensaio)
+
+    return len(linhas)
+
+
+def popularDB(modo: str = "lote"):
     """
     Função principal do ETL.
     Lê o CSV de mapeamento e popula o banco de dados.
+
+    Argumentos:
+        modo (str): "lote" (padrão) agrupa as linhas por 'tipo_ensaio' e grava
+                    cada lote em uma única transação. Se um lote falhar, ele é
+                    refeito linha a linha para identificar as linhas com erro.
+                    "linha" usa sempre o caminho linha a linha.
     """
+    import pandas as pd
+
     print("Iniciando o script de ETL para popular o banco...")
-    
+
+    if modo not in ("lote", "linha"):
+        print(f"ERRO: Modo '{modo}' inválido. Use 'lote' ou 'linha'.")
+        return
+
     # 1. Ler o mapa de arquivos
     print(f"Lendo o mapa de arquivos em: {mapa_csv}")
     try:
@@ -21,7 +180,7 @@ def popularDB():
         # Lida com IDs de animais vazios (que o Pandas lê como NaN)
         # Substitui NaN por None, que o SQLite entende como NULL.
         df_mapa['id_animal'] = df_mapa['id_animal'].astype('Int64').where(df_mapa['id_animal'].notna(), None)
-        
+
     except FileNotFoundError:
         print(f"ERRO: Arquivo '{mapa_csv.name}' não encontrado em {script_dir}.")
         print("Verifique o nome e a localização do arquivo.")
@@ -33,113 +192,107 @@ def popularDB():
 
     print(f"Encontradas {len(df_mapa)} linhas no mapa.")
 
-    query_grupos = "SELECT id_grupo, nome_grupo FROM grupos"
+    # Garante o esquema e o registro padrão de grupos/ensaios em bancos antigos
+    create_database_schema(db_tools.db_path)
 
     try:
-        resultados_grupos = leitura(query_grupos)
+        registro = obter_registro()
     except Exception as e:
-        print(f"Falha ao ler a tabela 'grupos'. Erro: {e}")
+        print(f"Falha ao ler o registro de grupos/ensaios. Erro: {e}")
         return
 
-    # Transforma a lista de tuplas em um dicionário rápido
-    # Isso é uma "compreensão de dicionário" (dictionary comprehension)
-    # Para cada (id, nome) na lista, ele cria um par 'nome': id
-    mapa_grupos = {nome: id for id, nome in resultados_grupos}
-
+    # Grupos e ensaios vêm do registro do banco: nome do grupo -> id
+    mapa_grupos = registro.grupos_por_nome
     print(f"Mapa de tradução criado: {mapa_grupos}")
-    if not mapa_grupos:
-        print("AVISO: A tabela 'grupos' está vazia. Você precisa inserir os grupos primeiro.")
-        # (O ideal seria ter um script para popular 'grupos' ou fazê-lo aqui)
-        # Vamos inserir os grupos se não existirem (forma robusta)
-        print("Populando tabela 'grupos' (se necessário)...")
-        # 'INSERT OR IGNORE' não fará nada se o grupo já existir
-        escrita("INSERT OR IGNORE INTO grupos (nome_grupo) VALUES (?)", ("Grupo A",))
-        escrita("INSERT OR IGNORE INTO grupos (nome_grupo) VALUES (?)", ("Grupo B",))
-        escrita("INSERT OR IGNORE INTO grupos (nome_grupo) VALUES (?)", ("Grupo C",))
-        # Recria o mapa
-        resultados_grupos = leitura(query_grupos)
-        mapa_grupos = {nome: id for id, nome in resultados_grupos}
-        print(f"Mapa de tradução recriado: {mapa_grupos}")
-
-    # --- LOOP PRINCIPAL DO ETL (O "CHAPÉU SELETOR") ---
-    print("\nIniciando a inserção no banco de dados...")
 
-    # Dicionário de "mapas de query" para evitar um 'if/elif' gigante
-    # Mapeia o 'tipo_ensaio' do CSV para o nome da tabela de detalhes
-    mapa_tabelas_detalhe = {
-        'agonistas': 'detalhes_agonistas',
-        'cryptococcus': 'detalhes_cryptococcus',
-        'fagocitose': 'detalhes_fagocitose',
-        'imunofenotipagem': 'detalhes_imunofenotipagem'
-        # Adicione novos ensaios aqui no futuro
-    }
+    # --- VALIDAÇÃO E SEPARAÇÃO POR ENSAIO (O "CHAPÉU SELETOR") ---
+    print("\nIniciando a inserção no banco de dados...")
 
     contador_sucesso = 0
     contador_falha = 0
+    erros_por_linha = []
 
-    # Itera sobre cada linha do DataFrame do CSV
-    for index, linha in df_mapa.iterrows():
-        try:
-            # 3.1. Pega os dados da linha
-            nome_grupo = linha['nome_grupo']
-            tipo_ensaio = linha['tipo_ensaio']
-            id_animal = linha['id_animal']
-            caminho_arquivo = linha['caminho_arquivo']
-            
-            # 3.2. TRADUZIR o nome para ID usando o mapa
-            id_grupo = mapa_grupos.get(nome_grupo)
-            if id_grupo is None:
-                print(f"  [FALHA] Grupo '{nome_grupo}' não encontrado no banco de dados. Pulando linha {index}.")
-                contador_falha += 1
-                continue # Pula para a próxima linha do CSV
-
-            # 3.3. ACHAR a tabela de detalhe correta
-            nome_tabela_detalhe = mapa_tabelas_detalhe.get(tipo_ensaio)
-            if nome_tabela_detalhe is None:
-                print(f"  [FALHA] Tipo de ensaio '{tipo_ensaio}' desconhecido. Pulando linha {index}.")
-                contador_falha += 1
-                continue
+    linhas_por_ensaio: dict[str, list[dict]] = {}
 
-            # --- A LÓGICA MESTRA-DETALHES ---
+    for index, linha in enumerate(df_mapa.itertuples(index=False)):
+        # TRADUZIR o nome para ID usando o mapa
+        id_grupo = mapa_grupos.get(linha.nome_grupo)
+        if id_grupo is None:
+            print(f"  [FALHA] Grupo '{linha.nome_grupo}' não encontrado no banco de dados. Pulando linha {index}.")
+            erros_por_linha.append((index, f"Grupo '{linha.nome_grupo}' não encontrado"))
+            contador_falha += 1
+            continue # Pula para a próxima linha do CSV
 
-            sql_detalhe = f"""
-                INSERT INTO {nome_tabela_detalhe} (id_animal, arquivo_de_resultado, condicao)
-                VALUES (?, ?, ?)
-            """
-            params_detalhe = (id_animal, caminho_arquivo, None)
-            
-            # Usa a função 'escrita' e CAPTURA o ID retornado
-            id_detalhe_criado = escrita(sql_detalhe, params_detalhe)
-            
-            if id_detalhe_criado is None:
-                print(f"  [FALHA] Erro ao inserir em '{nome_tabela_detalhe}'. Pulando linha {index}.")
-                contador_falha += 1
-                continue
+        # ACHAR a tabela de detalhe correta
+        if linha.tipo_ensaio not in registro.ensaios:
+            print(f"  [FALHA] Tipo de ensaio '{linha.tipo_ensaio}' desconhecido. Pulando linha {index}.")
+            erros_por_linha.append((index, f"Tipo de ensaio '{linha.tipo_ensaio}' desconhecido"))
+            contador_falha += 1
+            continue
 
-            sql_mestre = """
-                INSERT INTO experimentos_master (id_grupo, data_experimento, tipo_ensaio, id_detalhe_ensaio)
-                VALUES (?, ?, ?, ?)
-            """
-            params_mestre = (
-                id_grupo,
-                None, # data_experimento é NULL
-                tipo_ensaio,
-                id_detalhe_criado # O ID que acabamos de capturar!
-            )
-            
-            # Desta vez não precisamos do ID de retorno, apenas executamos
-            escrita(sql_mestre, params_mestre)
-            
-            contador_sucesso += 1
+        linhas_por_ensaio.setdefault(linha.tipo_ensaio, []).append({
+            'indice': index,
+            'id_grupo': id_grupo,
+            'id_animal': _valor_sql(linha.id_animal),
+            'caminho_arquivo': linha.caminho_arquivo
+        })
 
-        except Exception as e:
-            print(f"  [FALHA GERAL] Erro inesperado na linha {index}: {e}")
-            contador_falha += 1
+    # --- A LÓGICA MESTRA-DETALHES ---
+    inicio = time.perf_counter()
+
+    for tipo_ensaio, linhas in linhas_por_ensaio.items():
+        for i in range(0, len(linhas), TAMANHO_LOTE):
+            lote = linhas[i:i + TAMANHO_LOTE]
+
+            if modo == "lote":
+                try:
+                    contador_sucesso += insere_em_lote(lote, tipo_ensaio)
+                    print(f"  [OK] {len(lote)} linhas de '{tipo_ensaio}' gravadas em lote.")
+                    continue
+                except sqlite3.Error as e:
+                    print(f"  [AVISO] Lote de '{tipo_ensaio}' falhou ({e}). Refazendo linha a linha...")
+
+            sucessos, erros = insere_linha_a_linha(lote, tipo_ensaio)
+            contador_sucesso += sucessos
+            contador_falha += len(erros)
+            erros_por_linha.extend(erros)
+
+    duracao = time.perf_counter() - inicio
+
+    # --- CONTEÚDO E CATÁLOGO DE METADADOS (lido uma vez por conteúdo) ---
+    caminhos_existentes = list(dict.fromkeys(
+        linha['caminho_arquivo'] for linhas in linhas_por_ensaio.values() for linha in linhas
+    ))
+    catalogados, erros_catalogo = cataloga_arquivos(caminhos_existentes)
+
+    # --- PRÉVIAS (histogramas/densidades, lidos uma vez dos eventos de cada conteúdo) ---
+    previas_calculadas = calcula_faltantes()
+
+    # --- ÍNDICE DE BUSCA (texto dos resultados gravados, em um comando só) ---
+    documentos_busca = sincroniza_busca()
+
+    # Estatísticas atualizadas para o SQLite usar os índices nas consultas
+    atualiza_estatisticas()
+
+    # Avisa os caches do app que o banco mudou
+    if contador_sucesso or catalogados:
+        incrementa_geracao()
+
+    linhas_por_segundo = contador_sucesso / duracao if duracao > 0 else float('inf')
 
     print("-" * 50)
     print("Script ETL concluído.")
     print(f"Linhas processadas com sucesso: {contador_sucesso}")
-    print(f"Linhas com falha: {contador_falha}") 
+    print(f"Linhas com falha: {contador_falha}")
+    print(f"Tempo de inserção: {duracao:.2f} s ({linhas_por_segundo:.0f} linhas/s)")
+    print(f"Arquivos no catálogo de metadados: {catalogados} (não lidos: {len(erros_catalogo)})")
+    print(f"Prévias calculadas: {previas_calculadas}")
+    print(f"Documentos indexados para a busca: {documentos_busca}")
+
+    if erros_por_linha:
+        print("Linhas com erro:")
+        for index, mensagem in erros_por_linha:
+            print(f"  linha {index}: {mensagem}")
 
 if __name__ == "__main__":
-     popularDB()         
\ No newline at end of file
+     popularDB()
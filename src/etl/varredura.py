@@ -0,0 +1,171 @@
+import csv
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+
+# Pastas de grupo em data/raw: 'grupo_<código>' (código cadastrado no registro)
+REGEX_GRUPO = re.compile(r"^grupo_([a-z0-9_]+)$", re.IGNORECASE)
+
+# Colunas do manifesto (mesmas do 'mapeamento.csv')
+COLUNAS_MANIFESTO = ["nome_grupo", "tipo_ensaio", "id_animal", "caminho_arquivo"]
+
+# Linhas acumuladas antes de cada escrita no Parquet
+LINHAS_POR_LOTE = 10000
+
+
+def _lista_pasta(pasta: str) -> tuple[list[str], list[str]]:
+    """
+    Lê uma única pasta com 'os.scandir' (o tipo de cada entrada já vem do
+    sistema operacional, sem um 'stat' por arquivo).
+
+    Retorna:
+        tuple: (nomes dos arquivos .fcs, caminhos das subpastas), ambos ordenados.
+    """
+    arquivos, subpastas = [], []
+    try:
+        with os.scandir(pasta) as entradas:
+            for entrada in entradas:
+                if entrada.is_dir(follow_symlinks=False):
+                    subpastas.append(entrada.path)
+                elif entrada.name.lower().endswith(".fcs") and entrada.is_file():
+                    arquivos.append(entrada.name)
+    except OSError as e:
+        print(f"  [AVISO] Não foi possível ler a pasta '{pasta}': {e}")
+    return sorted(arquivos), sorted(subpastas)
+
+
+def varre_arquivos(dir_base: Path, registro, max_workers: int = None):
+    """
+    Percorre data/raw uma única vez e gera uma linha por arquivo .fcs
+    encontrado, à medida que as pastas vão sendo lidas.
+
+    Cada pasta é lida por uma thread do pool; as subpastas encontradas
+    entram na fila do mesmo pool, então pastas grandes e pequenas são
+    lidas ao mesmo tempo. Só são consideradas as pastas 'grupo_<código>' e,
+    dentro delas, as pastas de ensaio cadastradas no registro
+    ('funcoes.registro.Registro').
+
+    Os caminhos saem como str (montados com 'os.path.join'): criar um Path
+    por arquivo custa mais do que a própria leitura das pastas.
+
+    Gera:
+        list: [nome_grupo, tipo_ensaio, id_animal, caminho absoluto (str)]
+    """
+    dir_raw = Path(dir_base) / "data" / "raw"
+
+    # Pastas de partida: uma por (grupo, ensaio) existente
+    iniciais = []
+    _, pastas_grupo = _lista_pasta(str(dir_raw))
+    for pasta_grupo in pastas_grupo:
+        encontrado = REGEX_GRUPO.match(os.path.basename(pasta_grupo))
+        if not encontrado or encontrado.group(1).lower() not in registro.grupos_por_codigo:
+            continue
+        grupo = registro.grupos_por_codigo[encontrado.group(1).lower()]
+        for ensaio in registro.ensaios:
+            pasta_ensaio = os.path.join(pasta_grupo, ensaio)
+            if os.path.isdir(pasta_ensaio):
+                iniciais.append((pasta_ensaio, grupo, ensaio))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pendentes = {
+            executor.submit(_lista_pasta, pasta): (pasta, grupo, ensaio)
+            for pasta, grupo, ensaio in iniciais
+        }
+
+        while pendentes:
+            prontos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+            for futuro in prontos:
+                pasta, (id_grupo, nome_grupo), ensaio = pendentes.pop(futuro)
+                arquivos, subpastas = futuro.result()
+
+                for subpasta in subpastas:
+                    pendentes[executor.submit(_lista_pasta, subpasta)] = (subpasta, (id_grupo, nome_grupo), ensaio)
+
+                for nome_arquivo in arquivos:
+                    yield [
+                        nome_grupo,
+                        ensaio,
+                        registro.descobre_id_animal(nome_arquivo, id_grupo),
+                        os.path.join(pasta, nome_arquivo)
+                    ]
+
+
+def linhas_manifesto(linhas, dir_base: Path):
+    """
+    Converte as linhas de 'varre_arquivos' para o formato do manifesto:
+    caminho relativo à raiz do projeto (com o separador do sistema, como o
+    'mapeamento.csv' sempre foi gravado).
+    """
+    # Todos os caminhos começam com a raiz: basta cortar o prefixo
+    tamanho_prefixo = len(os.path.join(str(Path(dir_base)), ""))
+    for nome_grupo, tipo_ensaio, id_animal, caminho in linhas:
+        yield nome_grupo, tipo_ensaio, id_animal, caminho[tamanho_prefixo:]
+
+
+def escreve_manifesto_csv(linhas, destino: Path) -> int:
+    """
+    Grava o manifesto em CSV linha a linha, sem montar tudo na memória.
+    O arquivo é escrito em um temporário e renomeado no final.
+
+    Retorna:
+        int: Quantidade de linhas gravadas.
+    """
+    destino = Path(destino)
+    temporario = destino.with_suffix(destino.suffix + ".tmp")
+    total = 0
+
+    with open(temporario, "w", newline="", encoding="utf-8") as f:
+        escritor = csv.writer(f)
+        escritor.writerow(COLUNAS_MANIFESTO)
+        for nome_grupo, tipo_ensaio, id_animal, caminho in linhas:
+            escritor.writerow([nome_grupo, tipo_ensaio, "" if id_animal is None else id_animal, caminho])
+            total += 1
+
+    temporario.replace(destino)
+    return total
+
+
+def escreve_manifesto_parquet(linhas, destino: Path) -> int:
+    """
+    Grava o manifesto em Parquet, em lotes de LINHAS_POR_LOTE linhas.
+    Precisa do pyarrow (dependência opcional).
+
+    Retorna:
+        int: Quantidade de linhas gravadas.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    esquema = pa.schema([
+        ("nome_grupo", pa.string()),
+        ("tipo_ensaio", pa.string()),
+        ("id_animal", pa.int64()),
+        ("caminho_arquivo", pa.string()),
+    ])
+
+    destino = Path(destino)
+    temporario = destino.with_suffix(destino.suffix + ".tmp")
+    total = 0
+
+    def _grava(escritor, lote):
+        colunas = list(zip(*lote))
+        escritor.write_table(pa.Table.from_arrays(
+            [pa.array(coluna, type=campo.type) for coluna, campo in zip(colunas, esquema)],
+            schema=esquema
+        ))
+
+    with pq.ParquetWriter(temporario, esquema) as escritor:
+        lote = []
+        for linha in linhas:
+            lote.append(linha)
+            if len(lote) >= LINHAS_POR_LOTE:
+                _grava(escritor, lote)
+                total += len(lote)
+                lote = []
+        if lote:
+            _grava(escritor, lote)
+            total += len(lote)
+
+    temporario.replace(destino)
+    return total
@@ -0,0 +1,181 @@
+import re
+from database_setup.create_schema import SQL_DOCUMENTO_BUSCA, COLUNAS_FTS
+from funcoes.db_tools import leitura, sessao, incrementa_geracao
+
+# Facetas da busca: coluna de 'busca_documentos' -> rótulo na interface
+FACETAS = {
+    "nome_grupo": "Grupo",
+    "tipo_ensaio": "Ensaio",
+    "citometro": "Citômetro",
+    "data_aquisicao": "Data de aquisição",
+}
+
+# Pesos do bm25 por coluna da 'busca_fts' (mesma ordem de 'COLUNAS_FTS'):
+# nome do arquivo e amostra ($TBNM) pesam mais que grupo/ensaio
+PESOS_BM25 = (5.0, 3.0, 2.0, 1.0, 2.0, 1.0, 1.0)
+
+# Colunas devolvidas por 'busca_experimentos'
+COLUNAS_RESULTADO = [
+    "id_experimento", "nome_grupo", "tipo_ensaio", "id_animal", "condicao", "nome_arquivo",
+    "arquivo_de_resultado", "citometro", "amostra", "data_aquisicao"
+]
+
+# Termos da busca: sequências de letras/números (o resto separa os termos,
+# como no tokenizador 'unicode61' do FTS5)
+REGEX_TERMOS = re.compile(r"\w+")
+
+
+def consulta_fts(texto: str) -> str:
+    """
+    Converte o texto digitado em uma consulta FTS5 segura: cada termo vira
+    uma frase entre aspas com busca por prefixo ("termo"*), e todos os
+    termos precisam aparecer. Operadores e aspas do usuário não passam.
+
+    Retorna:
+        str: A consulta, ou None se o texto não tiver nenhum termo.
+    """
+    termos = REGEX_TERMOS.findall(texto or "")
+    return " ".join(f'"{termo}"*' for termo in termos) or None
+
+
+def _condicoes(texto: str, filtros: dict[str, list], exceto: str = None) -> tuple[str, list]:
+    """
+    FROM/WHERE comuns às consultas da busca: texto (MATCH na 'busca_fts') e
+    filtros das facetas ('coluna' -> valores aceitos; None aceita vazios).
+    A faceta 'exceto' fica de fora (a contagem de uma faceta considera os
+    filtros das outras, para que cada uma mostre todas as suas opções).
+
+    Retorna:
+        tuple: (trecho SQL 'FROM ... WHERE ...', parâmetros)
+    """
+    consulta = consulta_fts(texto)
+    if consulta:
+        sql = "FROM busca_fts JOIN busca_documentos AS d ON d.id_experimento = busca_fts.rowid WHERE busca_fts MATCH ?"
+        params = [consulta]
+    else:
+        sql = "FROM busca_documentos AS d WHERE 1"
+        params = []
+
+    for coluna, valores in (filtros or {}).items():
+        if coluna == exceto or not valores:
+            continue
+        if coluna not in FACETAS:
+            raise ValueError(f"Faceta desconhecida: '{coluna}'")
+        preenchidos = [valor for valor in valores if valor is not None]
+        partes = []
+        if preenchidos:
+            partes.append(f"d.{coluna} IN ({', '.join('?' * len(preenchidos))})")
+            params += preenchidos
+        if len(preenchidos) < len(valores):
+            partes.append(f"d.{coluna} IS NULL")
+        sql += f" AND ({' OR '.join(partes)})"
+
+    return sql, params
+
+
+def busca_experimentos(texto: str = "", filtros: dict[str, list] = None,
+                       limite: int = 50, deslocamento: int = 0) -> tuple[int, list[tuple]]:
+    """
+    Busca resultados por texto (nome do arquivo, amostra, condição,
+    citômetro, ID do animal, grupo e ensaio) e filtros de facetas. Com
+    texto, os mais relevantes (bm25) vêm primeiro; sem texto, em ordem de inserção.
+
+    Retorna:
+        tuple: (total de resultados, linhas da página com as colunas de 'COLUNAS_RESULTADO')
+    """
+    sql, params = _condicoes(texto, filtros)
+    total = leitura(f"SELECT COUNT(*) {sql}", tuple(params))[0][0]
+
+    ordem = f"bm25(busca_fts, {', '.join(map(str, PESOS_BM25))})" if consulta_fts(texto) else "d.id_experimento"
+    colunas = ", ".join(f"d.{coluna}" for coluna in COLUNAS_RESULTADO)
+    linhas = leitura(
+        f"SELECT {colunas} {sql} ORDER BY {ordem} LIMIT ? OFFSET ?",
+        tuple(params) + (limite, deslocamento)
+    )
+    return total, linhas
+
+
+def facetas(texto: str = "", filtros: dict[str, list] = None) -> dict[str, list[tuple[any, int]]]:
+    """
+    Contagens de cada faceta para o texto e os filtros atuais.
+
+    Retorna:
+        dict: coluna -> lista de (valor, quantidade), da mais frequente para a menos.
+    """
+    contagens = {}
+    for coluna in FACETAS:
+        sql, params = _condicoes(texto, filtros, exceto=coluna)
+        contagens[coluna] = leitura(
+            f"SELECT d.{coluna}, COUNT(*) {sql} GROUP BY d.{coluna} ORDER BY COUNT(*) DESC, d.{coluna}",
+            tuple(params)
+        )
+    return contagens
+
+
+def indexa_pendentes(cursor) -> int:
+    """
+    Coloca no texto ('busca_fts') os documentos de 'busca_pendentes', em um
+    único comando: um INSERT por documento (como nos gatilhos) grava um
+    segmento do índice a cada linha e deixa a carga várias vezes mais lenta.
+
+    Retorna:
+        int: Quantidade de documentos indexados.
+    """
+    colunas = ", ".join(COLUNAS_FTS)
+    cursor.execute(f"""
+        INSERT INTO busca_fts (rowid, {colunas})
+        SELECT d.id_experimento, {", ".join(f"d.{coluna}" for coluna in COLUNAS_FTS)}
+        FROM busca_pendentes AS p JOIN busca_documentos AS d USING (id_experimento)
+    """)
+    indexados = cursor.rowcount
+    cursor.execute("DELETE FROM busca_pendentes")
+    return indexados
+
+
+def sincroniza_busca() -> int:
+    """
+    Deixa o índice de busca em dia: cria os documentos que faltam
+    (resultados gravados antes do índice existir), apaga os que sobraram e
+    indexa o texto dos pendentes. Se as contagens já batem e não há
+    pendentes, nada é feito. Se algo mudar, a geração do banco avança
+    (caches da interface).
+
+    Retorna:
+        int: Quantidade de documentos criados, apagados ou indexados.
+    """
+    resultados, documentos, pendentes = leitura("""
+        SELECT (SELECT COUNT(*) FROM experimentos_master),
+               (SELECT COUNT(*) FROM busca_documentos),
+               EXISTS (SELECT 1 FROM busca_pendentes)
+    """)[0]
+    if resultados == documentos and not pendentes:
+        return 0
+
+    with sessao() as cursor:
+        apagados = criados = 0
+        if resultados != documentos:
+            cursor.execute("""
+                DELETE FROM busca_documentos
+                WHERE id_experimento NOT IN (SELECT id_experimento FROM experimentos_master)
+            """)
+            apagados = cursor.rowcount
+            cursor.execute(SQL_DOCUMENTO_BUSCA.format(
+                filtro="r.id_experimento NOT IN (SELECT id_experimento FROM busca_documentos)"
+            ))
+            criados = cursor.rowcount
+        indexados = indexa_pendentes(cursor)
+        if apagados or criados or indexados:
+            incrementa_geracao(cursor)
+
+    if criados:
+        otimiza_busca()
+    return apagados + criados + indexados
+
+
+def otimiza_busca():
+    """
+    Junta os segmentos do índice de texto em um só (depois de cargas grandes
+    as buscas ficam mais rápidas).
+    """
+    with sessao() as cursor:
+        cursor.execute("INSERT INTO busca_fts (busca_fts) VALUES ('optimize')")
@@ -0,0 +1,259 @@
+import functools
+import hashlib
+import pickle
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from funcoes.db_tools import dir_base, geracao_banco
+
+# Pasta do nível em disco (os dados ficam fora do git, em data/cache)
+dir_cache_disco = dir_base / "data" / "cache" / "app"
+
+# Sentinela para diferenciar "não está no cache" de um valor None guardado
+_AUSENTE = object()
+
+
+class CacheLRU:
+    """
+    Cache em dois níveis, compartilhado por todas as sessões do processo:
+
+        1. memória: dicionário LRU com no máximo 'max_itens' entradas (o item
+           usado há mais tempo é expulso quando o limite é atingido);
+        2. disco (opcional): um arquivo pickle por chave em 'dir_disco', que
+           sobrevive a reinícios do app.
+
+    As chaves precisam ser tuplas de valores simples (str, int, ...), pois o
+    nome do arquivo em disco é o hash do seu 'repr'. Os valores devolvidos
+    são os próprios objetos guardados: quem usa não deve alterá-los.
+    """
+
+    def __init__(self, nome: str, max_itens: int = 256, dir_disco: Path = None):
+        self.nome = nome
+        self.max_itens = max_itens
+        self.dir_disco = Path(dir_disco) if dir_disco else None
+        self._itens: OrderedDict = OrderedDict()
+        self._trava = threading.Lock()
+        self.acertos_memoria = 0
+        self.acertos_disco = 0
+        self.faltas = 0
+        self.expulsoes = 0
+        self.invalidacoes = 0
+        # Geração do banco dos itens em memória (usada por 'cache_por_geracao')
+        self.geracao = None
+
+    def _arquivo_disco(self, chave: tuple) -> Path:
+        resumo = hashlib.sha256(repr(chave).encode("utf-8")).hexdigest()
+        return self.dir_disco / self.nome / f"{resumo}.pkl"
+
+    def _le_disco(self, chave: tuple):
+        if self.dir_disco is None:
+            return _AUSENTE
+        try:
+            with open(self._arquivo_disco(chave), "rb") as f:
+                chave_gravada, valor = pickle.load(f)
+        except (OSError, pickle.PickleError, EOFError, ValueError):
+            return _AUSENTE
+        # Protege contra colisões do hash (muito improváveis, mas baratas de checar)
+        return valor if chave_gravada == chave else _AUSENTE
+
+    def _grava_disco(self, chave: tuple, valor):
+        if self.dir_disco is None:
+            return
+        destino = self._arquivo_disco(chave)
+        temporario = destino.with_suffix(f".{threading.get_ident()}.tmp")
+        try:
+            destino.parent.mkdir(parents=True, exist_ok=True)
+            with open(temporario, "wb") as f:
+                pickle.dump((chave, valor), f, protocol=pickle.HIGHEST_PROTOCOL)
+            temporario.replace(destino)
+        except (OSError, pickle.PickleError, TypeError, AttributeError) as e:
+            temporario.unlink(missing_ok=True)
+            print(f"[AVISO] Cache '{self.nome}': não foi possível gravar em disco ({e})")
+
+    def _guarda_memoria(self, chave: tuple, valor):
+        with self._trava:
+            self._itens[chave] = valor
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+                self.expulsoes += 1
+
+    def obter(self, chave: tuple, calcula):
+        """
+        Devolve o valor da chave, procurando na memória, depois no disco e,
+        se não achar, chamando 'calcula()' e guardando o resultado nos dois níveis.
+        """
+        with self._trava:
+            valor = self._itens.get(chave, _AUSENTE)
+            if valor is not _AUSENTE:
+                self._itens.move_to_end(chave)
+                self.acertos_memoria += 1
+                return valor
+
+        valor = self._le_disco(chave)
+        if valor is not _AUSENTE:
+            with self._trava:
+                self.acertos_disco += 1
+            self._guarda_memoria(chave, valor)
+            return valor
+
+        # O cálculo roda fora da trava: outras chaves continuam sendo atendidas
+        valor = calcula()
+        with self._trava:
+            self.faltas += 1
+        self._guarda_memoria(chave, valor)
+        self._grava_disco(chave, valor)
+        return valor
+
+    def limpa(self, disco: bool = False):
+        """
+        Esvazia o nível em memória (e o em disco, se 'disco' for True).
+        """
+        with self._trava:
+            self._itens.clear()
+            self.invalidacoes += 1
+        if disco and self.dir_disco is not None:
+            for arquivo in (self.dir_disco / self.nome).glob("*.pkl"):
+                arquivo.unlink(missing_ok=True)
+
+    def contadores(self) -> dict[str, any]:
+        """
+        Retorna:
+            dict: Nome, ocupação e contadores de acertos/faltas do cache.
+        """
+        with self._trava:
+            consultas = self.acertos_memoria + self.acertos_disco + self.faltas
+            return {
+                "Cache": self.nome,
+                "Itens": len(self._itens),
+                "Máximo": self.max_itens,
+                "Acertos (memória)": self.acertos_memoria,
+                "Acertos (disco)": self.acertos_disco,
+                "Faltas": self.faltas,
+                "Expulsões": self.expulsoes,
+                "Invalidações": self.invalidacoes,
+                "Taxa de acerto (%)": round(100 * (consultas - self.faltas) / consultas, 1) if consultas else None,
+            }
+
+
+# Todos os caches criados pelos decoradores abaixo, por nome
+_caches: dict[str, CacheLRU] = {}
+_trava_registro = threading.Lock()
+
+
+def _registra(nome: str, max_itens: int, dir_disco: Path = None) -> CacheLRU:
+    """
+    Devolve o cache 'nome', criando-o só na primeira vez. O Streamlit roda o
+    script da página de novo a cada interação, o que aplica os decoradores
+    outra vez: sem isso, cada rerun começaria com um cache vazio.
+    """
+    with _trava_registro:
+        cache = _caches.get(nome)
+        if cache is None:
+            cache = _caches[nome] = CacheLRU(nome, max_itens, dir_disco)
+        return cache
+
+
+def cache_por_arquivo(nome: str, max_itens: int = 256, disco: bool = True):
+    """
+    Decorador para funções cujo primeiro argumento é o caminho de um arquivo
+    (relativo à raiz do projeto, com '/'). A chave inclui o tamanho e o mtime
+    do arquivo: se ele mudar no disco, o valor antigo deixa de ser usado.
+
+    Exemplo:
+        @cache_por_arquivo("metadados", max_itens=2048)
+        def buscar_metadado(caminho_limpo): ...
+    """
+    cache = _registra(nome, max_itens, dir_cache_disco if disco else None)
+
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envoltorio(caminho_limpo: str, *args):
+            try:
+                info = (dir_base / caminho_limpo).stat()
+                impressao = (info.st_size, info.st_mtime_ns)
+            except OSError:
+                # Arquivo inexistente: não há o que cachear com segurança
+                return funcao(caminho_limpo, *args)
+            chave = (caminho_limpo, *impressao, *args)
+            return cache.obter(chave, lambda: funcao(caminho_limpo, *args))
+
+        envoltorio.cache = cache
+        return envoltorio
+
+    return decorador
+
+
+def cache_por_conteudo(nome: str, max_itens: int = 256, disco: bool = True):
+    """
+    Como 'cache_por_arquivo', mas a chave é o hash do conteúdo do arquivo
+    (ver 'funcoes.conteudos'): cópias do mesmo arquivo em outras pastas ou
+    com outro nome compartilham o valor, que é calculado uma vez só.
+    Arquivos sem hash registrado (ou que mudaram desde que ele foi
+    calculado) usam a chave de 'cache_por_arquivo'.
+
+    Exemplo:
+        @cache_por_conteudo("estatisticas")
+        def buscar_estatisticas(caminho_limpo): ...
+    """
+    from funcoes.conteudos import hashes_registrados
+
+    cache = _registra(nome, max_itens, dir_cache_disco if disco else None)
+
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envoltorio(caminho_limpo: str, *args):
+            hash_conteudo = hashes_registrados([caminho_limpo]).get(caminho_limpo)
+            if hash_conteudo is not None:
+                chave = ("conteudo", hash_conteudo, *args)
+            else:
+                try:
+                    info = (dir_base / caminho_limpo).stat()
+                except OSError:
+                    return funcao(caminho_limpo, *args)
+                chave = (caminho_limpo, info.st_size, info.st_mtime_ns, *args)
+            return cache.obter(chave, lambda: funcao(caminho_limpo, *args))
+
+        envoltorio.cache = cache
+        return envoltorio
+
+    return decorador
+
+
+def cache_por_geracao(nome: str, max_itens: int = 256):
+    """
+    Decorador para consultas ao banco. A chave inclui a geração do banco
+    (ver 'db_tools.geracao_banco'): quando o ETL grava uma carga nova, a
+    geração muda e o cache é esvaziado na próxima chamada.
+    """
+    cache = _registra(nome, max_itens)
+
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envoltorio(*args):
+            geracao = geracao_banco()
+            if cache.geracao != geracao:
+                if cache.geracao is not None:
+                    cache.limpa()
+                cache.geracao = geracao
+            return cache.obter((geracao, *args), lambda: funcao(*args))
+
+        envoltorio.cache = cache
+        return envoltorio
+
+    return decorador
+
+
+def contadores_caches() -> list[dict[str, any]]:
+    """
+    Contadores de acertos/faltas de todos os caches registrados.
+    """
+    return [cache.contadores() for cache in _caches.values()]
+
+
+def limpa_caches(disco: bool = False):
+    """
+    Esvazia todos os caches registrados (e o nível em disco, se pedido).
+    """
+    for cache in _caches.values():
+        cache.limpa(disco)
@@ -0,0 +1,192 @@
+import importlib.util
+import numpy as np
+from pathlib import Path
+from funcoes.db_tools import dir_base, leitura
+from funcoes.catalogo import caminho_relativo
+from funcoes.eventos_fcs import EventosFCS
+
+# pyarrow é opcional: sem ele o cache colunar fica desligado e tudo continua
+# sendo lido direto dos .fcs. Ele só é importado nas funções que escrevem ou
+# leem os .parquet (importar este módulo não paga o custo dele)
+PYARROW_INSTALADO = importlib.util.find_spec("pyarrow") is not None
+
+# Pasta onde ficam os .parquet (espelha a estrutura de data/raw)
+dir_cache = dir_base / "data" / "cache" / "colunar"
+
+# Eventos por row group: cada grupo guarda min/max por coluna, o que permite
+# pular grupos inteiros quando a leitura tem filtro (predicate pushdown)
+EVENTOS_POR_GRUPO = 65536
+
+# Os valores de citometria quase não se repetem, então o dicionário do parquet
+# só aumenta o arquivo; o BYTE_STREAM_SPLIT separa os bytes de cada float e
+# deixa a compressão mais eficiente. O lz4 descomprime bem mais rápido que o
+# zstd (que gera arquivos ~10% menores, mas deixa a leitura 2x mais lenta)
+COMPRESSAO = "lz4"
+
+
+def cache_disponivel() -> bool:
+    """
+    Indica se o pyarrow está instalado (sem ele o cache colunar não é usado).
+    """
+    return PYARROW_INSTALADO
+
+
+def caminho_cache(caminho_rel: str, hash_conteudo: str = None) -> Path:
+    """
+    Caminho do .parquet correspondente a um arquivo (chave do catálogo, com '/').
+
+    Com o hash do conteúdo (ver 'funcoes.conteudos'), o .parquet fica em
+    'conteudo/<2 primeiros caracteres>/<hash>.parquet' e é compartilhado
+    por todas as cópias do arquivo (o conteúdo de um hash nunca muda).
+    """
+    if hash_conteudo:
+        return dir_cache / "conteudo" / hash_conteudo[:2] / f"{hash_conteudo}.parquet"
+    relativo = Path(caminho_rel)
+    if relativo.parts and relativo.parts[0] == "data":
+        relativo = Path(*relativo.parts[1:])
+    return dir_cache / relativo.with_suffix(".parquet")
+
+
+def _nomes_colunas(canais: list[str]) -> list[str]:
+    """
+    Nome de cada coluna no .parquet ($PnN); nomes vazios ou repetidos
+    ganham o número do parâmetro para continuarem únicos.
+    """
+    nomes, vistos = [], set()
+    for numero, canal in enumerate(canais, start=1):
+        nome = canal or f"P{numero}"
+        if nome in vistos:
+            nome = f"{nome} (P{numero})"
+        vistos.add(nome)
+        nomes.append(nome)
+    return nomes
+
+
+def converte_para_parquet(caminho_arquivo: Path, destino: Path) -> dict[str, int]:
+    """
+    Converte o segmento DATA de um .fcs em um .parquet com uma coluna por
+    canal (nome = $PnN; o $PnS vai nos metadados do campo). Os valores são
+    gravados no tipo numérico do arquivo, em ordem de bytes nativa.
+
+    O arquivo é escrito em um temporário e renomeado no final, para que
+    nenhum leitor veja um .parquet pela metade.
+
+    Retorna:
+        dict: 'eventos', 'colunas' e 'tamanho_cache' (bytes do .parquet).
+    """
+    if not cache_disponivel():
+        raise RuntimeError("pyarrow não está instalado: cache colunar indisponível")
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    destino = Path(destino)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    temporario = destino.with_suffix(".parquet.tmp")
+
+    with EventosFCS(caminho_arquivo) as eventos:
+        nomes = _nomes_colunas(eventos.canais)
+        dtype_nativo = eventos.layout["dtype"].newbyteorder("=")
+
+        campos = [
+            pa.field(nome, pa.from_numpy_dtype(dtype_nativo),
+                     metadata={"pnn": canal or "", "pns": marcador or ""})
+            for nome, canal, marcador in zip(nomes, eventos.canais, eventos.marcadores)
+        ]
+        esquema = pa.schema(campos, metadata={"origem": caminho_relativo(caminho_arquivo)})
+
+        with pq.ParquetWriter(temporario, esquema, compression=COMPRESSAO,
+                              use_dictionary=False, use_byte_stream_split=True) as escritor:
+            total = eventos.layout["eventos"]
+            for inicio in range(0, max(total, 1), EVENTOS_POR_GRUPO):
+                bloco = eventos.matriz[inicio:inicio + EVENTOS_POR_GRUPO]
+                colunas = [
+                    pa.array(np.ascontiguousarray(bloco[:, i], dtype=dtype_nativo))
+                    for i in range(len(nomes))
+                ]
+                escritor.write_table(pa.Table.from_arrays(colunas, schema=esquema))
+
+        resultado = {"eventos": eventos.layout["eventos"], "colunas": len(nomes)}
+
+    temporario.replace(destino)
+    resultado["tamanho_cache"] = destino.stat().st_size
+    return resultado
+
+
+def busca_cache(caminho) -> Path:
+    """
+    Procura o .parquet registrado de um arquivo e confere se ainda vale:
+    o .fcs de origem precisa ter o mesmo tamanho e mtime do momento da conversão.
+
+    Retorna:
+        Path: O .parquet, ou None se não houver cache válido (ou sem pyarrow).
+    """
+    if not cache_disponivel():
+        return None
+
+    caminho_rel = caminho_relativo(caminho)
+    linhas = leitura("""
+        SELECT caminho_cache, tamanho_origem, mtime_ns_origem
+        FROM cache_colunar WHERE arquivo_de_resultado = ?
+    """, (caminho_rel,))
+    if not linhas:
+        return None
+
+    destino, tamanho, mtime_ns = linhas[0]
+    try:
+        info = (dir_base / caminho_rel).stat()
+    except OSError:
+        return None
+    if info.st_size != tamanho or info.st_mtime_ns != mtime_ns:
+        return None
+
+    destino = dir_base / destino
+    return destino if destino.exists() else None
+
+
+def le_colunas_parquet(caminho_parquet: Path, canais: list[str] = None,
+                       filtros: list[tuple] = None) -> tuple[list[int], list[str], list[str], np.ndarray]:
+    """
+    Lê do .parquet só as colunas pedidas ($PnN ou $PnS; todas se 'canais' for None).
+
+    Argumentos:
+        filtros (list[tuple]): Filtros no formato do pyarrow, ex: [("FL1-A", ">", 1000)].
+                               São aplicados na leitura: row groups cujo min/max
+                               não atendem ao filtro nem são descomprimidos.
+
+    Retorna:
+        tuple: (índices das colunas no .fcs, $PnN, $PnS, array eventos x canais)
+    """
+    import pyarrow.parquet as pq
+
+    # O rodapé (esquema + estatísticas) é lido uma única vez
+    arquivo = pq.ParquetFile(caminho_parquet)
+    esquema = arquivo.schema_arrow
+    pnn = [campo.metadata[b"pnn"].decode() or None for campo in esquema]
+    pns = [campo.metadata[b"pns"].decode() or None for campo in esquema]
+
+    if canais is None:
+        indices = list(range(len(esquema)))
+    else:
+        indices = []
+        for canal in canais:
+            if canal in pnn:
+                indices.append(pnn.index(canal))
+            elif canal in pns:
+                indices.append(pns.index(canal))
+            else:
+                raise KeyError(f"Canal '{canal}' não encontrado em {Path(caminho_parquet).name}")
+
+    nomes = [esquema.names[i] for i in indices]
+    if filtros:
+        tabela = pq.read_table(caminho_parquet, columns=nomes, filters=filtros)
+    else:
+        # Sem filtro, o ParquetFile evita o custo de montar um 'dataset'
+        tabela = arquivo.read(columns=nomes)
+
+    if tabela.num_columns:
+        matriz = np.column_stack([tabela.column(nome).to_numpy() for nome in nomes])
+    else:
+        matriz = np.empty((tabela.num_rows, 0), dtype=np.float32)
+
+    return indices, [pnn[i] for i in indices], [pns[i] for i in indices], matriz
@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING
+from funcoes.db_tools import dir_base, leitura
+from funcoes.leitor_fcs import le_texto_fcs, TERMOS_EXCLUIDOS
+from funcoes.paineis import grava_painel
+
+# pandas é importado dentro das funções que o usam (importar este módulo
+# não paga o custo dele)
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Limite de parâmetros por query (o SQLite aceita no mínimo 999 '?' por comando)
+TAMANHO_BLOCO_SQL = 900
+
+
+def caminho_relativo(caminho) -> str:
+    """
+    Converte um caminho (absoluto ou relativo à raiz do projeto, com '\\' ou '/')
+    para a chave usada no catálogo: relativo à raiz e sempre com '/'.
+    """
+    caminho_str = str(caminho).replace('\\', '/')
+    caminho_path = Path(caminho_str)
+
+    if caminho_path.is_absolute():
+        try:
+            return caminho_path.relative_to(dir_base).as_posix()
+        except ValueError:
+            return caminho_path.as_posix()
+    return caminho_str
+
+
+def le_registro_catalogo(caminho_arquivo: Path) -> dict[str, any]:
+    """
+    Lê o HEADER/TEXT do arquivo e monta o registro que vai para o catálogo.
+
+    Retorna:
+        dict: 'data_aquisicao', 'citometro', 'amostra', 'eventos' e 'canais'
+              (lista de tuplas (numero, pnn, pns, excluido)).
+    """
+    _, meta = le_texto_fcs(caminho_arquivo)
+
+    canais = []
+    for numero in range(1, int(meta.get('par', 0)) + 1):
+        pnn = meta.get(f'p{numero}n')
+        pns = meta.get(f'p{numero}s')
+        concatena = f"{pnn or ''}{pns or ''}".upper()
+        excluido = int(any(termo in concatena for termo in TERMOS_EXCLUIDOS))
+        canais.append((numero, pnn, pns, excluido))
+
+    return {
+        "data_aquisicao": meta.get('date'),
+        "citometro": meta.get('cyt'),
+        "amostra": meta.get('tbnm'),
+        "eventos": int(meta.get('tot', 0)),
+        "canais": canais
+    }
+
+
+def le_registros_catalogo(caminhos: dict[str, Path], max_workers: int = None) -> tuple[dict[str, dict], list[tuple[str, str]]]:
+    """
+    Lê vários arquivos em paralelo (threads) com 'le_registro_catalogo'.
+
+    Argumentos:
+        caminhos (dict): caminho relativo (chave do catálogo) -> caminho absoluto.
+
+    Retorna:
+        tuple: (registros por caminho relativo, lista de (caminho relativo, erro))
+    """
+    def _le(item):
+        caminho_rel, caminho_abs = item
+        try:
+            return caminho_rel, le_registro_catalogo(caminho_abs), None
+        except Exception as e:
+            return caminho_rel, None, str(e)
+
+    registros, erros = {}, []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for caminho_rel, registro, erro in executor.map(_le, caminhos.items()):
+            if erro is None:
+                registros[caminho_rel] = registro
+            else:
+                erros.append((caminho_rel, erro))
+
+    return registros, erros
+
+
+def grava_catalogo(cursor, caminho_rel: str, registro: dict[str, any], descarta_previas: bool = True) -> int:
+    """
+    Insere ou atualiza um arquivo no catálogo (e substitui seus canais e o
+    seu painel no índice de painéis), dentro da transação do cursor recebido.
+
+    Argumentos:
+        descarta_previas (bool): Apaga as prévias do arquivo. Quem sabe que o
+            conteúdo não mudou (mesmo hash) passa False para mantê-las.
+
+    Retorna:
+        int: O 'id_arquivo' do catálogo.
+    """
+    cursor.execute("""
+        INSERT INTO metadados_arquivo (arquivo_de_resultado, data_aquisicao, citometro, amostra, eventos)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (arquivo_de_resultado) DO UPDATE SET
+            data_aquisicao = excluded.data_aquisicao,
+            citometro = excluded.citometro,
+            amostra = excluded.amostra,
+            eventos = excluded.eventos,
+            atualizado_em = datetime('now')
+        RETURNING id_arquivo
+    """, (caminho_rel, registro["data_aquisicao"], registro["citometro"],
+          registro["amostra"], registro["eventos"]))
+    id_arquivo = cursor.fetchone()[0]
+
+    cursor.execute("DELETE FROM canais_arquivo WHERE id_arquivo = ?", (id_arquivo,))
+    cursor.executemany(
+        "INSERT INTO canais_arquivo (id_arquivo, numero, pnn, pns, excluido) VALUES (?, ?, ?, ?, ?)",
+        [(id_arquivo, *canal) for canal in registro["canais"]]
+    )
+    grava_painel(cursor, id_arquivo, registro["canais"])
+
+    # Prévias calculadas para o conteúdo antigo deixam de valer ('previas.calcula_faltantes' refaz)
+    if descarta_previas:
+        cursor.execute("DELETE FROM previas_arquivo WHERE id_arquivo = ?", (id_arquivo,))
+
+    return id_arquivo
+
+
+def remove_catalogo(cursor, caminho_rel: str):
+    """
+    Remove um arquivo do catálogo (os canais são apagados em cascata).
+    """
+    cursor.execute("DELETE FROM metadados_arquivo WHERE arquivo_de_resultado = ?", (caminho_rel,))
+
+
+def busca_metadado_catalogo(caminho) -> dict[str, any]:
+    """
+    Busca um arquivo no catálogo e devolve o dicionário no mesmo formato
+    de 'extrair_metadado', sem tocar no disco.
+
+    Retorna:
+        dict: Os metadados, ou None se o arquivo ainda não foi catalogado.
+    """
+    linhas = leitura("""
+        SELECT id_arquivo, data_aquisicao, citometro, amostra, eventos
+        FROM metadados_arquivo WHERE arquivo_de_resultado = ?
+    """, (caminho_relativo(caminho),))
+    if not linhas:
+        return None
+
+    id_arquivo, data, citometro, amostra, eventos = linhas[0]
+    canais = leitura("""
+        SELECT pnn, pns FROM canais_arquivo
+        WHERE id_arquivo = ? AND excluido = 0
+        ORDER BY numero
+    """, (id_arquivo,))
+
+    return {
+        "Data": data if data is not None else 'N/A',
+        "Citômetro": citometro if citometro is not None else 'N/A',
+        "Amostra": amostra,
+        "Eventos registrados": eventos,
+        "Canais": [{"Canal": pnn} for pnn, _ in canais],
+        "Fluoróforos": [{"Fluoróforo": pns} for _, pns in canais]
+    }
+
+
+def busca_metadados_catalogo(caminhos: list) -> pd.DataFrame:
+    """
+    Busca vários arquivos no catálogo de uma vez. Devolve um DataFrame com as
+    mesmas colunas de 'extrair_metadados_lote' (só com os arquivos encontrados).
+    """
+    import pandas as pd
+
+    por_relativo = {caminho_relativo(c): c for c in caminhos}
+    chaves = list(por_relativo)
+
+    linhas = []
+    for i in range(0, len(chaves), TAMANHO_BLOCO_SQL):
+        bloco = chaves[i:i + TAMANHO_BLOCO_SQL]
+        marcadores = ", ".join("?" * len(bloco))
+        linhas += leitura(f"""
+            SELECT m.arquivo_de_resultado, m.data_aquisicao, m.citometro, m.amostra, m.eventos,
+                   c.pnn, c.pns
+            FROM metadados_arquivo AS m
+            LEFT JOIN canais_arquivo AS c ON c.id_arquivo = m.id_arquivo AND c.excluido = 0
+            WHERE m.arquivo_de_resultado IN ({marcadores})
+            ORDER BY m.arquivo_de_resultado, c.numero
+        """, tuple(bloco))
+
+    arquivos: dict[str, dict] = {}
+    for caminho_rel, data, citometro, amostra, eventos, pnn, pns in linhas:
+        if caminho_rel not in arquivos:
+            arquivos[caminho_rel] = {
+                "Arquivo": Path(caminho_rel).name,
+                "Caminho": str(por_relativo[caminho_rel]),
+                "Data": data if data is not None else 'N/A',
+                "Citômetro": citometro if citometro is not None else 'N/A',
+                "Amostra": amostra,
+                "Eventos registrados": eventos,
+                "Canais": [],
+                "Fluoróforos": []
+            }
+        if pnn is not None or pns is not None:
+            arquivos[caminho_rel]["Canais"].append(pnn)
+            arquivos[caminho_rel]["Fluoróforos"].append(pns)
+
+    colunas = ["Arquivo", "Caminho", "Data", "Citômetro", "Amostra", "Eventos registrados", "Canais", "Fluoróforos"]
+    df = pd.DataFrame(list(arquivos.values()), columns=colunas)
+    df["Eventos registrados"] = df["Eventos registrados"].astype("Int64")
+    return df
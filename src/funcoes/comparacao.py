@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+import math
+import os
+from collections import Counter
+from datetime import date, datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING
+from funcoes.catalogo import caminho_relativo, TAMANHO_BLOCO_SQL
+from funcoes.db_tools import dir_base, itera_leitura
+from funcoes.metadados import itera_metadados
+from funcoes.registro import obter_registro
+
+# pandas é importado dentro das funções que o usam (importar este módulo
+# não paga o custo dele)
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Formatos de $DATE encontrados nos arquivos (o padrão FCS é 'dd-mmm-yyyy')
+FORMATOS_DATA = ("%d-%b-%Y", "%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y")
+
+# Separador dos canais agrupados pelo SQLite (caractere de controle, não aparece nos nomes)
+SEPARADOR_CANAIS = "\x1f"
+
+
+@lru_cache(maxsize=4096)
+def converte_data(texto: str) -> date:
+    """
+    Converte o $DATE de um arquivo para 'date'.
+
+    Retorna:
+        date: A data, ou None se o texto estiver vazio ou em formato desconhecido.
+    """
+    if not texto or texto == 'N/A':
+        return None
+    for formato in FORMATOS_DATA:
+        try:
+            return datetime.strptime(texto.strip(), formato).date()
+        except ValueError:
+            continue
+    return None
+
+
+class AgregadoComparacao:
+    """
+    Agregados de um conjunto de arquivos (ex.: um grupo/ensaio), atualizados
+    arquivo a arquivo: a memória depende só da quantidade de valores
+    distintos (painéis, citômetros, datas), não da quantidade de arquivos.
+
+    A média e o desvio padrão dos eventos usam o algoritmo de Welford
+    (uma passada, numericamente estável).
+    """
+
+    def __init__(self):
+        self.arquivos = 0
+        self.sem_metadados = 0
+        self.com_eventos = 0
+        self.eventos_total = 0
+        self.eventos_min = None
+        self.eventos_max = None
+        self._media = 0.0
+        self._m2 = 0.0
+        self.paineis: Counter = Counter()
+        self.canais: Counter = Counter()
+        self.citometros: Counter = Counter()
+        self.datas: Counter = Counter()
+
+    def adiciona(self, eventos: int, citometro: str, data_aquisicao: str, canais: tuple[str, ...]):
+        """
+        Soma um arquivo com metadados aos agregados.
+
+        Argumentos:
+            eventos (int): $TOT do arquivo (None se ausente).
+            citometro (str): $CYT do arquivo.
+            data_aquisicao (str): $DATE do arquivo, como está no TEXT.
+            canais (tuple): Rótulos dos canais do painel, em ordem (sem FSC/SSC/TIME/WIDTH).
+        """
+        self.arquivos += 1
+
+        if eventos is not None:
+            self.com_eventos += 1
+            self.eventos_total += eventos
+            self.eventos_min = eventos if self.eventos_min is None else min(self.eventos_min, eventos)
+            self.eventos_max = eventos if self.eventos_max is None else max(self.eventos_max, eventos)
+            delta = eventos - self._media
+            self._media += delta / self.com_eventos
+            self._m2 += delta * (eventos - self._media)
+
+        self.paineis[canais] += 1
+        self.canais.update(canais)
+        self.citometros[citometro if citometro and citometro != 'N/A' else None] += 1
+        self.datas[converte_data(data_aquisicao)] += 1
+
+    def adiciona_sem_metadados(self):
+        """
+        Conta um arquivo cujos metadados não puderam ser lidos.
+        """
+        self.arquivos += 1
+        self.sem_metadados += 1
+
+    @property
+    def eventos_media(self) -> float:
+        return self._media if self.com_eventos else None
+
+    @property
+    def eventos_desvio(self) -> float:
+        # Desvio padrão amostral (n - 1), como o 'describe' do pandas
+        return math.sqrt(self._m2 / (self.com_eventos - 1)) if self.com_eventos > 1 else None
+
+
+class ComparacaoStreaming:
+    """
+    Um 'AgregadoComparacao' por chave (ex.: (grupo, ensaio)), alimentados em
+    fluxo. No final, 'tabelas' monta DataFrames com tipos definidos (inteiros
+    anuláveis, datas, categorias), um por assunto.
+    """
+
+    def __init__(self, nomes_chave: tuple[str, ...] = ("Grupo", "Ensaio")):
+        self.nomes_chave = nomes_chave
+        self.agregados: dict[tuple, AgregadoComparacao] = {}
+        # Arquivos lidos do disco sem sucesso: (nome, caminho, erro)
+        self.erros: list[tuple[str, str, str]] = []
+
+    def agregado(self, chave: tuple) -> AgregadoComparacao:
+        if chave not in self.agregados:
+            self.agregados[chave] = AgregadoComparacao()
+        return self.agregados[chave]
+
+    def _tabela(self, linhas: list[tuple], colunas: dict[str, str]) -> pd.DataFrame:
+        import pandas as pd
+
+        df = pd.DataFrame(linhas, columns=[*self.nomes_chave, *colunas])
+        for nome in self.nomes_chave:
+            df[nome] = df[nome].astype("category")
+        return df.astype(colunas)
+
+    def tabelas(self) -> dict[str, pd.DataFrame]:
+        """
+        Retorna:
+            dict: DataFrames 'resumo' (uma linha por chave), 'paineis',
+                  'canais', 'citometros' e 'datas' (frequências por chave), e
+                  'erros' ('Arquivo', 'Caminho' e 'Erro' de cada arquivo que
+                  contou como 'Sem metadados' por não poder ser lido).
+        """
+        import pandas as pd
+
+        resumo, paineis, canais, citometros, datas = [], [], [], [], []
+
+        for chave in sorted(self.agregados):
+            ag = self.agregados[chave]
+            datas_validas = [d for d in ag.datas if d is not None]
+            resumo.append((
+                *chave, ag.arquivos, ag.sem_metadados, ag.eventos_total if ag.com_eventos else None,
+                ag.eventos_min, ag.eventos_max, ag.eventos_media, ag.eventos_desvio,
+                len(ag.paineis), min(datas_validas, default=None), max(datas_validas, default=None)
+            ))
+
+            com_metadados = ag.arquivos - ag.sem_metadados
+            for painel, quantidade in ag.paineis.most_common():
+                paineis.append((*chave, ", ".join(painel), len(painel), quantidade,
+                                100 * quantidade / com_metadados))
+            for canal, quantidade in ag.canais.most_common():
+                canais.append((*chave, canal, quantidade, 100 * quantidade / com_metadados))
+            for citometro, quantidade in ag.citometros.most_common():
+                citometros.append((*chave, citometro, quantidade))
+            for data_aquisicao in sorted(ag.datas, key=lambda d: (d is None, d)):
+                datas.append((*chave, data_aquisicao, ag.datas[data_aquisicao]))
+
+        return {
+            "resumo": self._tabela(resumo, {
+                "Arquivos": "Int64", "Sem metadados": "Int64", "Eventos (total)": "Int64",
+                "Eventos (mín)": "Int64", "Eventos (máx)": "Int64", "Eventos (média)": "Float64",
+                "Eventos (desvio padrão)": "Float64", "Painéis distintos": "Int64",
+                "Primeira aquisição": "datetime64[ns]", "Última aquisição": "datetime64[ns]",
+            }),
+            "paineis": self._tabela(paineis, {
+                "Painel": "string", "Canais": "Int64", "Arquivos": "Int64", "Frequência (%)": "Float64"
+            }),
+            "canais": self._tabela(canais, {"Canal": "string", "Arquivos": "Int64", "Frequência (%)": "Float64"}),
+            "citometros": self._tabela(citometros, {"Citômetro": "string", "Arquivos": "Int64"}),
+            "datas": self._tabela(datas, {"Data": "datetime64[ns]", "Arquivos": "Int64"}),
+            "erros": pd.DataFrame(self.erros, columns=["Arquivo", "Caminho", "Erro"]),
+        }
+
+
+def _rotulos_canais(canais_agrupados: str) -> tuple[str, ...]:
+    """
+    Converte o group_concat de rótulos de canais (ver SQL abaixo) para tupla.
+    """
+    return tuple(canais_agrupados.split(SEPARADOR_CANAIS)) if canais_agrupados else ()
+
+
+def _adiciona_do_disco(comparacao: ComparacaoStreaming, faltantes: dict[str, tuple], max_workers: int = None):
+    """
+    Lê do disco, em paralelo, os arquivos que não estão no catálogo e os
+    soma aos agregados à medida que ficam prontos. Os que não puderem ser
+    lidos contam como 'Sem metadados' e vão para 'comparacao.erros'.
+
+    Argumentos:
+        faltantes (dict): caminho a ler (como deve ser aberto) -> chave do agregado.
+    """
+    caminhos = {str(caminho): chave for caminho, chave in faltantes.items()}
+    for caminho, dados, erro in itera_metadados(list(caminhos), max_workers):
+        agregado = comparacao.agregado(caminhos[str(caminho)])
+        if erro is not None:
+            agregado.adiciona_sem_metadados()
+            comparacao.erros.append((Path(caminho).name, str(caminho), erro))
+            continue
+        rotulos = tuple(
+            fluoroforo["Fluoróforo"] or canal["Canal"]
+            for canal, fluoroforo in zip(dados["Canais"], dados["Fluoróforos"])
+        )
+        agregado.adiciona(dados["Eventos registrados"], dados["Citômetro"], dados["Data"], rotulos)
+
+
+# Metadados do catálogo + rótulos dos canais (marcador $PnS ou, na falta, o canal $PnN)
+_SQL_CATALOGO = f"""
+    SELECT m.id_arquivo, m.eventos, m.citometro, m.data_aquisicao,
+           (SELECT group_concat(rotulo, char({ord(SEPARADOR_CANAIS)})) FROM (
+                SELECT COALESCE(NULLIF(c.pns, ''), c.pnn) AS rotulo
+                FROM canais_arquivo AS c
+                WHERE c.id_arquivo = m.id_arquivo AND c.excluido = 0
+                ORDER BY c.numero
+           )) AS canais
+"""
+
+
+def compara_grupos(id_grupo: int = None, tipo_ensaio: str = None, ler_faltantes: bool = True,
+                   max_workers: int = None) -> dict[str, pd.DataFrame]:
+    """
+    Compara grupos/ensaios em UMA passada pelo banco: cada linha de
+    'vw_resultados' (com seus metadados do catálogo) é somada ao agregado do
+    seu (grupo, ensaio) assim que é lida, sem montar um DataFrame por arquivo.
+
+    Argumentos:
+        id_grupo (int): Opcional. Restringe a um grupo.
+        tipo_ensaio (str): Opcional. Restringe a um ensaio.
+        ler_faltantes (bool): Se True, arquivos fora do catálogo são lidos do
+                              disco (em paralelo); senão, contam como 'Sem metadados'.
+
+    Retorna:
+        dict: DataFrames de 'ComparacaoStreaming.tabelas'.
+    """
+    nomes_grupos = obter_registro().nomes_grupos
+
+    filtros, params = [], []
+    if id_grupo is not None:
+        filtros.append("v.id_grupo = ?")
+        params.append(id_grupo)
+    if tipo_ensaio is not None:
+        filtros.append("v.tipo_ensaio = ?")
+        params.append(tipo_ensaio)
+    where = f"WHERE {' AND '.join(filtros)}" if filtros else ""
+
+    # O caminho nas tabelas de detalhes pode estar com '\' (mapeamento gerado no
+    # Windows); no catálogo é sempre '/'. A junção usa o índice único do catálogo
+    sql = f"""
+        {_SQL_CATALOGO}, v.id_grupo, v.tipo_ensaio, REPLACE(v.arquivo_de_resultado, '\\', '/') AS caminho
+        FROM vw_resultados AS v
+        LEFT JOIN metadados_arquivo AS m ON m.arquivo_de_resultado = REPLACE(v.arquivo_de_resultado, '\\', '/')
+        {where}
+    """
+
+    comparacao = ComparacaoStreaming(("Grupo", "Ensaio"))
+    faltantes: dict[str, tuple] = {}
+
+    for id_arquivo, eventos, citometro, data_aquisicao, canais, grupo, ensaio, caminho in itera_leitura(sql, tuple(params)):
+        chave = (nomes_grupos.get(grupo, str(grupo)), ensaio)
+        if id_arquivo is not None:
+            comparacao.agregado(chave).adiciona(eventos, citometro, data_aquisicao, _rotulos_canais(canais))
+        elif ler_faltantes:
+            faltantes[caminho] = chave
+        else:
+            comparacao.agregado(chave).adiciona_sem_metadados()
+
+    if faltantes:
+        _adiciona_do_disco(comparacao, {dir_base / caminho: chave for caminho, chave in faltantes.items()}, max_workers)
+
+    return comparacao.tabelas()
+
+
+def compara_arquivos(caminhos: list, rotulo: str = "Seleção", max_workers: int = None) -> dict[str, pd.DataFrame]:
+    """
+    Compara uma lista qualquer de arquivos como um único conjunto. Os que
+    estão no catálogo são lidos do banco em blocos; os demais, do disco.
+    Caminhos relativos são relativos à pasta atual (como no 'open').
+
+    Retorna:
+        dict: DataFrames de 'ComparacaoStreaming.tabelas' (chave 'Conjunto').
+    """
+    comparacao = ComparacaoStreaming(("Conjunto",))
+    agregado = comparacao.agregado((rotulo,))
+    # Chave do catálogo -> caminho como foi recebido (é o que se abre se faltar)
+    originais: dict[str, str] = {}
+    for caminho in caminhos:
+        originais.setdefault(caminho_relativo(os.path.abspath(caminho)), caminho)
+    chaves = list(originais)
+    faltantes = set(chaves)
+
+    for i in range(0, len(chaves), TAMANHO_BLOCO_SQL):
+        bloco = chaves[i:i + TAMANHO_BLOCO_SQL]
+        marcadores = ", ".join("?" * len(bloco))
+        sql = f"{_SQL_CATALOGO}, m.arquivo_de_resultado FROM metadados_arquivo AS m WHERE m.arquivo_de_resultado IN ({marcadores})"
+        for _, eventos, citometro, data_aquisicao, canais, caminho in itera_leitura(sql, tuple(bloco)):
+            agregado.adiciona(eventos, citometro, data_aquisicao, _rotulos_canais(canais))
+            faltantes.discard(caminho)
+
+    if faltantes:
+        _adiciona_do_disco(comparacao, {originais[caminho]: (rotulo,) for caminho in faltantes}, max_workers)
+
+    return comparacao.tabelas()
@@ -0,0 +1,379 @@
+"""
+Deduplicação por conteúdo dos arquivos .fcs.
+
+A mesma aquisição costuma aparecer mais de uma vez em data/raw (reexportada
+ou copiada com outro nome, em outra pasta de ensaio). Na ingestão, cada
+arquivo tem o conteúdo identificado pelo SHA-256 (uma leitura sequencial,
+ver 'funcoes.hash_arquivos'):
+
+    objetos_conteudo   um registro por conteúdo distinto, com o arquivo
+                       guardado ('caminho_objeto')
+    conteudo_arquivo   o conteúdo de cada arquivo referenciado pelos
+                       resultados (todas as referências continuam no banco)
+
+Catálogo, prévias, cache colunar, estatísticas e downloads usam esse
+mapeamento para ler cada conteúdo uma vez só. O 'etl.deduplica' troca as
+cópias no disco por links para o objeto guardado e mostra o espaço recuperado.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from funcoes.catalogo import TAMANHO_BLOCO_SQL, caminho_relativo, le_registros_catalogo, grava_catalogo
+from funcoes.db_tools import dir_base, leitura, sessao
+from funcoes.hash_arquivos import calcula_hash
+
+
+def impressao_arquivo(caminho_arquivo: Path) -> tuple[str, int, int]:
+    """
+    Impressão digital do conteúdo de um arquivo.
+
+    Retorna:
+        tuple: (hash SHA-256, tamanho, mtime_ns)
+    """
+    info = Path(caminho_arquivo).stat()
+    return calcula_hash(caminho_arquivo), info.st_size, info.st_mtime_ns
+
+
+def calcula_impressoes(caminhos: dict[str, Path], max_workers: int = None) -> tuple[dict[str, tuple], list[tuple[str, str]]]:
+    """
+    'impressao_arquivo' de vários arquivos em paralelo (threads: a leitura e
+    o SHA-256 liberam o GIL).
+
+    Argumentos:
+        caminhos (dict): caminho relativo (chave do catálogo) -> caminho absoluto.
+
+    Retorna:
+        tuple: (impressões por caminho relativo, lista de (caminho relativo, erro))
+    """
+    def _calcula(item):
+        caminho_rel, caminho_abs = item
+        try:
+            return caminho_rel, impressao_arquivo(caminho_abs), None
+        except OSError as e:
+            return caminho_rel, None, str(e)
+
+    impressoes, erros = {}, []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for caminho_rel, impressao, erro in executor.map(_calcula, caminhos.items()):
+            if erro is None:
+                impressoes[caminho_rel] = impressao
+            else:
+                erros.append((caminho_rel, erro))
+
+    return impressoes, erros
+
+
+def _em_blocos(consulta: str, chaves: list) -> list[tuple]:
+    """
+    Roda 'consulta' (com '{marcadores}' no lugar da lista do IN) em blocos de TAMANHO_BLOCO_SQL chaves.
+    """
+    linhas = []
+    for i in range(0, len(chaves), TAMANHO_BLOCO_SQL):
+        bloco = tuple(chaves[i:i + TAMANHO_BLOCO_SQL])
+        linhas += leitura(consulta.format(marcadores=", ".join("?" * len(bloco))), bloco)
+    return linhas
+
+
+def hashes_registrados(caminhos: list[str], confere_disco: bool = True) -> dict[str, str]:
+    """
+    Hash do conteúdo registrado de cada arquivo (caminhos relativos, com '/').
+
+    Argumentos:
+        confere_disco (bool): Se True, só vale o hash de arquivos com o mesmo
+                              tamanho e mtime de quando ele foi calculado.
+
+    Retorna:
+        dict: caminho -> hash (arquivos sem hash válido ficam de fora).
+    """
+    linhas = _em_blocos("""
+        SELECT arquivo_de_resultado, hash_conteudo, tamanho, mtime_ns
+        FROM conteudo_arquivo WHERE arquivo_de_resultado IN ({marcadores})
+    """, list(dict.fromkeys(caminhos)))
+
+    hashes = {}
+    for caminho, hash_conteudo, tamanho, mtime_ns in linhas:
+        if confere_disco:
+            try:
+                info = (dir_base / caminho).stat()
+            except OSError:
+                continue
+            if info.st_size != tamanho or info.st_mtime_ns != mtime_ns:
+                continue
+        hashes[caminho] = hash_conteudo
+    return hashes
+
+
+def agrupa_por_conteudo(caminhos: list[str]) -> list[list[str]]:
+    """
+    Agrupa arquivos (caminhos relativos, com '/') de mesmo conteúdo, na ordem
+    em que aparecem. Arquivos sem hash válido ficam sozinhos no seu grupo.
+    """
+    hashes = hashes_registrados(caminhos)
+    grupos: dict[str, list[str]] = {}
+    for caminho in dict.fromkeys(caminhos):
+        grupos.setdefault(hashes.get(caminho, caminho), []).append(caminho)
+    return list(grupos.values())
+
+
+def registros_catalogados(hashes: set[str]) -> dict[str, dict[str, any]]:
+    """
+    Registro do catálogo (formato de 'catalogo.le_registro_catalogo') de um
+    arquivo já catalogado com cada conteúdo, sem ler nada do disco.
+
+    Retorna:
+        dict: hash -> registro (conteúdos ainda não catalogados ficam de fora).
+    """
+    linhas = _em_blocos("""
+        SELECT c.hash_conteudo, m.id_arquivo, m.data_aquisicao, m.citometro, m.amostra, m.eventos,
+               k.numero, k.pnn, k.pns, k.excluido
+        FROM conteudo_arquivo AS c
+        JOIN metadados_arquivo AS m ON m.arquivo_de_resultado = c.arquivo_de_resultado
+        LEFT JOIN canais_arquivo AS k ON k.id_arquivo = m.id_arquivo
+        WHERE c.hash_conteudo IN ({marcadores})
+        ORDER BY c.hash_conteudo, m.id_arquivo, k.numero
+    """, list(hashes))
+
+    registros, origem = {}, {}
+    for hash_conteudo, id_arquivo, data, citometro, amostra, eventos, numero, pnn, pns, excluido in linhas:
+        # Um arquivo por conteúdo (o de menor id) basta
+        if origem.setdefault(hash_conteudo, id_arquivo) != id_arquivo:
+            continue
+        registro = registros.setdefault(hash_conteudo, {
+            "data_aquisicao": data, "citometro": citometro, "amostra": amostra,
+            "eventos": eventos, "canais": []
+        })
+        if numero is not None:
+            registro["canais"].append((numero, pnn, pns, excluido))
+    return registros
+
+
+def le_registros_unicos(caminhos: dict[str, Path], hashes: dict[str, str],
+                        max_workers: int = None) -> tuple[dict[str, dict], list[tuple[str, str]], int]:
+    """
+    Registros do catálogo de vários arquivos, lendo o HEADER/TEXT de um
+    arquivo só por conteúdo: conteúdos que já estão no catálogo vêm do banco
+    e as cópias dentro da lista reaproveitam o registro da primeira.
+
+    Argumentos:
+        caminhos (dict): caminho relativo -> caminho absoluto.
+        hashes (dict): caminho relativo -> hash (arquivos sem hash são lidos).
+
+    Retorna:
+        tuple: (registros por caminho relativo, lista de (caminho relativo, erro),
+                quantidade de arquivos lidos do disco)
+    """
+    conhecidos = registros_catalogados({hashes[c] for c in caminhos if c in hashes})
+
+    a_ler: dict[str, Path] = {}
+    primeiro_por_hash: dict[str, str] = {}
+    for caminho_rel, caminho_abs in caminhos.items():
+        hash_conteudo = hashes.get(caminho_rel)
+        if hash_conteudo is None:
+            a_ler[caminho_rel] = caminho_abs
+        elif hash_conteudo not in conhecidos and hash_conteudo not in primeiro_por_hash:
+            primeiro_por_hash[hash_conteudo] = caminho_rel
+            a_ler[caminho_rel] = caminho_abs
+
+    lidos, erros_lidos = le_registros_catalogo(a_ler, max_workers)
+    erros_por_caminho = dict(erros_lidos)
+
+    registros, erros = {}, []
+    for caminho_rel in caminhos:
+        hash_conteudo = hashes.get(caminho_rel)
+        origem = caminho_rel if hash_conteudo is None else primeiro_por_hash.get(hash_conteudo)
+        if hash_conteudo in conhecidos:
+            registros[caminho_rel] = conhecidos[hash_conteudo]
+        elif origem in lidos:
+            registros[caminho_rel] = lidos[origem]
+        else:
+            erros.append((caminho_rel, erros_por_caminho.get(origem, "conteúdo não lido")))
+
+    return registros, erros, len(a_ler)
+
+
+def _libera_objetos(cursor, hashes: set[str]):
+    """
+    Depois que arquivos mudaram de conteúdo ou saíram do banco: apaga os
+    objetos sem nenhuma referência e passa o 'caminho_objeto' para outra
+    cópia quando o arquivo guardado não tem mais aquele conteúdo.
+    """
+    parametros = [(h, h) for h in hashes]
+    cursor.executemany("""
+        DELETE FROM objetos_conteudo
+        WHERE hash_conteudo = ? AND NOT EXISTS (SELECT 1 FROM conteudo_arquivo WHERE hash_conteudo = ?)
+    """, parametros)
+    cursor.executemany("""
+        UPDATE objetos_conteudo
+        SET caminho_objeto = (SELECT MIN(arquivo_de_resultado) FROM conteudo_arquivo
+                              WHERE hash_conteudo = objetos_conteudo.hash_conteudo)
+        WHERE hash_conteudo = ? AND NOT EXISTS (
+            SELECT 1 FROM conteudo_arquivo
+            WHERE arquivo_de_resultado = objetos_conteudo.caminho_objeto AND hash_conteudo = ?
+        )
+    """, parametros)
+
+
+def _hashes_antigos(cursor, caminhos: list[str]) -> dict[str, str]:
+    hashes = {}
+    for i in range(0, len(caminhos), TAMANHO_BLOCO_SQL):
+        bloco = caminhos[i:i + TAMANHO_BLOCO_SQL]
+        hashes.update(cursor.execute(
+            f"SELECT arquivo_de_resultado, hash_conteudo FROM conteudo_arquivo "
+            f"WHERE arquivo_de_resultado IN ({', '.join('?' * len(bloco))})", bloco
+        ).fetchall())
+    return hashes
+
+
+def registra_conteudos(cursor, impressoes: dict[str, tuple[str, int, int]]):
+    """
+    Grava o conteúdo de cada arquivo (criando o objeto na primeira vez que
+    um hash aparece), dentro da transação do cursor recebido.
+
+    Argumentos:
+        impressoes (dict): caminho relativo -> (hash, tamanho, mtime_ns).
+    """
+    if not impressoes:
+        return
+    antigos = _hashes_antigos(cursor, list(impressoes))
+
+    cursor.executemany("""
+        INSERT OR IGNORE INTO objetos_conteudo (hash_conteudo, tamanho, caminho_objeto) VALUES (?, ?, ?)
+    """, [(hash_conteudo, tamanho, caminho) for caminho, (hash_conteudo, tamanho, _) in impressoes.items()])
+    cursor.executemany("""
+        INSERT INTO conteudo_arquivo (arquivo_de_resultado, hash_conteudo, tamanho, mtime_ns)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (arquivo_de_resultado) DO UPDATE SET
+            hash_conteudo = excluded.hash_conteudo,
+            tamanho = excluded.tamanho,
+            mtime_ns = excluded.mtime_ns
+    """, [(caminho, *impressao) for caminho, impressao in impressoes.items()])
+
+    _libera_objetos(cursor, {h for caminho, h in antigos.items() if h != impressoes[caminho][0]})
+
+
+def remove_conteudos(cursor, caminhos: list[str]):
+    """
+    Tira arquivos do mapeamento de conteúdo (objetos sem referências são apagados).
+    """
+    antigos = _hashes_antigos(cursor, list(caminhos))
+    cursor.executemany(
+        "DELETE FROM conteudo_arquivo WHERE arquivo_de_resultado = ?", [(caminho,) for caminho in antigos]
+    )
+    _libera_objetos(cursor, set(antigos.values()))
+
+
+def cataloga_arquivos(caminhos: list, max_workers: int = None) -> tuple[int, list[tuple[str, str]]]:
+    """
+    Calcula o conteúdo de uma lista de arquivos (caminhos absolutos ou
+    relativos à raiz do projeto) e grava conteúdo e catálogo em uma única
+    transação, lendo o HEADER/TEXT uma vez por conteúdo ('le_registros_unicos').
+
+    Retorna:
+        tuple: (quantidade catalogada, lista de (caminho relativo, erro))
+    """
+    por_relativo = {caminho_relativo(c): dir_base / caminho_relativo(c) for c in caminhos}
+    impressoes, erros = calcula_impressoes(por_relativo, max_workers)
+    hashes = {caminho: impressao[0] for caminho, impressao in impressoes.items()}
+    registros, erros_catalogo, _ = le_registros_unicos(
+        {caminho: por_relativo[caminho] for caminho in impressoes}, hashes, max_workers
+    )
+
+    with sessao() as cursor:
+        # Prévias só deixam de valer para arquivos cujo conteúdo mudou
+        antigos = _hashes_antigos(cursor, list(registros))
+        registra_conteudos(cursor, impressoes)
+        for caminho_rel, registro in registros.items():
+            grava_catalogo(cursor, caminho_rel, registro,
+                           descarta_previas=antigos.get(caminho_rel) != hashes[caminho_rel])
+
+    return len(registros), erros + erros_catalogo
+
+
+def registra_faltantes(max_workers: int = None) -> int:
+    """
+    Calcula o conteúdo dos arquivos do catálogo que ainda não têm um
+    (catalogados antes da deduplicação existir). Usa o hash da
+    'estado_ingestao' quando o arquivo não mudou desde a ingestão; os demais
+    são lidos.
+
+    Retorna:
+        int: Quantidade de arquivos registrados.
+    """
+    linhas = leitura("""
+        SELECT m.arquivo_de_resultado, e.hash_conteudo, e.tamanho, e.mtime_ns
+        FROM metadados_arquivo AS m
+        LEFT JOIN estado_ingestao AS e ON e.caminho_arquivo = m.arquivo_de_resultado
+        WHERE NOT EXISTS (SELECT 1 FROM conteudo_arquivo AS c WHERE c.arquivo_de_resultado = m.arquivo_de_resultado)
+    """)
+    if not linhas:
+        return 0
+
+    impressoes, a_calcular = {}, {}
+    for caminho, hash_conteudo, tamanho, mtime_ns in linhas:
+        try:
+            info = (dir_base / caminho).stat()
+        except OSError:
+            continue
+        if hash_conteudo and info.st_size == tamanho and info.st_mtime_ns == mtime_ns:
+            impressoes[caminho] = (hash_conteudo, tamanho, mtime_ns)
+        else:
+            a_calcular[caminho] = dir_base / caminho
+
+    calculadas, erros = calcula_impressoes(a_calcular, max_workers)
+    for caminho, erro in erros:
+        print(f"  [FALHA] Não foi possível calcular o hash de '{caminho}': {erro}")
+    impressoes.update(calculadas)
+
+    with sessao() as cursor:
+        registra_conteudos(cursor, impressoes)
+    return len(impressoes)
+
+
+def relatorio_deduplicacao() -> dict[str, int]:
+    """
+    Quanto espaço as cópias ocupam e quanto já foi recuperado: uma cópia
+    conta como recuperada quando é um link para o mesmo arquivo do objeto
+    guardado (mesmo inode), o que o 'etl.deduplica' faz.
+
+    Retorna:
+        dict: 'arquivos' (referências), 'conteudos' (objetos), 'copias',
+              'copias_vinculadas', 'bytes_arquivos', 'bytes_conteudos',
+              'bytes_copias', 'bytes_recuperados' e 'bytes_a_recuperar'.
+    """
+    arquivos, conteudos, bytes_arquivos, bytes_conteudos = leitura("""
+        SELECT (SELECT COUNT(*) FROM conteudo_arquivo),
+               (SELECT COUNT(*) FROM objetos_conteudo),
+               (SELECT COALESCE(SUM(tamanho), 0) FROM conteudo_arquivo),
+               (SELECT COALESCE(SUM(tamanho), 0) FROM objetos_conteudo)
+    """)[0]
+
+    # Só os conteúdos com mais de uma referência precisam de 'stat'
+    copias = leitura("""
+        SELECT c.arquivo_de_resultado, c.tamanho, o.caminho_objeto
+        FROM conteudo_arquivo AS c
+        JOIN objetos_conteudo AS o ON o.hash_conteudo = c.hash_conteudo
+        WHERE c.arquivo_de_resultado <> o.caminho_objeto
+    """)
+    vinculadas, bytes_recuperados, inodes = 0, 0, {}
+    for caminho, tamanho, caminho_objeto in copias:
+        try:
+            if caminho_objeto not in inodes:
+                info = (dir_base / caminho_objeto).stat()
+                inodes[caminho_objeto] = (info.st_dev, info.st_ino)
+            info = (dir_base / caminho).stat()
+        except OSError:
+            continue
+        if (info.st_dev, info.st_ino) == inodes[caminho_objeto]:
+            vinculadas += 1
+            bytes_recuperados += tamanho
+
+    return {
+        "arquivos": arquivos,
+        "conteudos": conteudos,
+        "copias": len(copias),
+        "copias_vinculadas": vinculadas,
+        "bytes_arquivos": bytes_arquivos,
+        "bytes_conteudos": bytes_conteudos,
+        "bytes_copias": bytes_arquivos - bytes_conteudos,
+        "bytes_recuperados": bytes_recuperados,
+        "bytes_a_recuperar": bytes_arquivos - bytes_conteudos - bytes_recuperados,
+    }
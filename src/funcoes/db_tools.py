@@ -1,5 +1,14 @@
+import atexit
+import logging
+import queue
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
+from funcoes import metricas
+
+logger = logging.getLogger(__name__)
 
 dir_base = Path(__file__).resolve().parent.parent.parent
 
@@ -7,53 +16,228 @@ db_path = dir_base / "database" / "experimentos.db"
 
 teste = db_path.parent
 
-def conectaDB():
+# Quantidade máxima de conexões abertas ao mesmo tempo pelo pool
+TAMANHO_POOL = 5
+
+# Tempo (em segundos) que uma conexão espera o banco ser liberado por outra escrita
+TIMEOUT_BANCO = 30
+
+# Linhas buscadas por vez nas leituras em fluxo ('itera_leitura')
+TAMANHO_BLOCO_LEITURA = 1000
+
+
+def conectaDB(caminho: Path = None):
     """
-    Cria e retorna uma conexão com o banco de dados. 
+    Cria e retorna uma conexão com o banco de dados.
+
+    A conexão é aberta em modo autocommit (isolation_level=None): as transações
+    são controladas explicitamente pela função 'sessao()'.
     """
+    caminho = caminho or db_path
 
     try:
         # Garante que pasta do banco exista
-        db_path.parent.mkdir(parents=True, exist_ok=True)
+        Path(caminho).parent.mkdir(parents=True, exist_ok=True)
 
-        conn = sqlite3.connect(db_path)
+        # check_same_thread=False: a conexão pode ser usada por outra thread,
+        # mas o pool garante que só uma thread a use por vez
+        conn = sqlite3.connect(
+            caminho,
+            timeout=TIMEOUT_BANCO,
+            isolation_level=None,
+            check_same_thread=False
+        )
         conn.execute("PRAGMA foreign_keys = ON;")
+        # WAL permite leituras simultâneas enquanto uma escrita acontece
+        conn.execute("PRAGMA journal_mode = WAL;")
+        conn.execute("PRAGMA synchronous = NORMAL;")
         return conn
     except sqlite3.Error as e:
-        print(f"Erro ao conectar ao banco de dados em {db_path}: {e}")
+        logger.error("Erro ao conectar ao banco de dados em %s: %s", caminho, e)
         return None
 
+
+class PoolConexoes:
+    """
+    Mantém um conjunto de conexões abertas com o banco para serem reaproveitadas,
+    evitando o custo de abrir/configurar uma conexão nova a cada query.
+
+    É seguro para uso com várias threads: cada conexão é emprestada para uma
+    thread por vez e devolvida ao pool no final.
+    """
+
+    def __init__(self, caminho: Path, tamanho: int = TAMANHO_POOL):
+        self.caminho = Path(caminho)
+        self.tamanho = tamanho
+        self._livres: queue.LifoQueue = queue.LifoQueue()
+        self._criadas = 0
+        self._trava = threading.Lock()
+
+    def obter(self, timeout: float = TIMEOUT_BANCO) -> sqlite3.Connection:
+        """
+        Empresta uma conexão do pool. Cria uma nova se o limite ainda não foi
+        atingido; caso contrário, espera até que outra thread devolva uma.
+        """
+        try:
+            return self._livres.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._trava:
+            if self._criadas < self.tamanho:
+                conn = conectaDB(self.caminho)
+                if conn is None:
+                    raise sqlite3.OperationalError(f"Não foi possível conectar em {self.caminho}")
+                self._criadas += 1
+                return conn
+
+        try:
+            return self._livres.get(timeout=timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError("Nenhuma conexão livre no pool (timeout)")
+
+    def devolver(self, conn: sqlite3.Connection):
+        """
+        Devolve a conexão ao pool. Qualquer transação esquecida aberta é desfeita.
+        """
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # Conexão quebrada: descarta em vez de devolver
+            self.descartar(conn)
+            return
+        self._livres.put(conn)
+
+    def descartar(self, conn: sqlite3.Connection):
+        """
+        Fecha a conexão sem devolvê-la, liberando a vaga no pool.
+        """
+        try:
+            conn.close()
+        finally:
+            with self._trava:
+                self._criadas -= 1
+
+    def fechar(self):
+        """
+        Fecha todas as conexões livres do pool.
+        """
+        while True:
+            try:
+                conn = self._livres.get_nowait()
+            except queue.Empty:
+                break
+            self.descartar(conn)
+
+    @contextmanager
+    def conexao(self):
+        """
+        Context manager que empresta uma conexão e garante a devolução.
+        """
+        conn = self.obter()
+        try:
+            yield conn
+        finally:
+            self.devolver(conn)
+
+
+_pool = None
+_trava_pool = threading.Lock()
+
+
+def obter_pool() -> PoolConexoes:
+    """
+    Retorna o pool de conexões do processo, criando-o na primeira chamada.
+    Se 'db_path' tiver sido trocado, o pool antigo é fechado e um novo é criado.
+    """
+    global _pool
+    with _trava_pool:
+        if _pool is None or _pool.caminho != Path(db_path):
+            if _pool is not None:
+                _pool.fechar()
+            _pool = PoolConexoes(db_path)
+        return _pool
+
+
+def fecha_pool():
+    """
+    Fecha as conexões do pool (chamada automaticamente ao encerrar o processo).
+    """
+    global _pool
+    with _trava_pool:
+        if _pool is not None:
+            _pool.fechar()
+            _pool = None
+
+
+atexit.register(fecha_pool)
+
+
+@contextmanager
+def sessao(imediata: bool = True):
+    """
+    Unidade de trabalho: todas as queries executadas dentro do bloco 'with'
+    fazem parte de uma única transação. Se o bloco terminar sem erro, é feito
+    o commit; se alguma exceção ocorrer, tudo é desfeito (rollback) e a exceção
+    é repassada.
+
+    Exemplo:
+        with sessao() as cursor:
+            cursor.executemany("INSERT INTO grupos (nome_grupo) VALUES (?)", linhas)
+            cursor.execute("UPDATE ...", params)
+
+    Argumentos:
+        imediata (bool): Se True, reserva o direito de escrita já no início
+                         (BEGIN IMMEDIATE), evitando erros de 'database is locked'
+                         quando várias threads escrevem ao mesmo tempo.
+
+    Retorna:
+        sqlite3.Cursor: Cursor ligado à conexão emprestada do pool.
+    """
+    # A medida cobre a transação inteira (espera pelo banco, comandos e commit)
+    with metricas.mede("banco.sessao"), obter_pool().conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE" if imediata else "BEGIN")
+        try:
+            yield cursor
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+
 def escrita(sql_query: str, params: tuple) -> int:
     """
     Executa uma query de escrita (INSERT, UPDATE, DELETE) no banco de dados
     e retorna o ID da última linha inserida (lastrowid).
-    
+
     Argumentos:
         sql_query (str): A string SQL (ex: "INSERT INTO ... (?, ?)")
         params (tuple): Uma tupla de valores para a query.
-        
+
     Retorna:
         int: O ID da última linha inserida, ou None em caso de falha.
     """
-    conn = None
     last_id = None
+    inicio = time.perf_counter()
     try:
-        # Usa a sua função para pegar a conexão
-        conn = conectaDB() 
-        if conn:
-            cursor = conn.cursor()
+        # Cada chamada é uma transação própria; para agrupar várias
+        # escritas em um único commit use 'sessao()' diretamente
+        with sessao() as cursor:
             cursor.execute(sql_query, params)
-            conn.commit() # Salva (confirma) as mudanças
             last_id = cursor.lastrowid # Pega o ID da linha recém-criada
-            
+            metricas.registra_consulta(
+                cursor.connection, "banco.escrita", sql_query, params,
+                time.perf_counter() - inicio, cursor.rowcount
+            )
+
     except sqlite3.Error as e:
-        print(f"Erro na query de escrita: {e}")
-        if conn:
-            conn.rollback() # Desfaz a mudança em caso de erro
-    finally:
-        if conn:
-            conn.close() # Sempre fecha a conexão
-            
+        logger.error("Erro na query de escrita: %s", e)
+        metricas.registra_consulta(None, "banco.escrita", sql_query, params, time.perf_counter() - inicio, erro=True)
+
     return last_id
 
 
@@ -61,29 +245,105 @@ def escrita(sql_query: str, params: tuple) -> int:
 def leitura(sql_query: str, params: tuple = ()) -> list[tuple[any, ...]]:
     """
     Executa uma query de leitura (SELECT) e retorna todos os resultados.
-    
+
     Argumentos:
         sql_query (str): A string SQL (ex: "SELECT * FROM ... WHERE id = ?")
         params (tuple): Uma tupla de valores (opcional).
-        
+
     Retorna:
         list: Uma lista de tuplas, onde cada tupla é uma linha do resultado.
               Retorna uma lista vazia em caso de falha ou se não houver resultados.
     """
-    conn = None
     resultados = []
+    inicio = time.perf_counter()
     try:
-        # Usa a sua função para pegar a conexão
-        conn = conectaDB() 
-        if conn:
-            cursor = conn.cursor()
-            cursor.execute(sql_query, params)
+        # Conexão emprestada do pool; em autocommit a leitura não abre transação
+        with obter_pool().conexao() as conn:
+            cursor = conn.execute(sql_query, params)
             resultados = cursor.fetchall() # Pega todos os resultados da consulta
-            
+            cursor.close()
+            metricas.registra_consulta(
+                conn, "banco.leitura", sql_query, params, time.perf_counter() - inicio, len(resultados)
+            )
+
     except sqlite3.Error as e:
-        print(f"Erro na query de leitura: {e}")
-    finally:
-        if conn:
-            conn.close()
-            
-    return resultados
\ No newline at end of file
+        logger.error("Erro na query de leitura: %s", e)
+        metricas.registra_consulta(None, "banco.leitura", sql_query, params, time.perf_counter() - inicio, erro=True)
+
+    return resultados
+
+
+def itera_leitura(sql_query: str, params: tuple = (), tamanho_bloco: int = TAMANHO_BLOCO_LEITURA):
+    """
+    Como 'leitura', mas devolve as linhas aos poucos (fetchmany) em vez de
+    montar a lista inteira: a memória usada não cresce com o tamanho do
+    resultado. A conexão fica emprestada do pool enquanto o gerador é consumido.
+
+    Gera:
+        tuple: Uma linha do resultado por vez.
+    """
+    # O tempo medido inclui o consumo das linhas por quem chamou
+    inicio = time.perf_counter()
+    total_linhas = 0
+    try:
+        with obter_pool().conexao() as conn:
+            cursor = conn.execute(sql_query, params)
+            try:
+                while linhas := cursor.fetchmany(tamanho_bloco):
+                    total_linhas += len(linhas)
+                    yield from linhas
+            finally:
+                cursor.close()
+            metricas.registra_consulta(
+                conn, "banco.leitura_fluxo", sql_query, params, time.perf_counter() - inicio, total_linhas
+            )
+
+    except sqlite3.Error as e:
+        logger.error("Erro na query de leitura: %s", e)
+        metricas.registra_consulta(
+            None, "banco.leitura_fluxo", sql_query, params, time.perf_counter() - inicio, total_linhas, erro=True
+        )
+
+
+def atualiza_estatisticas():
+    """
+    Roda o ANALYZE, que atualiza as estatísticas usadas pelo SQLite para
+    escolher os índices. Deve ser chamada depois de cargas grandes de dados.
+    """
+    try:
+        with obter_pool().conexao() as conn:
+            conn.execute("ANALYZE")
+    except sqlite3.Error as e:
+        logger.error("Erro ao atualizar as estatísticas do banco: %s", e)
+
+
+def geracao_banco() -> int:
+    """
+    Geração atual do banco (ver tabela 'geracao_banco'). Muda toda vez que o
+    ETL grava uma carga nova, então serve de chave para caches de consultas.
+
+    Retorna:
+        int: A geração, ou 0 se a tabela ainda não existir.
+    """
+    linhas = leitura("SELECT geracao FROM geracao_banco WHERE id = 1")
+    return linhas[0][0] if linhas else 0
+
+
+def incrementa_geracao(cursor=None) -> None:
+    """
+    Avança a geração do banco, invalidando os caches de consultas.
+
+    Argumentos:
+        cursor: Se informado, o incremento entra na transação desse cursor
+                (aberto com 'sessao()'); senão, é feito em uma transação própria.
+    """
+    sql = """
+        INSERT INTO geracao_banco (id, geracao) VALUES (1, 1)
+        ON CONFLICT (id) DO UPDATE SET geracao = geracao + 1, atualizado_em = datetime('now')
+    """
+    if cursor is not None:
+        cursor.execute(sql)
+        return
+
+    with sessao() as novo_cursor:
+        novo_cursor.execute(sql)
@@ -0,0 +1,118 @@
+import shutil
+import tempfile
+import zipfile
+from pathlib import Path
+from funcoes import metricas
+
+# Tamanho do bloco copiado por vez para dentro do ZIP (1 MiB)
+TAMANHO_BLOCO = 1024 * 1024
+
+# Lista (dentro do ZIP) das cópias que não foram gravadas de novo, cada uma
+# com o nome do arquivo de mesmo conteúdo que está no ZIP
+NOME_MANIFESTO_DUPLICADOS = "duplicados.txt"
+
+# Lista (dentro do ZIP) dos arquivos pedidos que não puderam ser lidos (ex.:
+# resultados cujo .fcs não está mais no disco), com o caminho e o erro
+NOME_MANIFESTO_FALTANTES = "nao_encontrados.txt"
+
+
+def le_arquivo(caminho_arquivo: Path) -> bytes:
+    """
+    Lê o arquivo inteiro. Feita para ser passada (via functools.partial) ao
+    'st.download_button', que só a chama quando o usuário clica no botão.
+    """
+    with metricas.mede("arquivo.download") as medida, open(caminho_arquivo, "rb") as f:
+        conteudo = f.read()
+        medida["bytes"] = len(conteudo)
+        return conteudo
+
+
+def _nomes_unicos(caminhos: list[Path]) -> list[str]:
+    """
+    Nome de cada arquivo dentro do ZIP; nomes repetidos ganham um sufixo ' (n)'.
+    """
+    vistos: dict[str, int] = {}
+    nomes = []
+    for caminho in caminhos:
+        nome = Path(caminho).name
+        if nome in vistos:
+            vistos[nome] += 1
+            nome = f"{Path(nome).stem} ({vistos[nome]}){Path(nome).suffix}"
+        else:
+            vistos[nome] = 1
+        nomes.append(nome)
+    return nomes
+
+
+def gera_zip(caminhos: list[Path], compressao: int = zipfile.ZIP_STORED, deduplica: bool = True):
+    """
+    Monta um ZIP com os arquivos pedidos em um arquivo temporário no disco,
+    copiando cada arquivo em blocos de TAMANHO_BLOCO (nenhum arquivo é
+    carregado inteiro na memória).
+
+    Os .fcs são quase todos dados binários de ponto flutuante, que comprimem
+    pouco; por isso o padrão é ZIP_STORED (sem compressão, bem mais rápido).
+
+    Arquivos que não existem (ou não podem ser lidos) ficam de fora e são
+    listados em NOME_MANIFESTO_FALTANTES, em vez de derrubar o download.
+
+    Argumentos:
+        deduplica (bool): Se True, arquivos de mesmo conteúdo (ver
+                          'funcoes.conteudos') entram no ZIP uma vez só; as
+                          outras cópias são listadas em NOME_MANIFESTO_DUPLICADOS.
+
+    Retorna:
+        file: Arquivo temporário aberto em modo binário, posicionado no início.
+              Ele é apagado automaticamente quando for fechado (quem chama
+              deve fechá-lo; ver 'zip_para_download').
+    """
+    destino = tempfile.TemporaryFile(suffix=".zip")
+
+    hashes = {}
+    if deduplica:
+        from funcoes.catalogo import caminho_relativo
+        from funcoes.conteudos import hashes_registrados
+
+        relativos = [caminho_relativo(caminho) for caminho in caminhos]
+        por_relativo = hashes_registrados(relativos)
+        hashes = {i: por_relativo[c] for i, c in enumerate(relativos) if c in por_relativo}
+
+    with metricas.mede("arquivo.zip") as medida:
+        gravados: dict[str, str] = {}
+        duplicados, faltantes = [], []
+        with zipfile.ZipFile(destino, "w", compression=compressao, allowZip64=True) as zf:
+            for i, (caminho, nome) in enumerate(zip(caminhos, _nomes_unicos(caminhos))):
+                hash_conteudo = hashes.get(i)
+                if hash_conteudo in gravados:
+                    duplicados.append(f"{nome}\t{gravados[hash_conteudo]}")
+                    continue
+                try:
+                    origem = open(caminho, "rb")
+                except OSError as e:
+                    faltantes.append(f"{nome}\t{caminho}\t{e.strerror or e}")
+                    continue
+                with origem, zf.open(nome, "w", force_zip64=True) as saida:
+                    shutil.copyfileobj(origem, saida, TAMANHO_BLOCO)
+                if hash_conteudo is not None:
+                    gravados[hash_conteudo] = nome
+
+            if duplicados:
+                zf.writestr(NOME_MANIFESTO_DUPLICADOS, "\n".join(["arquivo\tmesmo conteudo que", *duplicados]) + "\n")
+            if faltantes:
+                zf.writestr(NOME_MANIFESTO_FALTANTES, "\n".join(["arquivo\tcaminho\terro", *faltantes]) + "\n")
+        medida["linhas"] = len(caminhos) - len(duplicados) - len(faltantes)
+        medida["bytes"] = destino.tell()
+
+    destino.seek(0)
+    return destino
+
+
+def zip_para_download(caminhos: list[Path]) -> bytes:
+    """
+    Conteúdo do ZIP de 'gera_zip', para o 'st.download_button' (via
+    functools.partial). O Streamlit guarda na memória os bytes de qualquer
+    download (mesmo recebendo um arquivo aberto), então o ZIP é lido aqui e
+    o arquivo temporário é fechado (e apagado) logo em seguida.
+    """
+    with gera_zip(caminhos) as arquivo:
+        return arquivo.read()
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING
+from funcoes.eventos_fcs import EventosFCS
+from funcoes.cache_colunar import busca_cache, le_colunas_parquet
+from funcoes.catalogo import caminho_relativo
+from funcoes.conteudos import agrupa_por_conteudo
+from funcoes import metricas
+
+# pandas é importado dentro das funções que o usam (importar este módulo
+# não paga o custo dele)
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Percentis calculados por padrão para cada canal
+PERCENTIS_PADRAO = (1, 5, 25, 75, 95, 99)
+
+# Percentis que delimitam ±1 desvio-padrão em uma normal (usados no CV robusto)
+_P_INFERIOR, _P_SUPERIOR = 15.865, 84.135
+
+
+def le_eventos(caminho_arquivo: Path, canais: list[str] = None,
+               usar_cache: bool = True) -> tuple[list[int], dict[str, list[str]], np.ndarray]:
+    """
+    Lê a matriz de eventos (eventos x canais) só com as colunas pedidas
+    ($PnN ou $PnS; todas se 'canais' for None).
+
+    Quando só alguns canais são pedidos e o arquivo tem um .parquet válido no
+    cache colunar (ver 'etl/gera_cache_colunar.py'), só essas colunas são
+    lidas dele. Caso contrário, o .fcs é mapeado na memória (ver 'EventosFCS')
+    e apenas as colunas escolhidas são copiadas para um array NumPy em ordem
+    de bytes nativa; nada vira lista Python. Para ler todos os canais o mmap
+    é mais rápido que descomprimir o .parquet inteiro.
+
+    Retorna:
+        tuple: (índices das colunas lidas no .fcs, dicionário com 'canais'
+                ($PnN) e 'marcadores' ($PnS) das colunas lidas, em listas na
+                ordem das colunas da matriz, array eventos x canais)
+                O formato é o mesmo venha do .parquet ou do .fcs.
+    """
+    # Bytes: tamanho das colunas lidas (do .parquet ou do segmento DATA)
+    with metricas.mede("fcs.eventos") as medida:
+        if usar_cache and canais is not None:
+            caminho_parquet = busca_cache(caminho_arquivo)
+            if caminho_parquet is not None:
+                indices, pnn, pns, matriz = le_colunas_parquet(caminho_parquet, canais)
+                medida["linhas"], medida["bytes"] = len(matriz), matriz.nbytes
+                return indices, {"canais": pnn, "marcadores": pns}, matriz
+
+        with EventosFCS(caminho_arquivo) as eventos:
+            if canais is None:
+                indices = list(range(eventos.layout["parametros"]))
+            else:
+                indices = [eventos.indice(canal) for canal in canais]
+
+            dtype_nativo = eventos.layout["dtype"].newbyteorder("=")
+            matriz = eventos.matriz[:, indices].astype(dtype_nativo)
+            nomes = {
+                "canais": [eventos.canais[i] for i in indices],
+                "marcadores": [eventos.marcadores[i] for i in indices],
+            }
+
+        medida["linhas"], medida["bytes"] = len(matriz), matriz.nbytes
+        return indices, nomes, matriz
+
+
+def estatisticas_arquivo(caminho_arquivo: Path, canais: list[str] = None,
+                         percentis: tuple = PERCENTIS_PADRAO) -> pd.DataFrame:
+    """
+    Estatísticas por canal de um arquivo FCS, calculadas de forma vetorizada
+    sobre a matriz de eventos: média, mediana, CV robusto e percentis.
+
+    O CV robusto (rCV) é a definição usada em citometria:
+        100 * 0.5 * (P84,13 - P15,87) / mediana
+
+    Retorna:
+        pd.DataFrame: Uma linha por canal, com as colunas 'Canal', 'Marcador',
+                      'Eventos', 'Média', 'Mediana', 'rCV (%)' e 'P<n>' para cada percentil.
+    """
+    indices, nomes, matriz = le_eventos(caminho_arquivo, canais)
+
+    # Todos os percentis de todos os canais em uma única chamada
+    qs = [_P_INFERIOR, 50, _P_SUPERIOR, *percentis]
+    if len(matriz):
+        valores = np.percentile(matriz, qs, axis=0)
+        medias = matriz.mean(axis=0, dtype=np.float64)
+    else:
+        valores = np.full((len(qs), len(indices)), np.nan)
+        medias = np.full(len(indices), np.nan)
+
+    inferior, mediana, superior = valores[0], valores[1], valores[2]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rcv = np.where(mediana != 0, 100 * 0.5 * (superior - inferior) / np.abs(mediana), np.nan)
+
+    import pandas as pd
+
+    df = pd.DataFrame({
+        "Canal": nomes["canais"],
+        "Marcador": nomes["marcadores"],
+        "Eventos": len(matriz),
+        "Média": medias,
+        "Mediana": mediana,
+        "rCV (%)": rcv,
+    })
+    for p, linha in zip(percentis, valores[3:]):
+        df[f"P{p:g}"] = linha
+
+    return df
+
+
+def estatisticas_lote(lista_caminhos_fcs: list, canais: list[str] = None,
+                      max_workers: int = None) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Calcula 'estatisticas_arquivo' para vários arquivos em paralelo (threads:
+    a leitura e o NumPy liberam o GIL) e junta tudo em um único DataFrame,
+    com a coluna 'Arquivo' na frente.
+
+    Arquivos de mesmo conteúdo (ver 'funcoes.conteudos') são calculados uma
+    vez só e o resultado é repetido para cada cópia.
+
+    Retorna:
+        tuple: (df_estatisticas, df_erros com 'Arquivo', 'Caminho' e 'Erro')
+    """
+    import pandas as pd
+
+    por_relativo = {caminho_relativo(caminho): caminho for caminho in lista_caminhos_fcs}
+    grupos = agrupa_por_conteudo(list(por_relativo))
+
+    def _calcula(grupo):
+        try:
+            return grupo, estatisticas_arquivo(por_relativo[grupo[0]], canais), None
+        except Exception as e:
+            return grupo, None, str(e)
+
+    partes, erros = [], {"Arquivo": [], "Caminho": [], "Erro": []}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for grupo, df, erro in executor.map(_calcula, grupos):
+            for caminho in (por_relativo[c] for c in grupo):
+                if erro is None:
+                    partes.append(df.assign(Arquivo=Path(caminho).name))
+                else:
+                    erros["Arquivo"].append(Path(caminho).name)
+                    erros["Caminho"].append(str(caminho))
+                    erros["Erro"].append(erro)
+
+    df_estatisticas = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
+    if partes:
+        df_estatisticas = df_estatisticas[["Arquivo"] + [c for c in df_estatisticas.columns if c != "Arquivo"]]
+    return df_estatisticas, pd.DataFrame(erros)
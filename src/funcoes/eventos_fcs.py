@@ -0,0 +1,81 @@
+import mmap
+import numpy as np
+from pathlib import Path
+from funcoes.leitor_fcs import le_texto_fcs, descreve_dados
+
+
+class EventosFCS:
+    """
+    Acesso aos eventos de um arquivo FCS sem copiar nem decodificar o
+    segmento DATA: o arquivo é mapeado na memória (mmap) e exposto como uma
+    matriz NumPy (eventos x parâmetros) com o dtype e a ordem de bytes do
+    arquivo. O sistema operacional só carrega as páginas que forem lidas.
+
+    Uso:
+        with EventosFCS(caminho) as eventos:
+            fl1 = eventos.coluna("FL1-A")         # view, sem cópia
+            par = eventos.colunas(["FL1-A", "PE-A"])
+
+    As views só são válidas enquanto o arquivo estiver aberto; para guardar
+    os dados depois do 'with', faça uma cópia (np.array(view)).
+    """
+
+    def __init__(self, caminho_arquivo: Path):
+        self.caminho = Path(caminho_arquivo)
+
+        header, meta = le_texto_fcs(self.caminho)
+        self.layout = descreve_dados(header, meta)
+        self.canais: list[str] = self.layout["canais"]
+        self.marcadores: list[str] = self.layout["marcadores"]
+
+        eventos, parametros = self.layout["eventos"], self.layout["parametros"]
+
+        with open(self.caminho, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.matriz: np.ndarray = np.frombuffer(
+            self._mmap,
+            dtype=self.layout["dtype"],
+            count=eventos * parametros,
+            offset=self.layout["inicio"]
+        ).reshape(eventos, parametros)
+
+    def indice(self, canal: str) -> int:
+        """
+        Índice (coluna da matriz) de um canal, procurado por $PnN e depois por $PnS.
+        """
+        if canal in self.canais:
+            return self.canais.index(canal)
+        if canal in self.marcadores:
+            return self.marcadores.index(canal)
+        raise KeyError(f"Canal '{canal}' não encontrado em {self.caminho.name}")
+
+    def coluna(self, canal: str) -> np.ndarray:
+        """
+        Um canal como view 1D (com passo) sobre o arquivo mapeado, sem cópia.
+        """
+        return self.matriz[:, self.indice(canal)]
+
+    def colunas(self, canais: list[str]) -> dict[str, np.ndarray]:
+        """
+        Vários canais, cada um como uma view sem cópia. Os demais canais não
+        são decodificados nem copiados.
+        """
+        return {canal: self.coluna(canal) for canal in canais}
+
+    def fechar(self):
+        """
+        Libera o mapeamento. Se ainda existirem views em uso, o mmap é mantido
+        e será fechado pelo coletor de lixo quando elas deixarem de existir.
+        """
+        self.matriz = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.fechar()
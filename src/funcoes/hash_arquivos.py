@@ -0,0 +1,25 @@
+import hashlib
+from pathlib import Path
+
+# Tamanho do bloco lido por vez ao calcular o hash (1 MiB)
+TAMANHO_BLOCO = 1024 * 1024
+
+
+def calcula_hash(caminho_arquivo: Path) -> str:
+    """
+    Calcula o hash SHA-256 do conteúdo de um arquivo em uma única leitura
+    sequencial, em blocos, sem carregar arquivos grandes inteiros na memória.
+    No Python 3.11+ o 'hashlib.file_digest' lê direto para um buffer
+    reaproveitado (sem criar um 'bytes' novo por bloco).
+
+    Retorna:
+        str: O hash em hexadecimal.
+    """
+    with open(caminho_arquivo, "rb") as f:
+        if hasattr(hashlib, "file_digest"):
+            return hashlib.file_digest(f, "sha256").hexdigest()
+
+        h = hashlib.sha256()
+        while bloco := f.read(TAMANHO_BLOCO):
+            h.update(bloco)
+        return h.hexdigest()
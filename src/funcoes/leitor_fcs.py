@@ -0,0 +1,209 @@
+from pathlib import Path
+from funcoes import metricas
+
+# O HEADER de um arquivo FCS tem sempre 58 bytes: versão (6 bytes), 4 espaços
+# e seis offsets ASCII de 8 bytes (TEXT, DATA e ANALYSIS, início e fim de cada)
+TAMANHO_HEADER = 58
+
+# Canais de dispersão/tempo que não são marcadores (mesma regra de 'extrair_metadado')
+TERMOS_EXCLUIDOS = ['FSC', 'SSC', 'TIME', 'WIDTH']
+
+
+def _offset(campo: bytes) -> int:
+    """
+    Converte um campo de offset do HEADER (ASCII alinhado à direita) em int.
+    """
+    campo = campo.strip()
+    return int(campo) if campo else 0
+
+
+def le_header(f) -> dict[str, any]:
+    """
+    Lê os 58 bytes do HEADER de um arquivo FCS já aberto em modo binário.
+
+    Retorna:
+        dict: 'versao' e os offsets 'inicio_texto', 'fim_texto', 'inicio_dados',
+              'fim_dados', 'inicio_analise' e 'fim_analise'.
+    """
+    f.seek(0)
+    header = f.read(TAMANHO_HEADER)
+
+    if len(header) < TAMANHO_HEADER or not header.startswith(b"FCS"):
+        raise ValueError("Arquivo não é um FCS válido (HEADER ausente ou incompleto)")
+
+    return {
+        "versao": header[0:6].decode("ascii"),
+        "inicio_texto": _offset(header[10:18]),
+        "fim_texto": _offset(header[18:26]),
+        "inicio_dados": _offset(header[26:34]),
+        "fim_dados": _offset(header[34:42]),
+        "inicio_analise": _offset(header[42:50]),
+        "fim_analise": _offset(header[50:58]),
+    }
+
+
+def _decodifica(bruto: bytes) -> str:
+    """
+    FCS 3.1 usa UTF-8 no TEXT; versões antigas usam ASCII/Latin-1.
+    """
+    try:
+        return bruto.decode("utf-8")
+    except UnicodeDecodeError:
+        return bruto.decode("latin-1")
+
+
+def interpreta_texto(bruto: bytes) -> dict[str, str]:
+    """
+    Interpreta o segmento TEXT: o primeiro byte é o delimitador e os pares
+    chave/valor vêm em sequência. Um delimitador duplicado dentro de um
+    valor representa o próprio caractere.
+
+    Retorna:
+        dict: Chaves em minúsculas e sem o '$' (igual ao 'flowio'), ex: 'p1n', 'tot'.
+    """
+    texto = _decodifica(bruto)
+    if not texto:
+        raise ValueError("Segmento TEXT vazio")
+
+    delimitador = texto[0]
+    marcador = "\x00"
+
+    # Protege os delimitadores escapados antes de dividir
+    partes = texto[1:].replace(delimitador * 2, marcador).split(delimitador)
+    if partes and partes[-1] == "":
+        partes.pop()
+
+    partes = [parte.replace(marcador, delimitador) for parte in partes]
+
+    return {
+        chave.strip().lstrip("$").lower(): valor
+        for chave, valor in zip(partes[0::2], partes[1::2])
+    }
+
+
+def le_texto_fcs(caminho_arquivo: Path) -> tuple[dict[str, any], dict[str, str]]:
+    """
+    Lê apenas o HEADER e o segmento TEXT do arquivo, com leituras limitadas
+    (o segmento DATA, que é a maior parte do arquivo, nunca é lido).
+
+    Retorna:
+        tuple: (header, texto), ver 'le_header' e 'interpreta_texto'.
+    """
+    with metricas.mede("fcs.texto") as medida, open(caminho_arquivo, "rb") as f:
+        header = le_header(f)
+
+        inicio, fim = header["inicio_texto"], header["fim_texto"]
+        if fim < inicio or inicio < TAMANHO_HEADER:
+            raise ValueError(f"Offsets do segmento TEXT inválidos ({inicio}, {fim})")
+
+        f.seek(inicio)
+        bruto = f.read(fim - inicio + 1)
+        medida["bytes"] = TAMANHO_HEADER + len(bruto)
+
+        if len(bruto) != fim - inicio + 1:
+            raise ValueError("Arquivo truncado: segmento TEXT incompleto")
+
+        return header, interpreta_texto(bruto)
+
+
+def le_metadado_fcs(caminho_arquivo: Path) -> dict[str, any]:
+    """
+    Versão leve de 'extrair_metadado': lê só o HEADER/TEXT e devolve um
+    dicionário com o mesmo formato. Deixa a exceção subir em caso de erro.
+    """
+    _, meta = le_texto_fcs(caminho_arquivo)
+
+    lista_canais: list[dict[str, str]] = []
+    lista_fluoroforos: list[dict[str, str]] = []
+
+    for numero in range(1, int(meta.get('par', 0)) + 1):
+        pnn = meta.get(f'p{numero}n')
+        pns = meta.get(f'p{numero}s')
+
+        concatena: str = f"{pnn or ''}{pns or ''}".upper()
+
+        if not any(termo in concatena for termo in TERMOS_EXCLUIDOS):
+            lista_canais.append({
+                "Canal": pnn
+            })
+            lista_fluoroforos.append({
+                "Fluoróforo": pns
+            })
+
+    return {
+        "Data": meta.get('date', 'N/A'),
+        "Citômetro": meta.get('cyt', 'N/A'),
+        "Amostra": meta.get('tbnm'),
+        "Eventos registrados": int(meta.get('tot', 0)),
+        "Canais": lista_canais,
+        "Fluoróforos": lista_fluoroforos
+    }
+
+
+def _faixa(valor: str) -> float:
+    """
+    Converte um $PnR (faixa do parâmetro) em float; 0 se ausente ou inválido.
+    """
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def descreve_dados(header: dict[str, any], meta: dict[str, str]) -> dict[str, any]:
+    """
+    Descreve o layout do segmento DATA a partir do HEADER e do TEXT
+    (modo 'L' - lista de eventos - com todos os parâmetros do mesmo tamanho).
+
+    Retorna:
+        dict: 'inicio' e 'fim' (offsets em bytes), 'eventos' ($TOT),
+              'parametros' ($PAR), 'dtype' (tipo NumPy de cada valor, com a
+              ordem de bytes de $BYTEORD), 'canais' ($PnN), 'marcadores' ($PnS)
+              e 'faixas' ($PnR, 0 quando ausente).
+    """
+    # NumPy só é importado aqui: a leitura do TEXT (catálogo, ETL) não precisa dele
+    import numpy as np
+
+    if meta.get('mode', 'L').upper() != 'L':
+        raise ValueError(f"Modo de dados '{meta.get('mode')}' não suportado (apenas 'L')")
+
+    parametros = int(meta.get('par', 0))
+    eventos = int(meta.get('tot', 0))
+    tipo = meta.get('datatype', '').upper()
+
+    bits = {meta.get(f'p{numero}b', '').strip() for numero in range(1, parametros + 1)}
+    if len(bits) != 1:
+        raise ValueError(f"Parâmetros com tamanhos diferentes ($PnB = {sorted(bits)}) não são suportados")
+    bits = bits.pop()
+
+    if tipo == 'F':
+        codigo = 'f4'
+    elif tipo == 'D':
+        codigo = 'f8'
+    elif tipo == 'I' and bits in ('8', '16', '32', '64'):
+        codigo = f'u{int(bits) // 8}'
+    else:
+        raise ValueError(f"$DATATYPE '{tipo}' com $PnB '{bits}' não suportado")
+
+    # '1,2,3,4' = little-endian; '4,3,2,1' = big-endian
+    ordem = meta.get('byteord', '1,2,3,4').replace(' ', '')
+    endian = '<' if ordem.startswith('1') else '>'
+    dtype = np.dtype(endian + codigo) if codigo != 'u1' else np.dtype('u1')
+
+    # Arquivos grandes (> 99.999.999 bytes) guardam os offsets só no TEXT
+    inicio = header['inicio_dados'] or int(meta.get('begindata', 0))
+    fim = header['fim_dados'] or int(meta.get('enddata', 0))
+
+    if fim - inicio + 1 < eventos * parametros * dtype.itemsize:
+        raise ValueError("Segmento DATA menor do que $TOT x $PAR indicam")
+
+    return {
+        "inicio": inicio,
+        "fim": fim,
+        "eventos": eventos,
+        "parametros": parametros,
+        "dtype": dtype,
+        "canais": [meta.get(f'p{numero}n') for numero in range(1, parametros + 1)],
+        "marcadores": [meta.get(f'p{numero}s') for numero in range(1, parametros + 1)],
+        "faixas": [_faixa(meta.get(f'p{numero}r')) for numero in range(1, parametros + 1)],
+    }
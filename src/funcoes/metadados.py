@@ -1,6 +1,71 @@
-import pandas as pd
-import flowio
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from pathlib import Path
+from typing import TYPE_CHECKING
+from funcoes.leitor_fcs import le_metadado_fcs, TERMOS_EXCLUIDOS
+from funcoes import metricas
+
+# pandas e flowio são importados dentro das funções que os usam: importar
+# este módulo (o ETL, as páginas) não paga o custo deles
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def _le_metadado_flowio(caminho_arquivo: Path) -> dict[str, any]:
+    """
+    Lê arquivo fcs com o 'flowio', extrai metadados principais e normaliza canais.
+    Diferente de 'extrair_metadado', deixa a exceção subir em caso de erro.
+    """
+    import flowio
+
+    # Lê apenas a seção de metadados
+    with metricas.mede("fcs.flowio"):
+        fcs = flowio.FlowData(str(caminho_arquivo), only_text=True)
+    meta = fcs.text
+
+    lista_canais: list[dict[str, str]] = []
+    lista_fluoroforos: list[dict[str, str]] = []
+
+    exclusao: list[str] = TERMOS_EXCLUIDOS
+    for numero, info in fcs.channels.items():
+
+        canal: str = info.get('pnn', '').upper()
+        fluoroforo: str = info.get('pns', '').upper()
+
+        concatena: str = f"{canal}{fluoroforo}"
+
+        if not any(termo in concatena for termo in exclusao):
+
+            lista_canais.append({
+                "Canal": info.get('pnn')
+            })
+            lista_fluoroforos.append({
+                "Fluoróforo": info.get('pns')
+            })
+            pass 
+
+    dicionario: dict[str, any] = {
+        "Data": meta.get('date', 'N/A'),
+        "Citômetro": meta.get('cyt', 'N/A'),
+        "Amostra": meta.get('tbnm'),
+        "Eventos registrados": int(meta.get('tot',0)),
+        "Canais": lista_canais,
+        "Fluoróforos": lista_fluoroforos
+    }
+    return dicionario
+
+
+def _le_metadado(caminho_arquivo: Path) -> dict[str, any]:
+    """
+    Usa o leitor leve de HEADER/TEXT ('leitor_fcs') e, se ele não conseguir
+    interpretar o arquivo, tenta de novo com o 'flowio'.
+    Deixa a exceção subir em caso de erro.
+    """
+    try:
+        return le_metadado_fcs(caminho_arquivo)
+    except ValueError:
+        return _le_metadado_flowio(caminho_arquivo)
 
 
 def extrair_metadado(caminho_arquivo: Path) -> dict[str, any]:
@@ -10,49 +75,97 @@ def extrair_metadado(caminho_arquivo: Path) -> dict[str, any]:
     """
 
     try:
-        # Lê apenas a seção de metadados
-        fcs = flowio.FlowData(str(caminho_arquivo), only_text=True)
-        meta = fcs.text
+        return _le_metadado(caminho_arquivo)
 
-        lista_canais: list[dict[str, str]] = []
-        lista_fluoroforos: list[dict[str, str]] = []
+    except Exception as e:
+        return {"Status": "Erro de Leitura", "Error": str(e)}
 
-        exclusao: list[str] = ['FSC', 'SSC', 'TIME', 'WIDTH']
-        for numero, info in fcs.channels.items():
 
-            canal: str = info.get('pnn', '').upper()
-            fluoroforo: str = info.get('pns', '').upper()
+def itera_metadados(lista_caminhos_fcs: list, max_workers: int = None, usar_processos: bool = False):
+    """
+    Extrai os metadados de vários arquivos em paralelo e devolve cada resultado
+    assim que ele fica pronto (não necessariamente na ordem da lista).
 
-            concatena: str = f"{canal}{fluoroforo}"
+    Argumentos:
+        lista_caminhos_fcs (list): Caminhos dos arquivos .fcs.
+        max_workers (int): Quantidade de threads/processos (None = padrão do Python).
+        usar_processos (bool): Se True usa um pool de processos (bom quando o
+                               gargalo é CPU); se False usa threads (bom para I/O).
 
-            if not any(termo in concatena for termo in exclusao):
+    Gera:
+        tuple: (caminho, dicionário de metadados ou None, mensagem de erro ou None)
+    """
+    Executor = ProcessPoolExecutor if usar_processos else ThreadPoolExecutor
 
-                lista_canais.append({
-                    "Canal": info.get('pnn')
-                })
-                lista_fluoroforos.append({
-                    "Fluoróforo": info.get('pns')
-                })
-                pass 
+    with Executor(max_workers=max_workers) as executor:
+        futuros = {executor.submit(_le_metadado, caminho): caminho for caminho in lista_caminhos_fcs}
 
-        dicionario: dict[str, any] = {
-            "Data": meta.get('date', 'N/A'),
-            "Citômetro": meta.get('cyt', 'N/A'),
-            "Amostra": meta.get('tbnm'),
-            "Eventos registrados": int(meta.get('tot',0)),
-            "Canais": lista_canais,
-            "Fluoróforos": lista_fluoroforos
-        }
-        return dicionario
+        for futuro in as_completed(futuros):
+            caminho = futuros[futuro]
+            try:
+                yield caminho, futuro.result(), None
+            except Exception as e:
+                yield caminho, None, str(e)
 
-    except Exception as e:
-        return {"Status": "Erro de Leitura", "Error": str(e)}
+
+def extrair_metadados_lote(lista_caminhos_fcs: list, max_workers: int = None, usar_processos: bool = False,
+                           ao_concluir=None) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Extrai os metadados de um lote de arquivos em paralelo (ver 'itera_metadados')
+    e monta um único DataFrame, com uma linha por arquivo.
+
+    Argumentos:
+        ao_concluir (callable): Opcional. Chamada como ao_concluir(feitos, total)
+                                a cada arquivo processado (útil para barra de progresso).
+
+    Retorna:
+        tuple: (df_metadados, df_erros)
+               df_metadados tem as colunas 'Arquivo', 'Caminho', 'Data', 'Citômetro',
+               'Amostra', 'Eventos registrados', 'Canais' e 'Fluoróforos'
+               (as duas últimas com listas de nomes).
+               df_erros tem as colunas 'Arquivo', 'Caminho' e 'Erro'.
+    """
+    import pandas as pd
+
+    colunas: dict[str, list] = {
+        "Arquivo": [], "Caminho": [], "Data": [], "Citômetro": [], "Amostra": [],
+        "Eventos registrados": [], "Canais": [], "Fluoróforos": []
+    }
+    erros: dict[str, list] = {"Arquivo": [], "Caminho": [], "Erro": []}
+
+    total = len(lista_caminhos_fcs)
+    for feitos, (caminho, dados, erro) in enumerate(
+            itera_metadados(lista_caminhos_fcs, max_workers, usar_processos), start=1):
+
+        if erro is not None:
+            erros["Arquivo"].append(Path(caminho).name)
+            erros["Caminho"].append(str(caminho))
+            erros["Erro"].append(erro)
+        else:
+            colunas["Arquivo"].append(Path(caminho).name)
+            colunas["Caminho"].append(str(caminho))
+            colunas["Data"].append(dados["Data"])
+            colunas["Citômetro"].append(dados["Citômetro"])
+            colunas["Amostra"].append(dados["Amostra"])
+            colunas["Eventos registrados"].append(dados["Eventos registrados"])
+            colunas["Canais"].append([item["Canal"] for item in dados["Canais"]])
+            colunas["Fluoróforos"].append([item["Fluoróforo"] for item in dados["Fluoróforos"]])
+
+        if ao_concluir is not None:
+            ao_concluir(feitos, total)
+
+    df_metadados = pd.DataFrame(colunas)
+    df_metadados["Eventos registrados"] = df_metadados["Eventos registrados"].astype("Int64")
+
+    return df_metadados, pd.DataFrame(erros)
     
 
 def formata_df(dados_brutos: dict[str,any]) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
     """
     Recebe dicionário de metadados fcs extraído e tranforma em três Dataframes 
     """
+    import pandas as pd
+
     # Dataframe de dados gerais
     dados_gerais: dict[str, list[any]] = {
         "Métrica": ["Data", "Citômetro", "Amostra", "Eventos registrados"],
@@ -72,55 +185,27 @@ def formata_df(dados_brutos: dict[str,any]) -> tuple[pd.DataFrame, pd.DataFrame,
 
     return df_geral, df_canais, df_fluoroforos
 
-def processa_compara(lista_caminhos_fcs:list):
-    lista_dados_gerais_planos = []
-
-    for caminho in lista_caminhos_fcs:
-        dados_brutos = extrair_metadado(caminho)
-
-        df_geral = formata_df(dados_brutos)
-
-        df_geral_transposto = df_geral.set_index('Métrica').T
-        df_geral_transposto['Arquivo'] = Path(caminho).name
-
-        lista_dados_gerais_planos.append(df_geral_transposto)
-
-    df_comparado_geral = pd.concat(lista_dados_gerais_planos)
-    
-    df_eventos = df_comparado_geral[['Eventos registrados']].astype(int)
-
-    
-    return df_comparado_geral.drop(columns=['Eventos registrados']).describe(), df_eventos.describe()
-
-
-#    path_dir = Path(r"C:\Users\b1-66\Desktop\Projetos\fiocruz\LIMC\projeto_banco\data\raw\grupo_a\agonistas")
-
-
-    #  / do pathlib une o diretório e o nome do arquivo.
-    # O método iterdir() retorna objetos Path diretamente.
-#    if path_dir.exists():
-        # Filtrar apenas os arquivos .fcs para maior robustez
-#        list_caminhos = [caminho for caminho in path_dir.iterdir() if caminho.suffix.lower() == '.fcs']
-#    else:
-#        print(f"Erro: O diretório não foi encontrado: {path_dir}")
-#        list_caminhos = []
-
-#    if list_caminhos:
-#        teste = processa_compara(list_caminhos)
-#        print(teste)
-#    else:
-#        print("Nenhum arquivo FCS encontrado ou o diretório está vazio/inexistente.")
-
-
-
-### Teste pra extrair só um dos dataframes que retornam da função de formatar df
-
-a = r"C:\Users\b1-66\Desktop\Projetos\fiocruz\LIMC\projeto_banco\data\raw\grupo_a\agonistas\AGO BCG 11.fcs"
-
-teste = extrair_metadado(a)
-print(teste)
+def processa_compara(lista_caminhos_fcs:list, max_workers: int = None) -> dict[str, pd.DataFrame]:
+    """
+    Compara os metadados gerais de vários arquivos fcs como um único conjunto.
+    Os arquivos já presentes no catálogo do banco são lidos de lá em blocos;
+    só os que faltam são lidos do disco, em paralelo. Cada arquivo é somado
+    aos agregados assim que é lido (ver 'funcoes/comparacao.py'), sem montar
+    um DataFrame por arquivo.
+
+    Retorna:
+        dict: DataFrames tipados 'resumo' (arquivos, eventos, datas), 'paineis',
+              'canais', 'citometros' e 'datas', e 'erros' (arquivos que não
+              puderam ser lidos, com a mensagem de erro).
+    """
+    # Import local: 'comparacao' usa 'itera_metadados' deste módulo
+    from funcoes.comparacao import compara_arquivos
 
+    return compara_arquivos(lista_caminhos_fcs, max_workers=max_workers)
 
-# aaa = formata_df(teste)[1].value_counts()
-#print(aaa)
 
+if __name__ == "__main__":
+    # Teste manual: python -m funcoes.metadados <arquivo.fcs> [<arquivo.fcs> ...]
+    import sys
+    for caminho in sys.argv[1:]:
+        print(extrair_metadado(caminho))
@@ -0,0 +1,270 @@
+"""
+Instrumentação dos caminhos quentes: tempo, linhas e bytes de cada operação
+(consultas ao banco, leitura de arquivos FCS, downloads, páginas do app),
+guardados na memória do processo.
+
+Para cada operação ('banco.leitura', 'fcs.texto', 'pagina.busca', ...) ficam
+os totais desde o início do processo e uma janela móvel com as últimas
+TAMANHO_JANELA medidas, de onde saem os percentis e o histograma de
+latência. Consultas mais lentas que 'limite_consulta_lenta_ms' vão para um
+registro circular junto com o plano (EXPLAIN QUERY PLAN).
+
+Uso:
+    with mede("fcs.texto") as medida:
+        ...
+        medida["bytes"] = len(bruto)
+
+A página 'Desempenho' do app mostra tudo isso.
+"""
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Limites superiores (ms) das faixas dos histogramas de latência; a última faixa é aberta
+LIMITES_HISTOGRAMA_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Medidas guardadas por operação (janela dos percentis e histogramas)
+TAMANHO_JANELA = 2048
+
+# Consultas mais lentas que isto (ms) entram no registro de consultas lentas
+LIMITE_CONSULTA_LENTA_MS = 100.0
+
+# Entradas guardadas no registro de consultas lentas (as mais antigas saem)
+TAMANHO_REGISTRO_LENTAS = 200
+
+# Consultas distintas (SQL normalizado) acompanhadas; as que passarem disso
+# são somadas em '<outras consultas>'
+MAXIMO_CONSULTAS = 500
+
+# Caracteres guardados do SQL e dos parâmetros de cada consulta
+TAMANHO_MAXIMO_SQL = 2000
+TAMANHO_MAXIMO_PARAMETROS = 300
+
+# Pode ser alterado em tempo de execução (página 'Desempenho')
+limite_consulta_lenta_ms = LIMITE_CONSULTA_LENTA_MS
+
+# Listas de parâmetros 'IN (?, ?, ...)' de tamanhos diferentes contam como a mesma consulta
+REGEX_LISTA_PARAMETROS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+REGEX_ESPACOS = re.compile(r"\s+")
+
+
+class SerieMetricas:
+    """
+    Medidas de uma operação: totais acumulados e a janela móvel com a
+    duração (ms) das últimas medidas.
+    """
+
+    def __init__(self, nome: str, tamanho_janela: int = TAMANHO_JANELA):
+        self.nome = nome
+        self.janela: deque = deque(maxlen=tamanho_janela)
+        self.chamadas = 0
+        self.erros = 0
+        self.total_ms = 0.0
+        self.maximo_ms = 0.0
+        self.linhas = 0
+        self.bytes = 0
+
+    def registra(self, duracao_ms: float, linhas: int = None, bytes_lidos: int = None, erro: bool = False):
+        self.janela.append(duracao_ms)
+        self.chamadas += 1
+        self.erros += erro
+        self.total_ms += duracao_ms
+        self.maximo_ms = max(self.maximo_ms, duracao_ms)
+        self.linhas += linhas or 0
+        self.bytes += bytes_lidos or 0
+
+    def resumo(self) -> dict[str, any]:
+        """
+        Totais e percentis (p50/p95/p99 da janela móvel), em ms.
+        """
+        duracoes = sorted(self.janela)
+
+        def percentil(p):
+            return round(duracoes[min(len(duracoes) - 1, int(p * len(duracoes)))], 3) if duracoes else None
+
+        return {
+            "operacao": self.nome,
+            "chamadas": self.chamadas,
+            "erros": self.erros,
+            "media_ms": round(self.total_ms / self.chamadas, 3) if self.chamadas else None,
+            "p50_ms": percentil(0.50),
+            "p95_ms": percentil(0.95),
+            "p99_ms": percentil(0.99),
+            "maximo_ms": round(self.maximo_ms, 3),
+            "total_s": round(self.total_ms / 1000, 3),
+            "linhas": self.linhas,
+            "bytes": self.bytes,
+        }
+
+    def histograma(self) -> list[tuple[str, int]]:
+        """
+        Quantidade de medidas da janela móvel em cada faixa de LIMITES_HISTOGRAMA_MS.
+        """
+        contagens = [0] * (len(LIMITES_HISTOGRAMA_MS) + 1)
+        for duracao_ms in self.janela:
+            faixa = next(
+                (i for i, limite in enumerate(LIMITES_HISTOGRAMA_MS) if duracao_ms <= limite),
+                len(LIMITES_HISTOGRAMA_MS)
+            )
+            contagens[faixa] += 1
+
+        rotulos = [f"≤ {limite:g} ms" for limite in LIMITES_HISTOGRAMA_MS] + [f"> {LIMITES_HISTOGRAMA_MS[-1]:g} ms"]
+        return list(zip(rotulos, contagens))
+
+
+_trava = threading.Lock()
+_series: dict[str, SerieMetricas] = {}
+_consultas: dict[str, SerieMetricas] = {}
+_lentas: deque = deque(maxlen=TAMANHO_REGISTRO_LENTAS)
+
+
+def _serie(colecao: dict[str, SerieMetricas], nome: str) -> SerieMetricas:
+    if nome not in colecao:
+        colecao[nome] = SerieMetricas(nome)
+    return colecao[nome]
+
+
+def registra(operacao: str, duracao_s: float, linhas: int = None, bytes_lidos: int = None, erro: bool = False):
+    """
+    Guarda uma medida de 'operacao' (duração em segundos).
+    """
+    with _trava:
+        _serie(_series, operacao).registra(duracao_s * 1000, linhas, bytes_lidos, erro)
+
+
+class mede:
+    """
+    Mede o tempo do bloco 'with' e registra em 'operacao'. O bloco pode
+    preencher medida["linhas"] e medida["bytes"]; se ele levantar uma
+    exceção, a medida conta como erro e a exceção é repassada.
+
+    É uma classe (e não um '@contextmanager') porque envolve chamadas de
+    poucos microssegundos, como a leitura do TEXT de um .fcs.
+    """
+    __slots__ = ("operacao", "medida", "inicio")
+
+    def __init__(self, operacao: str):
+        self.operacao = operacao
+
+    def __enter__(self) -> dict[str, int]:
+        self.medida = {"linhas": None, "bytes": None}
+        self.inicio = time.perf_counter()
+        return self.medida
+
+    def __exit__(self, tipo_excecao, *args):
+        registra(
+            self.operacao, time.perf_counter() - self.inicio,
+            self.medida["linhas"], self.medida["bytes"], tipo_excecao is not None
+        )
+
+
+def normaliza_sql(sql: str) -> str:
+    """
+    SQL em uma linha, com as listas 'IN (?, ?, ...)' reduzidas a '(?, ...)',
+    para agrupar as execuções da mesma consulta.
+    """
+    sql = REGEX_ESPACOS.sub(" ", sql).strip()
+    return REGEX_LISTA_PARAMETROS.sub("(?, ...)", sql)[:TAMANHO_MAXIMO_SQL]
+
+
+def registra_consulta(conn: sqlite3.Connection, operacao: str, sql: str, params, duracao_s: float,
+                      linhas: int = None, erro: bool = False):
+    """
+    Registra uma consulta ao banco: na operação ('banco.leitura', ...), nos
+    totais da consulta (SQL normalizado) e, se passou de
+    'limite_consulta_lenta_ms', no registro de consultas lentas com o plano
+    de execução (EXPLAIN QUERY PLAN, na mesma conexão).
+    """
+    duracao_ms = duracao_s * 1000
+    chave = normaliza_sql(sql)
+    with _trava:
+        _serie(_series, operacao).registra(duracao_ms, linhas, None, erro)
+        if chave not in _consultas and len(_consultas) >= MAXIMO_CONSULTAS:
+            chave = "<outras consultas>"
+        _serie(_consultas, chave).registra(duracao_ms, linhas, None, erro)
+
+    if erro or duracao_ms < limite_consulta_lenta_ms:
+        return
+
+    try:
+        plano = "\n".join(linha[3] for linha in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+    except sqlite3.Error as e:
+        plano = f"(plano indisponível: {e})"
+
+    logger.warning("Consulta lenta (%.1f ms, %s linhas): %s", duracao_ms, linhas, chave[:200])
+    with _trava:
+        _lentas.append({
+            "instante": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "operacao": operacao,
+            "duracao_ms": round(duracao_ms, 3),
+            "linhas": linhas,
+            "sql": chave,
+            "parametros": repr(params)[:TAMANHO_MAXIMO_PARAMETROS],
+            "plano": plano,
+        })
+
+
+def resumo_operacoes() -> list[dict[str, any]]:
+    """
+    Resumo de cada operação medida, da que mais tempo consumiu para a que menos.
+    """
+    with _trava:
+        resumos = [serie.resumo() for serie in _series.values()]
+    return sorted(resumos, key=lambda resumo: -resumo["total_s"])
+
+
+def resumo_consultas() -> list[dict[str, any]]:
+    """
+    Resumo de cada consulta distinta (SQL normalizado), da que mais tempo consumiu para a que menos.
+    """
+    with _trava:
+        resumos = [serie.resumo() for serie in _consultas.values()]
+    for resumo in resumos:
+        resumo["sql"] = resumo.pop("operacao")
+    return sorted(resumos, key=lambda resumo: -resumo["total_s"])
+
+
+def histograma(operacao: str) -> list[tuple[str, int]]:
+    """
+    Histograma de latência da janela móvel de uma operação (vazio se ela nunca foi medida).
+    """
+    with _trava:
+        serie = _series.get(operacao)
+        return serie.histograma() if serie else []
+
+
+def consultas_lentas() -> list[dict[str, any]]:
+    """
+    Registro de consultas lentas, da mais recente para a mais antiga.
+    """
+    with _trava:
+        return list(reversed(_lentas))
+
+
+def exporta() -> dict[str, any]:
+    """
+    Todas as métricas em um dicionário (para salvar em JSON e comparar depois).
+    """
+    return {
+        "gerado_em": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "limite_consulta_lenta_ms": limite_consulta_lenta_ms,
+        "operacoes": resumo_operacoes(),
+        "histogramas": {resumo["operacao"]: histograma(resumo["operacao"]) for resumo in resumo_operacoes()},
+        "consultas": resumo_consultas(),
+        "consultas_lentas": consultas_lentas(),
+    }
+
+
+def limpa():
+    """
+    Zera todas as métricas do processo.
+    """
+    with _trava:
+        _series.clear()
+        _consultas.clear()
+        _lentas.clear()
@@ -0,0 +1,218 @@
+import hashlib
+import re
+import threading
+from funcoes.db_tools import leitura, sessao, geracao_banco, incrementa_geracao
+
+# Espaços repetidos viram um só na normalização dos rótulos
+REGEX_ESPACOS = re.compile(r"\s+")
+
+
+def normaliza_rotulo(texto: str) -> str:
+    """
+    Normaliza um $PnN/$PnS para comparação: sem espaços nas pontas, espaços
+    internos únicos e em maiúsculas ('b525-fitc-a ' -> 'B525-FITC-A').
+    """
+    return REGEX_ESPACOS.sub(" ", (texto or "").strip()).upper()
+
+
+def assinatura_painel(canais: list[tuple[str, str]]) -> tuple[str, str]:
+    """
+    Assinatura canônica de um painel: pares (PnN, PnS) normalizados, sem
+    repetição e em ordem, unidos em 'PNN=PNS;PNN=PNS;...'. A ordem dos
+    canais no arquivo não muda a assinatura.
+
+    Argumentos:
+        canais (list): (pnn, pns) dos canais do painel, já sem FSC/SSC/TIME/WIDTH.
+
+    Retorna:
+        tuple: (hash SHA-256 do texto canônico em hexadecimal, texto canônico)
+    """
+    pares = sorted({(normaliza_rotulo(pnn), normaliza_rotulo(pns)) for pnn, pns in canais})
+    canonico = ";".join(f"{pnn}={pns}" for pnn, pns in pares)
+    return hashlib.sha256(canonico.encode("utf-8")).hexdigest(), canonico
+
+
+def marcadores_painel(canais: list[tuple[str, str]]) -> set[str]:
+    """
+    Todos os rótulos (PnN e PnS) normalizados e não vazios de um painel.
+    """
+    return {rotulo for pnn, pns in canais for rotulo in (normaliza_rotulo(pnn), normaliza_rotulo(pns)) if rotulo}
+
+
+def grava_painel(cursor, id_arquivo: int, canais: list[tuple]) -> int:
+    """
+    Liga um arquivo do catálogo ao seu painel, criando o painel (e seus
+    marcadores) se for a primeira vez que a assinatura aparece. Roda dentro
+    da transação do cursor recebido (chamada por 'catalogo.grava_catalogo').
+
+    Argumentos:
+        canais (list): Canais do registro do catálogo: (numero, pnn, pns, excluido).
+
+    Retorna:
+        int: O 'id_painel'.
+    """
+    pares = [(pnn, pns) for _, pnn, pns, excluido in canais if not excluido]
+    assinatura, canonico = assinatura_painel(pares)
+
+    linha = cursor.execute("SELECT id_painel FROM paineis WHERE assinatura = ?", (assinatura,)).fetchone()
+    if linha:
+        id_painel = linha[0]
+    else:
+        cursor.execute(
+            "INSERT INTO paineis (assinatura, canonico, canais) VALUES (?, ?, ?) RETURNING id_painel",
+            (assinatura, canonico, canonico.count(";") + 1 if canonico else 0)
+        )
+        id_painel = cursor.fetchone()[0]
+        cursor.executemany(
+            "INSERT INTO painel_marcadores (id_painel, marcador) VALUES (?, ?)",
+            [(id_painel, marcador) for marcador in sorted(marcadores_painel(pares))]
+        )
+
+    cursor.execute("""
+        INSERT INTO painel_arquivo (id_arquivo, id_painel) VALUES (?, ?)
+        ON CONFLICT (id_arquivo) DO UPDATE SET id_painel = excluded.id_painel
+    """, (id_arquivo, id_painel))
+    return id_painel
+
+
+def indexa_faltantes() -> int:
+    """
+    Indexa os arquivos do catálogo que ainda não têm painel (catalogados
+    antes do índice existir), a partir da tabela 'canais_arquivo'. Se algum
+    arquivo for indexado, a geração do banco avança (caches da interface).
+
+    Retorna:
+        int: Quantidade de arquivos indexados.
+    """
+    linhas = leitura("""
+        SELECT m.id_arquivo, c.numero, c.pnn, c.pns, c.excluido
+        FROM metadados_arquivo AS m
+        LEFT JOIN canais_arquivo AS c ON c.id_arquivo = m.id_arquivo
+        WHERE NOT EXISTS (SELECT 1 FROM painel_arquivo AS p WHERE p.id_arquivo = m.id_arquivo)
+        ORDER BY m.id_arquivo, c.numero
+    """)
+    if not linhas:
+        return 0
+
+    canais_por_arquivo: dict[int, list[tuple]] = {}
+    for id_arquivo, numero, pnn, pns, excluido in linhas:
+        canais = canais_por_arquivo.setdefault(id_arquivo, [])
+        if numero is not None:
+            canais.append((numero, pnn, pns, excluido))
+
+    with sessao() as cursor:
+        for id_arquivo, canais in canais_por_arquivo.items():
+            grava_painel(cursor, id_arquivo, canais)
+        incrementa_geracao(cursor)
+
+    return len(canais_por_arquivo)
+
+
+class IndicePaineis:
+    """
+    Índice em memória dos painéis do catálogo, para buscas sem ir ao banco:
+
+        paineis              id_painel -> (assinatura, texto canônico, nº de canais)
+        por_assinatura       assinatura -> id_painel
+        arquivos_por_painel  id_painel -> frozenset de caminhos (relativos, com '/')
+        marcadores           id_painel -> frozenset de marcadores normalizados
+        painel_do_arquivo    caminho -> id_painel
+
+    As buscas são consultas a dicionários/conjuntos (O(1) por painel), e um
+    catálogo tem poucos painéis distintos mesmo com muitos arquivos.
+    """
+
+    def __init__(self, paineis: list[tuple], marcadores: list[tuple], arquivos: list[tuple]):
+        self.paineis = {id_painel: (assinatura, canonico, canais) for id_painel, assinatura, canonico, canais in paineis}
+        self.por_assinatura = {assinatura: id_painel for id_painel, (assinatura, _, _) in self.paineis.items()}
+
+        marcadores_por_painel: dict[int, set] = {id_painel: set() for id_painel in self.paineis}
+        for id_painel, marcador in marcadores:
+            marcadores_por_painel[id_painel].add(marcador)
+        self.marcadores = {id_painel: frozenset(m) for id_painel, m in marcadores_por_painel.items()}
+
+        arquivos_por_painel: dict[int, set] = {id_painel: set() for id_painel in self.paineis}
+        self.painel_do_arquivo: dict[str, int] = {}
+        for caminho, id_painel in arquivos:
+            arquivos_por_painel[id_painel].add(caminho)
+            self.painel_do_arquivo[caminho] = id_painel
+        self.arquivos_por_painel = {id_painel: frozenset(c) for id_painel, c in arquivos_por_painel.items()}
+
+    @classmethod
+    def do_banco(cls) -> "IndicePaineis":
+        """
+        Lê as tabelas 'paineis', 'painel_marcadores' e 'painel_arquivo'.
+        """
+        return cls(
+            leitura("SELECT id_painel, assinatura, canonico, canais FROM paineis"),
+            leitura("SELECT id_painel, marcador FROM painel_marcadores"),
+            leitura("""
+                SELECT m.arquivo_de_resultado, p.id_painel
+                FROM painel_arquivo AS p JOIN metadados_arquivo AS m ON m.id_arquivo = p.id_arquivo
+            """)
+        )
+
+    def _id(self, painel) -> int:
+        """
+        Aceita o id do painel ou a sua assinatura (hash completo).
+        """
+        return painel if isinstance(painel, int) else self.por_assinatura.get(painel)
+
+    def arquivos_com_painel(self, painel) -> frozenset:
+        """
+        Arquivos com exatamente o painel informado (id ou assinatura).
+        """
+        return self.arquivos_por_painel.get(self._id(painel), frozenset())
+
+    def mesmo_painel(self, caminho: str) -> frozenset:
+        """
+        Arquivos com o mesmo painel do arquivo informado (ele incluso).
+        """
+        id_painel = self.painel_do_arquivo.get(caminho)
+        return self.arquivos_por_painel.get(id_painel, frozenset())
+
+    def paineis_com_marcador(self, marcador: str) -> list[int]:
+        marcador = normaliza_rotulo(marcador)
+        return [id_painel for id_painel, marcadores in self.marcadores.items() if marcador in marcadores]
+
+    def arquivos_sem_marcador(self, marcador: str) -> frozenset:
+        """
+        Arquivos cujo painel NÃO tem o marcador (PnN ou PnS) informado.
+        """
+        marcador = normaliza_rotulo(marcador)
+        return frozenset().union(*(
+            self.arquivos_por_painel[id_painel]
+            for id_painel, marcadores in self.marcadores.items() if marcador not in marcadores
+        ))
+
+    def arquivos_com_marcadores(self, marcadores: list[str]) -> frozenset:
+        """
+        Arquivos cujo painel tem TODOS os marcadores informados.
+        """
+        procurados = {normaliza_rotulo(m) for m in marcadores}
+        return frozenset().union(*(
+            self.arquivos_por_painel[id_painel]
+            for id_painel, existentes in self.marcadores.items() if procurados <= existentes
+        ))
+
+    def todos_marcadores(self) -> list[str]:
+        return sorted(frozenset().union(*self.marcadores.values()))
+
+
+_indice = None
+_geracao_indice = None
+_trava_indice = threading.Lock()
+
+
+def obter_indice_paineis() -> IndicePaineis:
+    """
+    Índice de painéis do banco, lido uma vez e guardado em memória. É relido
+    só quando a geração do banco muda (o ETL a incrementa ao gravar o catálogo).
+    """
+    global _indice, _geracao_indice
+    geracao = geracao_banco()
+    with _trava_indice:
+        if _indice is None or _geracao_indice != geracao:
+            _indice = IndicePaineis.do_banco()
+            _geracao_indice = geracao
+        return _indice
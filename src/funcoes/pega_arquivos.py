@@ -1,14 +1,21 @@
 from pathlib import Path
 
-def pega_arquivos(letra: str, dir_base):
+def pega_arquivos(letra: str, dir_base: Path = None, ensaios: list[str] = None):
+    """
+    Lista os .fcs de cada pasta de ensaio de 'data/raw/grupo_<letra>'.
+    Os ensaios vêm do registro do banco ('funcoes.registro') se não forem informados.
+    """
+    if ensaios is None:
+        from funcoes.registro import obter_registro
+        ensaios = list(obter_registro().ensaios)
 
-    ensaios = ["agonistas", "cryptococcus", "fagocitose", "imunofenotipagem"]
     arquivos_resultados = {}
-    dir_base = Path(__file__).resolve().parent.parent.parent
+    if dir_base is None:
+        dir_base = Path(__file__).resolve().parent.parent.parent
 
     for ensaio in ensaios:
-        dir_grupo = dir_base  / "data" / "raw" / f"grupo_{letra}" / f"{ensaio}"
-       
+        dir_grupo = Path(dir_base)  / "data" / "raw" / f"grupo_{letra}" / f"{ensaio}"
+
         arquivos_totais = list(dir_grupo.glob("**/*.fcs"))
         contagem_arquivos = len(arquivos_totais)
 
@@ -21,5 +28,4 @@ def pega_arquivos(letra: str, dir_base):
 
         arquivos_resultados[ensaio] = dados_ensaio
 
-    #return arquivos_resultados
- 
\ No newline at end of file
+    return arquivos_resultados
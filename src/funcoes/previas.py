@@ -0,0 +1,349 @@
+import zlib
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from funcoes import metricas
+from funcoes.catalogo import caminho_relativo, TAMANHO_BLOCO_SQL
+from funcoes.db_tools import dir_base, leitura, sessao, incrementa_geracao
+from funcoes.eventos_fcs import EventosFCS
+from funcoes.leitor_fcs import TERMOS_EXCLUIDOS
+
+# Versão do cálculo: prévias gravadas com uma versão menor são refeitas
+VERSAO_PREVIAS = 1
+
+# Bins dos histogramas 1D e das densidades 2D (BINS_HISTOGRAMA deve ser múltiplo
+# de BINS_DENSIDADE: o bin 2D sai do bin 1D, sem recalcular a posição)
+BINS_HISTOGRAMA = 64
+BINS_DENSIDADE = 32
+
+# Pares ($PnN) das densidades 2D: dispersão (FSC x SSC) e singletos (FSC-A x FSC-H)
+PARES_DENSIDADE = [("FSC-A", "SSC-A"), ("FSC-A", "FSC-H")]
+
+# Canais de fluorescência vão para a escala asinh(x / cofator), que mostra os
+# valores negativos (compensação) e comprime os altos como um log
+COFATOR_ASINH = 150.0
+MINIMO_ASINH = np.arcsinh(-1000.0 / COFATOR_ASINH)
+
+# Limite superior dos bins: quantil QUANTIL_LIMITE (com FOLGA_LIMITE) de uma
+# amostra de até EVENTOS_AMOSTRA_LIMITES eventos, em passo fixo pelo arquivo
+QUANTIL_LIMITE = 0.999
+FOLGA_LIMITE = 1.05
+EVENTOS_AMOSTRA_LIMITES = 10000
+
+# Eventos decodificados por vez (limita a memória em arquivos grandes)
+EVENTOS_POR_BLOCO = 262144
+
+# Arquivos gravados por transação em 'calcula_faltantes'
+ARQUIVOS_POR_TRANSACAO = 256
+
+# Paleta das imagens de densidade (branco -> azul -> amarelo), em RGB
+_CORES_DENSIDADE = np.array([
+    [255, 255, 255], [198, 219, 239], [66, 146, 198], [8, 69, 148], [35, 139, 69], [253, 231, 37]
+], dtype=np.float64)
+
+
+def calcula_previas(caminho_arquivo: Path) -> dict[str, any]:
+    """
+    Histogramas 1D de todos os canais e densidades 2D dos pares de
+    'PARES_DENSIDADE' presentes no arquivo, em bins fixos. O segmento DATA é
+    lido por blocos de eventos direto do arquivo mapeado (ver 'EventosFCS') e
+    cada bloco é contado com um único 'np.bincount' para todos os canais.
+
+    Escalas: FSC/SSC/TIME/WIDTH ficam lineares em [0, máximo]; os demais canais
+    vão para asinh(x / COFATOR_ASINH) em [asinh(-1000 / cofator), asinh(máximo / cofator)].
+    O máximo é o quantil QUANTIL_LIMITE de uma amostra dos eventos (limitado
+    pelo $PnR) e fica gravado em 'limites'. Valores fora da faixa caem no
+    primeiro/último bin.
+
+    Retorna:
+        dict: 'versao', 'eventos', 'bins', 'escalas' (uma letra por parâmetro:
+              'L' linear, 'A' asinh), 'limites' (float32, parâmetros x 2),
+              'histogramas' (uint32, parâmetros x bins), 'bins_densidade',
+              'pares' (lista de (x, y) com os números dos parâmetros, a partir de 1)
+              e 'densidades' (uint32, pares x bins_densidade x bins_densidade; eixo 0 = x).
+    """
+    with metricas.mede("fcs.previas") as medida, EventosFCS(caminho_arquivo) as eventos:
+        canais = [(canal or "").strip().upper() for canal in eventos.canais]
+        parametros = len(canais)
+
+        lineares = np.array([
+            any(termo in f"{canal}{(marcador or '').upper()}" for termo in TERMOS_EXCLUIDOS)
+            for canal, marcador in zip(canais, eventos.marcadores)
+        ], dtype=bool)
+        # Limite superior de cada canal: quantil alto de uma amostra dos eventos
+        # (o $PnR costuma ser bem maior que os dados e deixaria quase tudo nos
+        # primeiros bins), com folga e sem passar do $PnR quando ele existe
+        faixas = np.array(eventos.layout["faixas"], dtype=np.float64)
+        amostra = eventos.matriz[::max(1, -(-len(eventos.matriz) // EVENTOS_AMOSTRA_LIMITES))]
+        if len(amostra):
+            # Uma linha por canal (contígua): o quantil ao longo do eixo 1 é bem mais rápido
+            por_canal = np.nan_to_num(amostra.T.astype(np.float32, order="C"))
+            superiores = np.quantile(por_canal, QUANTIL_LIMITE, axis=1) * FOLGA_LIMITE
+        else:
+            superiores = np.ones(parametros)
+        superiores = np.where(faixas > 0, np.minimum(superiores, faixas), superiores)
+        faixas = np.maximum(superiores, 1.0)
+
+        minimos = np.where(lineares, 0.0, MINIMO_ASINH)
+        maximos = np.where(lineares, faixas, np.arcsinh(faixas / COFATOR_ASINH))
+        escala_bins = (BINS_HISTOGRAMA / (maximos - minimos)).astype(np.float32)
+        minimos_32 = minimos.astype(np.float32)
+        deslocamentos = np.arange(parametros, dtype=np.int64) * BINS_HISTOGRAMA
+
+        pares = [
+            (canais.index(x), canais.index(y)) for x, y in PARES_DENSIDADE if x in canais and y in canais
+        ]
+        reducao = BINS_HISTOGRAMA // BINS_DENSIDADE
+
+        histogramas = np.zeros(parametros * BINS_HISTOGRAMA, dtype=np.int64)
+        densidades = np.zeros((len(pares), BINS_DENSIDADE * BINS_DENSIDADE), dtype=np.int64)
+        indices_asinh = np.flatnonzero(~lineares)
+
+        for inicio in range(0, len(eventos.matriz), EVENTOS_POR_BLOCO):
+            bloco = eventos.matriz[inicio:inicio + EVENTOS_POR_BLOCO].astype(np.float32)
+            if len(indices_asinh):
+                bloco[:, indices_asinh] = np.arcsinh(bloco[:, indices_asinh] / np.float32(COFATOR_ASINH))
+
+            bloco -= minimos_32
+            bloco *= escala_bins
+            # fmax/fmin descartam NaN (vai para o bin 0) e prendem o resto na faixa
+            np.fmax(bloco, 0, out=bloco)
+            np.fmin(bloco, BINS_HISTOGRAMA - 1, out=bloco)
+            bins = bloco.astype(np.int64)
+
+            histogramas += np.bincount((bins + deslocamentos).ravel(), minlength=len(histogramas))
+            for k, (x, y) in enumerate(pares):
+                densidades[k] += np.bincount(
+                    (bins[:, x] // reducao) * BINS_DENSIDADE + bins[:, y] // reducao,
+                    minlength=BINS_DENSIDADE * BINS_DENSIDADE
+                )
+
+        total_eventos = len(eventos.matriz)
+        medida["linhas"], medida["bytes"] = total_eventos, eventos.matriz.nbytes
+
+    return {
+        "versao": VERSAO_PREVIAS,
+        "eventos": total_eventos,
+        "bins": BINS_HISTOGRAMA,
+        "escalas": "".join("L" if linear else "A" for linear in lineares),
+        "limites": np.column_stack([minimos, maximos]).astype(np.float32),
+        "histogramas": histogramas.reshape(parametros, BINS_HISTOGRAMA).astype(np.uint32),
+        "bins_densidade": BINS_DENSIDADE,
+        "pares": [(x + 1, y + 1) for x, y in pares],
+        "densidades": densidades.reshape(len(pares), BINS_DENSIDADE, BINS_DENSIDADE).astype(np.uint32),
+    }
+
+
+def _codifica(contagens: np.ndarray) -> bytes:
+    """
+    Contagens uint32 (little-endian) comprimidas com zlib: as grades de
+    densidade têm muitos zeros e ficam bem menores.
+    """
+    return zlib.compress(np.ascontiguousarray(contagens, dtype="<u4").tobytes(), 6)
+
+
+def _decodifica(blob: bytes, forma: tuple) -> np.ndarray:
+    return np.frombuffer(zlib.decompress(blob), dtype="<u4").reshape(forma)
+
+
+def grava_previas(cursor, id_arquivo: int, previas: dict[str, any]):
+    """
+    Insere ou substitui as prévias de um arquivo do catálogo, dentro da
+    transação do cursor recebido.
+    """
+    cursor.execute("""
+        INSERT INTO previas_arquivo
+            (id_arquivo, versao, eventos, bins, escalas, limites, histogramas, bins_densidade, pares, densidades)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (id_arquivo) DO UPDATE SET
+            versao = excluded.versao,
+            eventos = excluded.eventos,
+            bins = excluded.bins,
+            escalas = excluded.escalas,
+            limites = excluded.limites,
+            histogramas = excluded.histogramas,
+            bins_densidade = excluded.bins_densidade,
+            pares = excluded.pares,
+            densidades = excluded.densidades
+    """, (
+        id_arquivo, previas["versao"], previas["eventos"], previas["bins"], previas["escalas"],
+        np.ascontiguousarray(previas["limites"], dtype="<f4").tobytes(),
+        _codifica(previas["histogramas"]),
+        previas["bins_densidade"],
+        ";".join(f"{x},{y}" for x, y in previas["pares"]),
+        _codifica(previas["densidades"]),
+    ))
+
+
+def copia_previas(cursor, id_arquivo: int, hash_conteudo: str) -> bool:
+    """
+    Copia para um arquivo do catálogo as prévias (da versão atual) de outro
+    arquivo com o mesmo conteúdo (ver 'funcoes.conteudos'), sem ler os
+    eventos, dentro da transação do cursor recebido.
+
+    Retorna:
+        bool: True se havia prévias para copiar.
+    """
+    cursor.execute("""
+        INSERT OR REPLACE INTO previas_arquivo
+            (id_arquivo, versao, eventos, bins, escalas, limites, histogramas, bins_densidade, pares, densidades)
+        SELECT ?, p.versao, p.eventos, p.bins, p.escalas, p.limites, p.histogramas,
+               p.bins_densidade, p.pares, p.densidades
+        FROM conteudo_arquivo AS c
+        JOIN metadados_arquivo AS m ON m.arquivo_de_resultado = c.arquivo_de_resultado
+        JOIN previas_arquivo AS p ON p.id_arquivo = m.id_arquivo
+        WHERE c.hash_conteudo = ? AND p.versao >= ? AND p.id_arquivo <> ?
+        LIMIT 1
+    """, (id_arquivo, hash_conteudo, VERSAO_PREVIAS, id_arquivo))
+    return cursor.rowcount > 0
+
+
+def calcula_faltantes(max_workers: int = None) -> int:
+    """
+    Calcula as prévias dos arquivos do catálogo que ainda não as têm (ou que
+    foram calculadas por uma versão antiga), lendo os eventos em paralelo
+    (threads: o NumPy e a leitura liberam o GIL). Se alguma prévia for
+    gravada, a geração do banco avança (caches da interface).
+
+    Os eventos de cada conteúdo (ver 'funcoes.conteudos') são lidos uma vez
+    só: cópias de um arquivo que já tem prévias recebem uma cópia delas, e
+    cópias que estão todas sem prévias são calculadas a partir da primeira.
+
+    Retorna:
+        int: Quantidade de arquivos com prévias gravadas.
+    """
+    faltantes = leitura("""
+        SELECT m.id_arquivo, m.arquivo_de_resultado, c.hash_conteudo
+        FROM metadados_arquivo AS m
+        LEFT JOIN previas_arquivo AS p ON p.id_arquivo = m.id_arquivo
+        LEFT JOIN conteudo_arquivo AS c ON c.arquivo_de_resultado = m.arquivo_de_resultado
+        WHERE p.id_arquivo IS NULL OR p.versao < ?
+    """, (VERSAO_PREVIAS,))
+    if not faltantes:
+        return 0
+
+    gravadas = 0
+    # Só conteúdos com mais de um arquivo podem ter prévias para copiar
+    repetidos = {linha[0] for linha in leitura(
+        "SELECT hash_conteudo FROM conteudo_arquivo GROUP BY hash_conteudo HAVING COUNT(*) > 1"
+    )}
+    if any(hash_conteudo in repetidos for _, _, hash_conteudo in faltantes):
+        with sessao() as cursor:
+            copiadas = {
+                id_arquivo for id_arquivo, _, hash_conteudo in faltantes
+                if hash_conteudo in repetidos and copia_previas(cursor, id_arquivo, hash_conteudo)
+            }
+            if copiadas:
+                incrementa_geracao(cursor)
+        gravadas += len(copiadas)
+        faltantes = [linha for linha in faltantes if linha[0] not in copiadas]
+
+    # Um cálculo por conteúdo (arquivos sem hash registrado são calculados um a um)
+    por_conteudo: dict[any, list[tuple[int, str]]] = {}
+    for id_arquivo, caminho_rel, hash_conteudo in faltantes:
+        por_conteudo.setdefault(hash_conteudo or id_arquivo, []).append((id_arquivo, caminho_rel))
+    grupos = list(por_conteudo.values())
+
+    def _calcula(grupo):
+        caminho_rel = grupo[0][1]
+        try:
+            return grupo, calcula_previas(dir_base / caminho_rel), None
+        except Exception as e:
+            return grupo, None, str(e)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for i in range(0, len(grupos), ARQUIVOS_POR_TRANSACAO):
+            calculadas = []
+            for grupo, previas, erro in executor.map(_calcula, grupos[i:i + ARQUIVOS_POR_TRANSACAO]):
+                if erro is None:
+                    calculadas += [(id_arquivo, previas) for id_arquivo, _ in grupo]
+                else:
+                    print(f"  [FALHA] Prévias de '{grupo[0][1]}': {erro}")
+            if calculadas:
+                with sessao() as cursor:
+                    for id_arquivo, previas in calculadas:
+                        grava_previas(cursor, id_arquivo, previas)
+                    incrementa_geracao(cursor)
+                gravadas += len(calculadas)
+
+    return gravadas
+
+
+def busca_previas(caminhos: list) -> dict[str, dict[str, any]]:
+    """
+    Prévias de vários arquivos (uma página da lista) direto do banco, com os
+    rótulos dos canais ('PnN (PnS)'). Arquivos sem prévia ficam de fora.
+
+    Retorna:
+        dict: caminho relativo (com '/') -> dicionário no formato de
+              'calcula_previas', mais 'rotulos' (um por parâmetro).
+    """
+    chaves = list(dict.fromkeys(caminho_relativo(c) for c in caminhos))
+
+    linhas, rotulos = [], {}
+    for i in range(0, len(chaves), TAMANHO_BLOCO_SQL):
+        bloco = tuple(chaves[i:i + TAMANHO_BLOCO_SQL])
+        marcadores = ", ".join("?" * len(bloco))
+        linhas += leitura(f"""
+            SELECT m.arquivo_de_resultado, p.id_arquivo, p.versao, p.eventos, p.bins, p.escalas,
+                   p.limites, p.histogramas, p.bins_densidade, p.pares, p.densidades
+            FROM metadados_arquivo AS m
+            JOIN previas_arquivo AS p ON p.id_arquivo = m.id_arquivo
+            WHERE m.arquivo_de_resultado IN ({marcadores})
+        """, bloco)
+        for id_arquivo, numero, pnn, pns in leitura(f"""
+            SELECT c.id_arquivo, c.numero, c.pnn, c.pns
+            FROM metadados_arquivo AS m
+            JOIN canais_arquivo AS c ON c.id_arquivo = m.id_arquivo
+            WHERE m.arquivo_de_resultado IN ({marcadores})
+        """, bloco):
+            rotulos[(id_arquivo, numero)] = f"{pnn} ({pns})" if pns and pns != pnn else (pnn or f"P{numero}")
+
+    previas = {}
+    for (caminho_rel, id_arquivo, versao, eventos, bins, escalas,
+         limites, histogramas, bins_densidade, pares, densidades) in linhas:
+        parametros = len(escalas)
+        lista_pares = [tuple(int(n) for n in par.split(",")) for par in pares.split(";")] if pares else []
+        previas[caminho_rel] = {
+            "versao": versao,
+            "eventos": eventos,
+            "bins": bins,
+            "escalas": escalas,
+            "limites": np.frombuffer(limites, dtype="<f4").reshape(parametros, 2),
+            "histogramas": _decodifica(histogramas, (parametros, bins)),
+            "bins_densidade": bins_densidade,
+            "pares": lista_pares,
+            "densidades": _decodifica(densidades, (len(lista_pares), bins_densidade, bins_densidade)),
+            "rotulos": [rotulos.get((id_arquivo, numero), f"P{numero}") for numero in range(1, parametros + 1)],
+        }
+    return previas
+
+
+def imagem_densidade(contagens: np.ndarray, ampliacao: int = 3) -> np.ndarray:
+    """
+    Converte uma grade de densidade (eixo 0 = x) em uma imagem RGB uint8
+    (y para cima, contagens em escala log), ampliada sem interpolação.
+    """
+    valores = np.log1p(contagens.astype(np.float64)).T[::-1]
+    maximo = valores.max()
+    if maximo > 0:
+        valores /= maximo
+    posicao = valores * (len(_CORES_DENSIDADE) - 1)
+    base = np.minimum(posicao.astype(np.int64), len(_CORES_DENSIDADE) - 2)
+    fracao = (posicao - base)[..., None]
+    rgb = _CORES_DENSIDADE[base] * (1 - fracao) + _CORES_DENSIDADE[base + 1] * fracao
+    rgb = rgb.round().astype(np.uint8)
+    return np.repeat(np.repeat(rgb, ampliacao, axis=0), ampliacao, axis=1)
+
+
+def imagem_histograma(contagens: np.ndarray, altura: int = 32, ampliacao: int = 2) -> np.ndarray:
+    """
+    Desenha um histograma 1D como imagem (barras escuras em fundo branco),
+    com a altura em escala de raiz quadrada para o pico não esconder o resto.
+    """
+    valores = np.sqrt(contagens.astype(np.float64))
+    maximo = valores.max()
+    alturas = np.rint(valores / maximo * altura) if maximo > 0 else np.zeros(len(valores))
+    linhas = np.arange(altura, 0, -1)[:, None]
+    imagem = np.where(linhas <= alturas[None, :], 40, 255).astype(np.uint8)
+    return np.repeat(imagem, ampliacao, axis=1)
@@ -0,0 +1,211 @@
+import bisect
+import re
+import threading
+from database_setup.create_schema import (
+    GRUPOS_PADRAO, ENSAIOS_PADRAO, REGEX_IDENTIFICADOR,
+    divide_comandos, valida_identificador, sql_tabela_detalhe, sql_visao_resultados
+)
+from funcoes.db_tools import leitura, sessao, geracao_banco, incrementa_geracao
+
+# Números dentro do nome de um arquivo (candidatos a ID de animal)
+REGEX_NUMEROS = re.compile(r"\d+")
+
+
+class IndiceFaixas:
+    """
+    Índice de intervalos [inicio, fim] que não se sobrepõem, cada um ligado
+    a um valor (aqui, o id do grupo). A busca é uma bissecção sobre os
+    inícios ordenados: O(log n), ~10 comparações para mil faixas, em vez de
+    percorrer todas as faixas a cada número.
+    """
+
+    def __init__(self, faixas: list[tuple[int, int, any]]):
+        ordenadas = sorted(faixas)
+        for (inicio_a, fim_a, valor_a), (inicio_b, fim_b, valor_b) in zip(ordenadas, ordenadas[1:]):
+            if inicio_b <= fim_a:
+                raise ValueError(
+                    f"Faixas sobrepostas: [{inicio_a}, {fim_a}] ({valor_a}) e [{inicio_b}, {fim_b}] ({valor_b})"
+                )
+        self._inicios = [inicio for inicio, _, _ in ordenadas]
+        self._fins = [fim for _, fim, _ in ordenadas]
+        self._valores = [valor for _, _, valor in ordenadas]
+
+    def busca(self, numero: int):
+        """
+        Retorna:
+            O valor da faixa que contém 'numero', ou None.
+        """
+        posicao = bisect.bisect_right(self._inicios, numero) - 1
+        if posicao >= 0 and numero <= self._fins[posicao]:
+            return self._valores[posicao]
+        return None
+
+    def __len__(self):
+        return len(self._inicios)
+
+
+class Registro:
+    """
+    Grupos e ensaios cadastrados, com as buscas usadas pelo ETL e pela interface:
+
+        grupos_por_codigo  código da pasta ('a' em 'grupo_a') -> (id_grupo, nome_grupo)
+        grupos_por_nome    nome_grupo -> id_grupo
+        nomes_grupos       id_grupo -> nome_grupo
+        ensaios            tipo_ensaio -> (tabela de detalhes, chave primária)
+        faixas             IndiceFaixas de IDs de animais -> id_grupo
+    """
+
+    def __init__(self, grupos: list[tuple[int, str, str]], faixas: list[tuple[int, int, int]],
+                 ensaios: list[tuple[str, str, str]]):
+        self.grupos_por_codigo = {codigo.lower(): (id_grupo, nome) for id_grupo, nome, codigo in grupos}
+        self.grupos_por_nome = {nome: id_grupo for id_grupo, nome, _ in grupos}
+        self.nomes_grupos = {id_grupo: nome for id_grupo, nome, _ in grupos}
+        self.ensaios = {tipo: (tabela, pk) for tipo, tabela, pk in ensaios}
+        self.faixas = IndiceFaixas([(inicio, fim, id_grupo) for id_grupo, inicio, fim in faixas])
+        self._faixas_por_grupo: dict[int, list[tuple[int, int]]] = {}
+        for id_grupo, inicio, fim in sorted(faixas):
+            self._faixas_por_grupo.setdefault(id_grupo, []).append((inicio, fim))
+
+    @classmethod
+    def do_banco(cls) -> "Registro":
+        """
+        Lê o registro das tabelas 'grupos', 'registro_grupos', 'faixas_animais' e 'ensaios'.
+        """
+        grupos = leitura("""
+            SELECT g.id_grupo, g.nome_grupo, r.codigo_pasta
+            FROM grupos AS g JOIN registro_grupos AS r ON r.id_grupo = g.id_grupo
+            ORDER BY g.nome_grupo
+        """)
+        faixas = leitura("SELECT id_grupo, inicio, fim FROM faixas_animais")
+        ensaios = leitura("SELECT tipo_ensaio, tabela_detalhe, pk_detalhe FROM ensaios ORDER BY tipo_ensaio")
+        return cls(grupos, faixas, ensaios)
+
+    @classmethod
+    def padrao(cls) -> "Registro":
+        """
+        Registro com os grupos/ensaios padrão do esquema, sem acessar o banco
+        (ids de grupo numerados a partir de 1). Útil em benchmarks e testes.
+        """
+        grupos = [(i, nome, codigo) for i, (nome, codigo, _, _) in enumerate(GRUPOS_PADRAO, start=1)]
+        faixas = [(i, inicio, fim) for i, (_, _, inicio, fim) in enumerate(GRUPOS_PADRAO, start=1)]
+        return cls(grupos, faixas, ENSAIOS_PADRAO)
+
+    def tabela_detalhe(self, tipo_ensaio: str) -> str:
+        return self.ensaios[tipo_ensaio][0]
+
+    def pk_detalhe(self, tipo_ensaio: str) -> str:
+        return self.ensaios[tipo_ensaio][1]
+
+    def faixas_do_grupo(self, id_grupo: int) -> list[tuple[int, int]]:
+        """
+        Faixas (inicio, fim) de IDs de animais de um grupo, em ordem.
+        """
+        return self._faixas_por_grupo.get(id_grupo, [])
+
+    def grupo_do_animal(self, id_animal: int) -> int:
+        """
+        Retorna:
+            int: O id do grupo cuja faixa contém o animal, ou None.
+        """
+        return self.faixas.busca(id_animal)
+
+    def descobre_id_animal(self, nome_arquivo: str, id_grupo: int) -> int:
+        """
+        Procura, entre os números presentes no nome do arquivo, o primeiro que
+        esteja em uma faixa de IDs de animais do grupo.
+
+        Retorna:
+            int: O ID do animal, ou None se nenhum número estiver nas faixas do grupo.
+        """
+        for encontrado in REGEX_NUMEROS.finditer(nome_arquivo):
+            numero = int(encontrado.group())
+            if self.faixas.busca(numero) == id_grupo:
+                return numero
+        return None
+
+
+_registro = None
+_geracao_registro = None
+_trava_registro = threading.Lock()
+
+
+def obter_registro() -> Registro:
+    """
+    Registro do banco, lido uma vez e guardado em memória. É relido só
+    quando a geração do banco muda (cadastros e cargas do ETL a incrementam).
+    """
+    global _registro, _geracao_registro
+    geracao = geracao_banco()
+    with _trava_registro:
+        if _registro is None or _geracao_registro != geracao:
+            _registro = Registro.do_banco()
+            _geracao_registro = geracao
+        return _registro
+
+
+def registra_grupo(nome_grupo: str, codigo_pasta: str, faixas: list[tuple[int, int]]) -> int:
+    """
+    Cadastra um grupo novo (pasta 'data/raw/grupo_<codigo_pasta>') com suas
+    faixas de IDs de animais. As faixas não podem se sobrepor às de outros grupos.
+
+    Retorna:
+        int: O id do grupo criado.
+    """
+    if not REGEX_IDENTIFICADOR.match(codigo_pasta.lower()):
+        raise ValueError(f"Código de pasta inválido: '{codigo_pasta}'")
+
+    atual = obter_registro()
+    novas = [(inicio, fim, None) for inicio, fim in faixas]
+    existentes = [
+        (inicio, fim, id_grupo)
+        for id_grupo, inicio, fim in leitura("SELECT id_grupo, inicio, fim FROM faixas_animais")
+    ]
+    IndiceFaixas(existentes + novas)  # levanta ValueError se houver sobreposição
+
+    if codigo_pasta.lower() in atual.grupos_por_codigo:
+        raise ValueError(f"Já existe um grupo com a pasta 'grupo_{codigo_pasta}'")
+
+    with sessao() as cursor:
+        cursor.execute("INSERT INTO grupos (nome_grupo) VALUES (?) RETURNING id_grupo", (nome_grupo,))
+        id_grupo = cursor.fetchone()[0]
+        cursor.execute(
+            "INSERT INTO registro_grupos (id_grupo, codigo_pasta) VALUES (?, ?)",
+            (id_grupo, codigo_pasta.lower())
+        )
+        cursor.executemany(
+            "INSERT INTO faixas_animais (id_grupo, inicio, fim) VALUES (?, ?, ?)",
+            [(id_grupo, inicio, fim) for inicio, fim in faixas]
+        )
+        incrementa_geracao(cursor)
+
+    return id_grupo
+
+
+def registra_ensaio(tipo_ensaio: str, tabela_detalhe: str = None, pk_detalhe: str = None):
+    """
+    Cadastra um ensaio novo: cria a tabela de detalhes (mesmo formato das
+    demais, com índices por animal e por arquivo) e recria a visão
+    'vw_resultados' já incluindo o ensaio.
+
+    Por padrão a tabela é 'detalhes_<tipo_ensaio>' e a chave 'id_<tipo_ensaio>'.
+    """
+    tabela_detalhe = tabela_detalhe or f"detalhes_{tipo_ensaio}"
+    pk_detalhe = pk_detalhe or f"id_{tipo_ensaio}"
+    for nome in (tipo_ensaio, tabela_detalhe, pk_detalhe):
+        valida_identificador(nome)
+
+    with sessao() as cursor:
+        cursor.execute(
+            "INSERT INTO ensaios (tipo_ensaio, tabela_detalhe, pk_detalhe) VALUES (?, ?, ?)",
+            (tipo_ensaio, tabela_detalhe, pk_detalhe)
+        )
+        ensaios = cursor.execute(
+            "SELECT tipo_ensaio, tabela_detalhe, pk_detalhe FROM ensaios ORDER BY rowid"
+        ).fetchall()
+
+        # DDL também é transacional no SQLite: se algo falhar, nada fica pela metade
+        for comando in divide_comandos(sql_tabela_detalhe(tipo_ensaio, tabela_detalhe, pk_detalhe)
+                                       + sql_visao_resultados(ensaios)):
+            cursor.execute(comando)
+
+        incrementa_geracao(cursor)
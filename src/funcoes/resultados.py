@@ -0,0 +1,22 @@
+from database_setup.create_schema import SQL_CONTAGEM_RESULTADOS, SQL_RESULTADOS_PAGINADOS
+from funcoes.db_tools import leitura
+
+
+def conta_resultados(id_grupo: int, tipo_ensaio: str) -> int:
+    """
+    Quantidade de resultados de um grupo/ensaio.
+    """
+    return leitura(SQL_CONTAGEM_RESULTADOS, (id_grupo, tipo_ensaio))[0][0]
+
+
+def busca_resultados(id_grupo: int, tipo_ensaio: str, limite: int = -1,
+                     deslocamento: int = 0) -> list[tuple[int, str, str]]:
+    """
+    Resultados de um grupo/ensaio, paginados no próprio banco (LIMIT/OFFSET).
+    limite=-1 traz todas as linhas.
+
+    Retorna:
+        list: Tuplas (id_animal, arquivo_de_resultado, condicao), na ordem
+              de exibição da interface.
+    """
+    return leitura(SQL_RESULTADOS_PAGINADOS, (id_grupo, tipo_ensaio, limite, deslocamento))